@@ -1,7 +1,13 @@
 """Implements Analyzers that give insights into Board positions."""
 import logging
-from .move_generators import moves_for
-from .color import Color, colorize, color_of
+import collections
+from .bitboard import KNIGHT_ATTACKS, PAWN_ATTACKS, lsb, rook_attacks, bishop_attacks
+from .move_generators import iter_legal_moves
+from .color import Color, colorize
+from .trace import TRACE
+
+# check: color's King is attacked. checkmate and stalemate: color has no legal move, in check or not.
+Analysis = collections.namedtuple('Analysis', 'check checkmate stalemate')
 
 
 def adjacent_kings(board):
@@ -17,133 +23,103 @@ def adjacent_kings(board):
 
 def is_in_check(board, color, king_pos=None):
     """Returns True if the given color's player is in check on the given board."""
-    logging.debug("CheckAnalyzer::is_in_check(%s)", color)
-
-    king_pos = king_pos or board.king_position(color)
-    logging.debug("CheckAnalyzer::is_in_check() : king_pos = %r", king_pos)
-
-    if is_in_knight_check(board, color, king_pos):
-        return True
+    sq = king_square(board, color, king_pos)
 
-    if is_in_diagonal_check(board, color, king_pos):
+    if (is_in_knight_check(board, color, sq) or is_in_diagonal_check(board, color, sq)
+            or is_in_horizontal_check(board, color, sq) or is_in_pawn_check(board, color, sq)):
         return True
 
-    if is_in_horizontal_check(board, color, king_pos):
-        return True
+    if TRACE:
+        logging.debug("CheckAnalyzer::is_in_check(%s) -> False", color)
+    return False
 
-    if is_in_pawn_check(board, color, king_pos):
-        return True
 
-    logging.debug("CheckAnalyzer::is_in_check(%s) -> False", color)
-    return False
+def king_square(board, color, king_pos=None):
+    """Returns the square index of color's King: king_pos, if given as (y, x) or as an index, else looked up on board."""
+    if king_pos is None:
+        return lsb(board.bitboards['K' if color == Color.WHITE else 'k'])
+    if isinstance(king_pos, int):
+        return king_pos
+    return 8*king_pos[0] + king_pos[1]
 
 
 def is_in_mate(board, color):
-    """Returns True if the given color is mated."""
-    for y in range(8):
-        for x in range(8):
-            if (p := board.square_at(y, x)) and color_of(p) == color:
-                for dst_y, dst_x in moves_for(y, x, board):  # pylint:disable=not-an-iterable
+    """Returns True if the given color is mated.
 
-                    old_src = board.square_at(y, x)
-                    old_dst = board.square_at(dst_y, dst_x)
+    That is, if color has no legal move: checkmate when in check, stalemate when not."""
+    if next(iter_legal_moves(board, color), None) is None:
+        if TRACE:
+            logging.debug("CheckAnalyzer::is_in_mate(%s) -> True", color)
+        return True
 
-                    board.place_piece_at(p, dst_y, dst_x)
-                    board.place_piece_at(None, y, x)
+    return False
 
-                    if not is_in_check(board, color) and not adjacent_kings(board):
-                        logging.debug("CheckAnalyzer::is_in_mate(%s) [%s (%d, %d) -> (%d, %d)]-> False",
-                                      color, p, y, x, dst_y, dst_x)
 
-                        board.place_piece_at(old_dst, dst_y, dst_x)
-                        board.place_piece_at(old_src, y, x)
+def analyze(board, color, en_passant=None):
+    """Returns an Analysis of color's position on board, finding the pieces checking color's King only once.
 
-                        return False
+    en_passant is the square index a Pawn skipped over on the last move, if any: capturing it may be the only way out.
+    Moves are generated only as far as the first legal one."""
+    king = board.bitboards['K' if color == Color.WHITE else 'k']
+    checkers = board.attackers_of_square(lsb(king), color.opponent())
 
-                    board.place_piece_at(old_dst, dst_y, dst_x)
-                    board.place_piece_at(old_src, y, x)
+    # castling is never the only legal move: it's not allowed out of check, and otherwise the King could step aside
+    mated = next(iter_legal_moves(board, color, en_passant=en_passant, checkers=checkers), None) is None
 
-    logging.debug("CheckAnalyzer::is_in_mate(%s) -> True", color)
-    return True
+    analysis = Analysis(bool(checkers), mated and bool(checkers), mated and not checkers)
+    if TRACE:
+        logging.debug("CheckAnalyzer::analyze(%s) -> %r", color, analysis)
+    return analysis
 
 
 def is_in_knight_check(board, color, king_pos=None):
     """Returns True if the given color's player is in check on the given board from opponent's Knight."""
-    logging.debug("CheckAnalyzer::is_in_knight_check(%s)", color)
-
-    king_pos = king_pos or board.king_position(color)
-    logging.debug("CheckAnalyzer::is_in_knight_check() : king_pos = %r", king_pos)
-
-    opponent_knight = colorize('N', color.opponent())
+    sq = king_square(board, color, king_pos)
 
-    offsets_y = (-1, -1,  1, 1, -2, -2,  2, 2)
-    offsets_x = (-2,  2, -2, 2, -1,  1, -1, 1)
-    for (y_offset, x_offset) in zip(offsets_y, offsets_x):
-        y, x = king_pos.y + y_offset, king_pos.x + x_offset
-        if 0 <= y < 8 and 0 <= x < 8:
-            if board.square_at(y, x) == opponent_knight:
-                logging.debug("CheckAnalyzer::is_in_knight_check() -> True : Knight at (%s, %s)", y, x)
-                return True
+    if knights := KNIGHT_ATTACKS[sq] & board.bitboards[colorize('N', color.opponent())]:
+        if TRACE:
+            logging.debug("CheckAnalyzer::is_in_knight_check() -> True : Knight at %s", lsb(knights))
+        return True
 
     return False
 
 
 def is_in_diagonal_check(board, color, king_pos=None):
     """Returns True if the given color's player is in check on the given board from opponent's Bishop or Queen."""
-    logging.debug("CheckAnalyzer::is_in_diagonal_check(%s)", color)
-
-    king_pos = king_pos or board.king_position(color)
-    logging.debug("CheckAnalyzer::is_in_diagonal_check() : king_pos = %r", king_pos)
-
-    opponent_bishop = colorize('B', color.opponent())
-    opponent_queen = colorize('Q', color.opponent())
+    sq = king_square(board, color, king_pos)
+    bbs, opponent = board.bitboards, color.opponent()
 
-    incrementors = ((-1, -1), (1, 1), (1, -1), (-1, 1),)
-    for increments in incrementors:
-        if (p := board.find_first_on_diagonal(king_pos, *increments)) and p.piece in (opponent_bishop, opponent_queen):
-            logging.debug("CheckAnalyzer::is_in_diagonal_check() -> True : Bishop at (%s, %s)", *p[1:])
-            return True
+    sliders = bbs[colorize('B', opponent)] | bbs[colorize('Q', opponent)]
+    if sliders and (bishops := bishop_attacks(sq, board.occupancy[Color.WHITE] | board.occupancy[Color.BLACK]) & sliders):
+        if TRACE:
+            logging.debug("CheckAnalyzer::is_in_diagonal_check() -> True : Bishop at %s", lsb(bishops))
+        return True
 
     return False
 
 
 def is_in_horizontal_check(board, color, king_pos=None):
     """Returns True if the given color's player is in check on the given board from opponent's Rook or Queen."""
-    logging.debug("CheckAnalyzer::is_in_horizontal_check(%s)", color)
-
-    king_pos = king_pos or board.king_position(color)
-    logging.debug("CheckAnalyzer::is_in_horizontal_check() : king_pos = %r", king_pos)
-
-    opponent_rook = colorize('R', color.opponent())
-    opponent_queen = colorize('Q', color.opponent())
+    sq = king_square(board, color, king_pos)
+    bbs, opponent = board.bitboards, color.opponent()
 
-    incrementors = ((0, -1), (0, 1), (1, 0), (-1, 0),)
-    for increments in incrementors:
-        if (p := board.find_first_on_h_or_v(king_pos, *increments)) and p.piece in (opponent_rook, opponent_queen):
-            logging.debug("CheckAnalyzer::is_in_horizontal_check() -> True : Rook at (%s, %s)", *p[1:])
-            return True
+    sliders = bbs[colorize('R', opponent)] | bbs[colorize('Q', opponent)]
+    if sliders and (rooks := rook_attacks(sq, board.occupancy[Color.WHITE] | board.occupancy[Color.BLACK]) & sliders):
+        if TRACE:
+            logging.debug("CheckAnalyzer::is_in_horizontal_check() -> True : Rook at %s", lsb(rooks))
+        return True
 
     return False
 
 
 def is_in_pawn_check(board, color, king_pos=None):
     """Returns True if the given color's player is in check on the given board from opponent's Pawn."""
-    logging.debug("CheckAnalyzer::is_in_pawn_check(%s)", color)
-
-    king_pos = king_pos or board.king_position(color)
-    logging.debug("CheckAnalyzer::is_in_pawn_check() : king_pos = %r", king_pos)
-
-    opponent_pawn = colorize('P', color.opponent())
+    sq = king_square(board, color, king_pos)
 
-    if color == Color.WHITE:
-        pawn_maybes = (king_pos.y - 1, king_pos.x - 1), (king_pos.y - 1, king_pos.x + 1)
-    else:
-        pawn_maybes = (king_pos.y + 1, king_pos.x - 1), (king_pos.y + 1, king_pos.x + 1)
-
-    for pawn_maybe in pawn_maybes:
-        if pawn_maybe[0] >= 0 and pawn_maybe[0] < 8 and pawn_maybe[1] >= 0 and pawn_maybe[1] < 8:
-            if board.square_at(*pawn_maybe) == opponent_pawn:
-                logging.debug("CheckAnalyzer::is_in_pawn_check() -> True : Pawn at (%s, %s)", *pawn_maybe)
-                return True
+    # the opponent's Pawns attack sq from the squares a Pawn of color on sq would attack
+    if pawns := PAWN_ATTACKS[color][sq] & board.bitboards[colorize('P', color.opponent())]:
+        if TRACE:
+            logging.debug("CheckAnalyzer::is_in_pawn_check() -> True : Pawn at %s", lsb(pawns))
+        return True
 
     return False
@@ -0,0 +1,161 @@
+"""Bitboards: sets of squares encoded as 64-bit integers.
+
+Bit number 8*y + x represents the square at (y, x), the same index Board uses for its squares list,
+so bit 0 is a8 and bit 63 is h1. Attack tables are computed once, at import.
+"""
+from .color import Color
+
+EMPTY = 0
+FULL = (1 << 64) - 1
+
+# FILES[x] and RANKS[y]: every square with that x, or that y
+FILES = tuple(0x0101010101010101 << x for x in range(8))
+RANKS = tuple(0xFF << 8*y for y in range(8))
+
+# (inc_y, inc_x) increments, in the same order used throughout chesspy
+ROOK_DIRECTIONS = ((0, -1), (0, 1), (1, 0), (-1, 0),)
+BISHOP_DIRECTIONS = ((-1, -1), (1, 1), (1, -1), (-1, 1),)
+
+
+def square(y, x):
+    """Returns the square index of (y, x)."""
+    return 8*y + x
+
+
+def bit(y, x):
+    """Returns a bitboard with only (y, x) set."""
+    return 1 << (8*y + x)
+
+
+def lsb(bb):
+    """Returns the index of the least significant set bit of a non-empty bitboard."""
+    return (bb & -bb).bit_length() - 1
+
+
+def msb(bb):
+    """Returns the index of the most significant set bit of a non-empty bitboard."""
+    return bb.bit_length() - 1
+
+
+def squares_of(bb):
+    """Yields the index of each set bit of bb, in ascending order."""
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+
+def popcount(bb):
+    """Returns the number of squares in bb."""
+    return bb.bit_count()
+
+
+def _step_mask(sq, offsets):
+    """Returns a bitboard of squares reachable from sq by each (offset_y, offset_x) in offsets."""
+    y, x = divmod(sq, 8)
+    mask = EMPTY
+    for offset_y, offset_x in offsets:
+        if 0 <= y + offset_y < 8 and 0 <= x + offset_x < 8:
+            mask |= bit(y + offset_y, x + offset_x)
+    return mask
+
+
+def _ray_mask(sq, inc_y, inc_x):
+    """Returns a bitboard of squares from sq (exclusive) to the edge of the board, incrementing by (inc_y, inc_x)."""
+    y, x = divmod(sq, 8)
+    mask = EMPTY
+    y, x = y + inc_y, x + inc_x
+    while 0 <= y < 8 and 0 <= x < 8:
+        mask |= bit(y, x)
+        y, x = y + inc_y, x + inc_x
+    return mask
+
+
+def _step_coords(sq, offsets):
+    """Returns the (y, x) of each square reachable from sq by each (offset_y, offset_x) in offsets, in that order."""
+    y, x = divmod(sq, 8)
+    return tuple((y + offset_y, x + offset_x) for offset_y, offset_x in offsets
+                 if 0 <= y + offset_y < 8 and 0 <= x + offset_x < 8)
+
+
+def _ray_coords(sq, inc_y, inc_x):
+    """Returns the (y, x) of each square from sq (exclusive) to the edge of the board, nearest first."""
+    y, x = divmod(sq, 8)
+    return tuple((y + n*inc_y, x + n*inc_x) for n in range(1, 8) if 0 <= y + n*inc_y < 8 and 0 <= x + n*inc_x < 8)
+
+
+KNIGHT_OFFSETS = ((-1, -2), (-1, 2), (1, -2), (1, 2), (-2, -1), (-2, 1), (2, -1), (2, 1))
+KING_OFFSETS = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+
+KNIGHT_ATTACKS = tuple(_step_mask(sq, KNIGHT_OFFSETS) for sq in range(64))
+KING_ATTACKS = tuple(_step_mask(sq, KING_OFFSETS) for sq in range(64))
+
+# squares attacked by a pawn of the given color standing on each square
+PAWN_ATTACKS = {
+    Color.WHITE: tuple(_step_mask(sq, ((-1, -1), (-1, 1))) for sq in range(64)),
+    Color.BLACK: tuple(_step_mask(sq, ((1, -1), (1, 1))) for sq in range(64)),
+}
+
+RAYS = {direction: tuple(_ray_mask(sq, *direction) for sq in range(64))
+        for direction in ROOK_DIRECTIONS + BISHOP_DIRECTIONS}
+
+# The same squares as (y, x) tuples, for code that works in coordinates: walking these allocates nothing.
+KNIGHT_COORDS = tuple(_step_coords(sq, KNIGHT_OFFSETS) for sq in range(64))
+KING_COORDS = tuple(_step_coords(sq, KING_OFFSETS) for sq in range(64))
+RAY_COORDS = {direction: tuple(_ray_coords(sq, *direction) for sq in range(64))
+              for direction in ROOK_DIRECTIONS + BISHOP_DIRECTIONS}
+
+# rays running toward higher square indices meet their first blocker at the lowest set bit
+_ASCENDING = {direction: 8*direction[0] + direction[1] > 0 for direction in RAYS}
+
+
+def first_blocker(sq, direction, occupied):
+    """Returns the index of the first occupied square from sq in direction, or None."""
+    if blockers := RAYS[direction][sq] & occupied:
+        return lsb(blockers) if _ASCENDING[direction] else msb(blockers)
+    return None
+
+
+def ray_attacks(sq, direction, occupied):
+    """Returns a bitboard of squares attacked from sq along direction, up to and including the first blocker."""
+    ray = RAYS[direction]
+    attacks = ray[sq]
+    if blockers := attacks & occupied:
+        blocker = lsb(blockers) if _ASCENDING[direction] else msb(blockers)
+        attacks ^= ray[blocker]
+    return attacks
+
+
+def rook_attacks(sq, occupied):
+    """Returns a bitboard of squares attacked by a Rook on sq."""
+    attacks = EMPTY
+    for direction in ROOK_DIRECTIONS:
+        attacks |= ray_attacks(sq, direction, occupied)
+    return attacks
+
+
+def bishop_attacks(sq, occupied):
+    """Returns a bitboard of squares attacked by a Bishop on sq."""
+    attacks = EMPTY
+    for direction in BISHOP_DIRECTIONS:
+        attacks |= ray_attacks(sq, direction, occupied)
+    return attacks
+
+
+def _between_and_line():
+    """Returns (between, line): 64x64 tables of the squares strictly between two aligned squares, and of the
+    whole line through them. Both are EMPTY for squares that do not share a rank, file or diagonal."""
+    between = [[EMPTY] * 64 for _ in range(64)]
+    line = [[EMPTY] * 64 for _ in range(64)]
+
+    for sq in range(64):
+        for inc_y, inc_x in ROOK_DIRECTIONS + BISHOP_DIRECTIONS:
+            full_line = RAYS[(inc_y, inc_x)][sq] | RAYS[(-inc_y, -inc_x)][sq] | (1 << sq)
+            for other in squares_of(RAYS[(inc_y, inc_x)][sq]):
+                between[sq][other] = RAYS[(inc_y, inc_x)][sq] & RAYS[(-inc_y, -inc_x)][other]
+                line[sq][other] = full_line
+
+    return tuple(map(tuple, between)), tuple(map(tuple, line))
+
+
+BETWEEN, LINE = _between_and_line()
@@ -1,8 +1,8 @@
 """Impments a class representing a chess Board."""
-import logging
-import itertools
+import re
 import collections
-from .color import Color
+from . import bitboard, zobrist, evaluation
+from .color import Color, color_of
 
 
 PieceAtPos = collections.namedtuple('PieceAtPos', 'piece y x')
@@ -15,8 +15,22 @@ def in_bounds(y, x):
     return 0 <= y < 8 and 0 <= x < 8
 
 
+PIECES = 'PNBRQKpnbrqk'
+
+# turns a rank of the piece placement field of FEN, with empty squares counted, into a rank of Board repr
+FEN_PLACEMENT = str.maketrans({str(n): ' ' * n for n in range(1, 9)})
+EMPTY_RUN_RE = re.compile(' +')
+
+
 class Board:
-    """Represents a chess board, with utility methods for moving and locating pieces."""
+    """Represents a chess board, with utility methods for moving and locating pieces.
+
+    Pieces are kept twice: in self.squares, a list of 64 piece characters indexed by 8*y + x, and in
+    self.bitboards, one 64-bit integer per piece (see chesspy.bitboard), plus self.occupancy per color.
+
+    self.zobrist_key hashes the pieces on the board (see chesspy.zobrist) and is kept current by place_piece_at(),
+    as is self.evaluation, the material and piece-square score of the pieces (see chesspy.evaluation).
+    """
     def __init__(self, reprstr=None):
         """Initialize a chess board to the default starting position, or to the given repr string."""
         if reprstr is not None:
@@ -37,14 +51,25 @@ class Board:
             Color.BLACK: {},
         }
 
+        self.bitboards = dict.fromkeys(PIECES, bitboard.EMPTY)
+        self.occupancy = {
+            Color.WHITE: bitboard.EMPTY,
+            Color.BLACK: bitboard.EMPTY,
+        }
+
         for y in range(8):
             for x in range(8):
                 if p := self.squares[8*y + x]:
+                    self.bitboards[p] |= bitboard.bit(y, x)
+                    self.occupancy[color_of(p)] |= bitboard.bit(y, x)
                     if p == 'k':
                         self.piece_positions[Color.BLACK]['K'] = (y, x)
                     elif p == 'K':
                         self.piece_positions[Color.WHITE]['K'] = (y, x)
 
+        self.zobrist_key = zobrist.squares_key(self.squares)
+        self.evaluation = evaluation.squares_score(self.squares)
+
     def __str__(self):
         """Returns a string for printing the chess board with two coordinate systems."""
         boardstr = []
@@ -64,6 +89,22 @@ class Board:
         """Returns a string compactly representing current board state. Suitable for initializing new Board objects."""
         return ''.join(ch or ' ' for ch in self.squares)
 
+    @classmethod
+    def from_fen(cls, placement):
+        """Returns a new Board with the pieces of the piece placement field of a FEN string: 'rnbqkbnr/pppppppp/8/...'.
+
+        Raises ValueError if placement doesn't describe 64 squares."""
+        ranks = placement.translate(FEN_PLACEMENT).split('/')
+        reprstr = ''.join(ranks)
+        if len(ranks) != 8 or any(len(rank) != 8 for rank in ranks) or reprstr.strip(' ' + PIECES):
+            raise ValueError(f"not a FEN piece placement: {placement!r}")
+        return cls(reprstr)
+
+    def fen(self):
+        """Returns the piece placement field of FEN for this board. See from_fen()."""
+        reprstr = repr(self)
+        return '/'.join(EMPTY_RUN_RE.sub(lambda run: str(len(run.group())), reprstr[y:y + 8]) for y in range(0, 64, 8))
+
     def king_position(self, color):
         """Returns (y, x) coordinates of color's king.
         """
@@ -88,13 +129,31 @@ class Board:
         if y < 0 or y > 7 or x < 0 or x > 7:
             raise IndexError
 
-        self.squares[8*y+x] = piece
+        self.place_piece_on(piece, 8*y + x)
+
+    def place_piece_on(self, piece, sq):
+        """Place the given piece on the board at the given square index, 8*y + x. Performs no bounds checking."""
+        mask = 1 << sq
+
+        if (old := self.squares[sq]) is not None:
+            self.bitboards[old] ^= mask
+            self.occupancy[color_of(old)] ^= mask
+            self.zobrist_key ^= zobrist.PIECE_SQUARE[old][sq]
+            self.evaluation -= evaluation.SQUARE_SCORES[old][sq]
+
+        if piece is not None:
+            self.bitboards[piece] |= mask
+            self.occupancy[color_of(piece)] |= mask
+            self.zobrist_key ^= zobrist.PIECE_SQUARE[piece][sq]
+            self.evaluation += evaluation.SQUARE_SCORES[piece][sq]
+
+        self.squares[sq] = piece
 
         match piece:
             case 'k':
-                self.piece_positions[Color.BLACK]['K'] = (y, x)
+                self.piece_positions[Color.BLACK]['K'] = divmod(sq, 8)
             case 'K':
-                self.piece_positions[Color.WHITE]['K'] = (y, x)
+                self.piece_positions[Color.WHITE]['K'] = divmod(sq, 8)
 
     def find_first(self, squares, src=None):
         """Find the first piece encountered in the list of squares.
@@ -103,10 +162,7 @@ class Board:
 
         Returns PieceAtPos(piece, y, x) or None.
         """
-        logging.debug("find_first(%r, %r)", squares, src)
-
         for y, x in squares:
-            logging.debug("(%s, %s)", y, x)
             assert 0 <= y < 8 and 0 <= x < 8
 
             if (p := self.squares[8*y + x]) is not None:
@@ -114,53 +170,78 @@ class Board:
                     return PieceAtPos(p, y, x)
         return None
 
-    def find_first_on_h_or_v(self, start, inc_y, inc_x, src=None):
-        """Find first piece horizontally or vertically starting from (start_y, start_x incrementing by (inc_y, inc_x)
+    def pieces(self, piece):
+        """Returns a bitboard of every square holding the given piece. board.pieces('N') is all of White's Knights."""
+        return self.bitboards[piece]
 
-        Either inc_y or inc_x must == 0.
-        If src.y or src.x are not None, return only coords that include them.
+    def occupied(self, color=None):
+        """Returns a bitboard of every square holding a piece of the given color, or of either color."""
+        if color is None:
+            return self.occupancy[Color.WHITE] | self.occupancy[Color.BLACK]
+        return self.occupancy[color]
 
-        Returns PieceAtPos(p, y, x) where p is the first piece encountered, (y, x) are coordinates of p, or None if no piece is found.
+    def attackers_of(self, y, x, color, occupied=None):
+        """Returns a bitboard of color's pieces attacking (y, x).
+
+        Sliding pieces are blocked by occupied, which defaults to the board's current occupancy.
         """
-        start_y, start_x = start
-        logging.debug("find_first_on_h_or_v(%s, %s, %s, %s, %r)", start_y, start_x, inc_y, inc_x, src)
+        return self.attackers_of_square(8*y + x, color, occupied)
 
-        assert((inc_y == 0 or inc_x == 0) and (inc_y != 0 or inc_x != 0))
+    def attackers_of_square(self, sq, color, occupied=None):
+        """Returns a bitboard of color's pieces attacking the square with index sq, 8*y + x. See attackers_of()."""
+        bbs = self.bitboards
+        if occupied is None:
+            occupied = self.occupancy[Color.WHITE] | self.occupancy[Color.BLACK]
 
-        if inc_y != 0:
-            dst_y = -1 if inc_y < 0 else 8
-            logging.debug(" dst_y=%d, start_y+inc_y=%d, dst_y=%d, inc_y=%d", dst_y, start_y+inc_y, dst_y, inc_y)
-            y_range = range(start_y+inc_y, dst_y, inc_y)
+        if color == Color.WHITE:
+            pawn, knight, bishop, rook, queen, king = bbs['P'], bbs['N'], bbs['B'], bbs['R'], bbs['Q'], bbs['K']
         else:
-            y_range = [start_y]
+            pawn, knight, bishop, rook, queen, king = bbs['p'], bbs['n'], bbs['b'], bbs['r'], bbs['q'], bbs['k']
 
-        if inc_x != 0:
-            dst_x = -1 if inc_x < 0 else 8
-            logging.debug(" dst_x=%d, start_x+inc_x=%d, dst_x=%d, inc_x=%d", dst_x, start_x+inc_x, dst_x, inc_x)
-            x_range = range(start_x+inc_x, dst_x, inc_x)
-        else:
-            x_range = [start_x]
+        # a pawn of color attacks sq from the squares that a pawn of the opposite color on sq would attack
+        return ((bitboard.PAWN_ATTACKS[color.opponent()][sq] & pawn)
+                | (bitboard.KNIGHT_ATTACKS[sq] & knight)
+                | (bitboard.KING_ATTACKS[sq] & king)
+                | (bitboard.bishop_attacks(sq, occupied) & (bishop | queen))
+                | (bitboard.rook_attacks(sq, occupied) & (rook | queen)))
 
-        return self.find_first(list(itertools.product(y_range, x_range)), src)
+    def find_first_on_ray(self, start, direction, src=None):
+        """Find the first piece encountered from start (exclusive) toward the edge of the board in direction (inc_y, inc_x).
 
-    def find_first_on_diagonal(self, start, inc_y, inc_x, src=None):
-        """Find the first piece encountered diagonally starting from (start_y, start_x) while incrementing (y, x) by (inc_y, inc_x)
+        If src.y or src.x are not None, return only coords that include them.
+
+        Returns PieceAtPos(p, y, x) where p is the first piece encountered, (y, x) are coordinates of p, or None if no piece is found.
+        """
+        start_sq = 8*start[0] + start[1]
+        occupied = self.occupancy[Color.WHITE] | self.occupancy[Color.BLACK]
+
+        while (sq := bitboard.first_blocker(start_sq, direction, occupied)) is not None:
+            y, x = divmod(sq, 8)
+            if not src or (src.y in (None, y) and src.x in (None, x)):
+                return PieceAtPos(self.squares[sq], y, x)
+            occupied ^= 1 << sq
+
+        return None
 
+    def find_first_on_h_or_v(self, start, inc_y, inc_x, src=None):
+        """Find first piece horizontally or vertically starting from (start_y, start_x incrementing by (inc_y, inc_x)
+
+        Either inc_y or inc_x must == 0.
         If src.y or src.x are not None, return only coords that include them.
 
         Returns PieceAtPos(p, y, x) where p is the first piece encountered, (y, x) are coordinates of p, or None if no piece is found.
         """
-        start_y, start_x = start
-        logging.debug("find_first_on_diagonal(%s, %s, %s, %s, %r)", start_y, start_x, inc_y, inc_x, src)
+        assert (inc_y, inc_x) in bitboard.ROOK_DIRECTIONS
+
+        return self.find_first_on_ray(start, (inc_y, inc_x), src)
 
-        assert(inc_y in [-1, 1] and inc_x in [-1, 1])
+    def find_first_on_diagonal(self, start, inc_y, inc_x, src=None):
+        """Find the first piece encountered diagonally starting from (start_y, start_x) while incrementing (y, x) by (inc_y, inc_x)
 
-        dst_y = -1 if inc_y < 0 else 8
-        logging.debug(" dst_y=%d, start_y+inc_y=%d, dst_y=%d, inc_y=%d", dst_y, start_y+inc_y, dst_y, inc_y)
-        y_range = range(start_y+inc_y, dst_y, inc_y)
+        If src.y or src.x are not None, return only coords that include them.
 
-        dst_x = -1 if inc_x < 0 else 8
-        logging.debug(" dst_x=%d, start_x+inc_x=%d, dst_x=%d, inc_x=%d", dst_x, start_x+inc_x, dst_x, inc_x)
-        x_range = range(start_x+inc_x, dst_x, inc_x)
+        Returns PieceAtPos(p, y, x) where p is the first piece encountered, (y, x) are coordinates of p, or None if no piece is found.
+        """
+        assert (inc_y, inc_x) in bitboard.BISHOP_DIRECTIONS
 
-        return self.find_first(list(zip(y_range, x_range)), src)
+        return self.find_first_on_ray(start, (inc_y, inc_x), src)
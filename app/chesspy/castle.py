@@ -6,3 +6,39 @@ class Castle(Enum):
     """Enum representing chess castling direction."""
     KINGSIDE = 1
     QUEENSIDE = 2
+
+
+# castling rights are written as in FEN: a subset of 'KQkq', in that order
+ALL_RIGHTS = 'KQkq'
+
+# squares (index 8*y + x) whose King or Rook moving away or being captured loses castling rights
+RIGHTS_LOST_AT = {
+    60: 'KQ',  # e1
+    63: 'K',   # h1
+    56: 'Q',   # a1
+    4: 'kq',   # e8
+    7: 'k',    # h8
+    0: 'q',    # a8
+}
+
+# the King and Rook that must be home for each castling right: right -> ((king, y, x), (rook, y, x))
+HOME_SQUARES = {
+    'K': (('K', 7, 4), ('R', 7, 7)),
+    'Q': (('K', 7, 4), ('R', 7, 0)),
+    'k': (('k', 0, 4), ('r', 0, 7)),
+    'q': (('k', 0, 4), ('r', 0, 0)),
+}
+
+
+def rights_for(board):
+    """Returns the castling rights implied by the Kings and Rooks standing on their starting squares."""
+    return ''.join(right for right, homes in HOME_SQUARES.items()
+                   if all(board.square_at(y, x) == piece for piece, y, x in homes))
+
+
+def remove_rights(rights, *squares):
+    """Returns rights less any lost by a piece moving from or to the given squares."""
+    for sq in squares:
+        if lost := RIGHTS_LOST_AT.get(sq):
+            rights = ''.join(right for right in rights if right not in lost)
+    return rights
@@ -0,0 +1,120 @@
+"""Replay every game of a large PGN file in parallel, to validate SAN parsing and move generation against real games.
+
+The file is split into shards by byte offset, at '[Event ' lines, so no pre-splitting is needed and each worker
+reads only its own part of the file.
+
+for result in corpus.replay("/path/to/lichess.pgn"):
+    if result.error:
+        print(result.number, result.site, result.error)
+"""
+import os
+import mmap
+import time
+import collections
+import concurrent.futures
+from . import pgn
+from .game import Game
+
+# Outcome of replaying one game. error is None if every move was played, else a description of the failure.
+GameResult = collections.namedtuple('GameResult', 'number site moves seconds error')
+
+# shards per worker, so that workers that draw quick shards pick up more of them
+SHARDS_PER_WORKER = 4
+
+GAME_START = b'\n[Event '
+
+
+def available_cores():
+    """Returns the number of cores this process may run on."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def shard_offsets(path, shards):
+    """Returns [(offset, length), ...]: up to shards byte ranges covering the file, each starting at a game's '[Event ' line."""
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+
+    with open(path, 'rb') as pgn_f, mmap.mmap(pgn_f.fileno(), 0, access=mmap.ACCESS_READ) as pgn_map:
+        starts = [0]
+        for shard in range(1, shards):
+            start = pgn_map.find(GAME_START, max(size * shard // shards - 1, starts[-1]))
+            if start == -1:
+                break
+            starts.append(start + 1)
+
+    return [(start, end - start) for start, end in zip(starts, starts[1:] + [size])]
+
+
+def replay_game(pgn_game, trusted=False):
+    """Plays each move of a pgn.Game, returning (moves played, error or None).
+
+    trusted replays with Game.trusted set: much faster, for files whose moves are known to be legal."""
+    game = Game()
+    game.trusted = trusted
+    moves = 0
+
+    for move in pgn_game:
+        try:
+            game.move_san(move.sanstr)
+        except Exception as exc:  # pylint: disable=broad-except
+            return moves, f"{move.idx // 2 + 1}{'.' if move.idx % 2 == 0 else '...'} {move.sanstr}: {exc!r}"
+        moves += 1
+
+    return moves, None
+
+
+def game_starts(path, offset, length):
+    """Returns the offset of each game's '[Event ' line in the byte range, which starts at a game."""
+    with open(path, 'rb') as pgn_f, mmap.mmap(pgn_f.fileno(), 0, access=mmap.ACCESS_READ) as pgn_map:
+        starts, pos = [offset], offset
+        while (pos := pgn_map.find(GAME_START, pos, offset + length)) != -1:
+            pos += 1
+            starts.append(pos)
+
+    return starts
+
+
+def replay_shard(path, offset, length, trusted=False):
+    """Returns a GameResult for each game in the byte range, numbered from 0 within the shard. See replay_game().
+
+    A game that can't be read, such as one missing a required header, is a failure like any other, without a site.
+    The parser can't go on past it, so the rest of the shard is parsed again from the next game."""
+    results, starts = [], None
+    pgn_games = pgn.Gamefile(path, offset, length)
+
+    while True:
+        start = time.perf_counter()
+        try:
+            if (pgn_game := next(pgn_games, None)) is None:
+                break
+            moves, error = replay_game(pgn_game, trusted)
+            results.append(GameResult(len(results), pgn_game.metadata.site, moves, time.perf_counter() - start, error))
+        except Exception as exc:  # pylint: disable=broad-except
+            results.append(GameResult(len(results), None, 0, time.perf_counter() - start, f"unreadable game: {exc!r}"))
+            starts = starts or game_starts(path, offset, length)
+            if len(results) >= len(starts):
+                break
+            pgn_games = pgn.Gamefile(path, starts[len(results)], offset + length - starts[len(results)])
+
+    return results
+
+
+def replay(path, workers=None, trusted=False):
+    """Generator that yields a GameResult for each game in the PGN file at path, in file order.
+
+    Shards are replayed by a pool of worker processes, one per available core by default. See replay_game() for trusted."""
+    workers = workers or available_cores()
+    offsets = shard_offsets(path, workers * SHARDS_PER_WORKER)
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(replay_shard, path, offset, length, trusted) for offset, length in offsets]
+
+        number = 0
+        for future in futures:
+            for result in future.result():
+                yield result._replace(number=number)
+                number += 1
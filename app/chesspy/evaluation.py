@@ -0,0 +1,97 @@
+"""Static evaluation: material plus piece-square tables, in centipawns.
+
+Board keeps board.evaluation, the sum of SQUARE_SCORES for its pieces, current as pieces are placed, so
+evaluating a position costs a lookup rather than a pass over 64 squares. Scores are positive when White is
+ahead; evaluate() turns them around for Black.
+"""
+from .color import Color
+
+PIECE_VALUES = {'P': 100, 'N': 320, 'B': 330, 'R': 500, 'Q': 900, 'K': 0}
+
+# Piece-square bonuses for White, laid out as the board is printed: a8 first, h1 last, so that
+# index 8*y + x is the square's index. Black's bonus for a square is White's for the square mirrored across the board.
+PIECE_SQUARE_TABLES = {
+    'P': (
+        0,   0,   0,   0,   0,   0,   0,   0,
+        50,  50,  50,  50,  50,  50,  50,  50,
+        10,  10,  20,  30,  30,  20,  10,  10,
+        5,   5,  10,  25,  25,  10,   5,   5,
+        0,   0,   0,  20,  20,   0,   0,   0,
+        5,  -5, -10,   0,   0, -10,  -5,   5,
+        5,  10,  10, -20, -20,  10,  10,   5,
+        0,   0,   0,   0,   0,   0,   0,   0,
+    ),
+    'N': (
+        -50, -40, -30, -30, -30, -30, -40, -50,
+        -40, -20,   0,   0,   0,   0, -20, -40,
+        -30,   0,  10,  15,  15,  10,   0, -30,
+        -30,   5,  15,  20,  20,  15,   5, -30,
+        -30,   0,  15,  20,  20,  15,   0, -30,
+        -30,   5,  10,  15,  15,  10,   5, -30,
+        -40, -20,   0,   5,   5,   0, -20, -40,
+        -50, -40, -30, -30, -30, -30, -40, -50,
+    ),
+    'B': (
+        -20, -10, -10, -10, -10, -10, -10, -20,
+        -10,   0,   0,   0,   0,   0,   0, -10,
+        -10,   0,   5,  10,  10,   5,   0, -10,
+        -10,   5,   5,  10,  10,   5,   5, -10,
+        -10,   0,  10,  10,  10,  10,   0, -10,
+        -10,  10,  10,  10,  10,  10,  10, -10,
+        -10,   5,   0,   0,   0,   0,   5, -10,
+        -20, -10, -10, -10, -10, -10, -10, -20,
+    ),
+    'R': (
+        0,   0,   0,   0,   0,   0,   0,   0,
+        5,  10,  10,  10,  10,  10,  10,   5,
+        -5,   0,   0,   0,   0,   0,   0,  -5,
+        -5,   0,   0,   0,   0,   0,   0,  -5,
+        -5,   0,   0,   0,   0,   0,   0,  -5,
+        -5,   0,   0,   0,   0,   0,   0,  -5,
+        -5,   0,   0,   0,   0,   0,   0,  -5,
+        0,   0,   0,   5,   5,   0,   0,   0,
+    ),
+    'Q': (
+        -20, -10, -10,  -5,  -5, -10, -10, -20,
+        -10,   0,   0,   0,   0,   0,   0, -10,
+        -10,   0,   5,   5,   5,   5,   0, -10,
+        -5,   0,   5,   5,   5,   5,   0,  -5,
+        0,   0,   5,   5,   5,   5,   0,  -5,
+        -10,   5,   5,   5,   5,   5,   0, -10,
+        -10,   0,   5,   0,   0,   0,   0, -10,
+        -20, -10, -10,  -5,  -5, -10, -10, -20,
+    ),
+    'K': (
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -20, -30, -30, -40, -40, -30, -30, -20,
+        -10, -20, -20, -20, -20, -20, -20, -10,
+        20,  20,   0,   0,   0,   0,  20,  20,
+        20,  30,  10,   0,   0,  10,  30,  20,
+    ),
+}
+
+
+def _square_scores():
+    """Returns {piece: (score on each of the 64 squares)}, with White's pieces positive and Black's negative."""
+    scores = {}
+    for piece, table in PIECE_SQUARE_TABLES.items():
+        scores[piece] = tuple(PIECE_VALUES[piece] + table[sq] for sq in range(64))
+        # sq ^ 56 is sq's mirror across the middle of the board: a8 <-> a1
+        scores[piece.lower()] = tuple(-(PIECE_VALUES[piece] + table[sq ^ 56]) for sq in range(64))
+    return scores
+
+
+SQUARE_SCORES = _square_scores()
+
+
+def squares_score(squares):
+    """Returns the evaluation of a list of 64 squares, as stored in Board.squares, positive if White is ahead."""
+    return sum(SQUARE_SCORES[piece][sq] for sq, piece in enumerate(squares) if piece is not None)
+
+
+def evaluate(board, color):
+    """Returns the evaluation of board in centipawns, positive if color is ahead."""
+    return board.evaluation if color == Color.WHITE else -board.evaluation
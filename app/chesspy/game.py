@@ -1,54 +1,183 @@
 """Implements a Game class encapsulating a Board object and a move engine for the rules of standard chess."""
 # pylint:disable=wrong-import-order
+import re
 import logging
-from . import san
+import collections
+from . import san, zobrist
 from .board import Board
-from .castle import Castle
+from .bitboard import (FILES, RANKS, KNIGHT_ATTACKS, KING_ATTACKS, KNIGHT_COORDS,
+                       lsb, squares_of, rook_attacks, bishop_attacks)
+from .castle import Castle, rights_for, remove_rights
 from .color import Color, colorize, color_of
-from .analyzers import is_in_check, is_in_mate, adjacent_kings
+from .analyzers import analyze, is_in_check, adjacent_kings
+from .trace import TRACE
 
 
-class Game:
+# Everything Game.pop() needs to take back a move: the moving piece, the captured piece and the square it was
+# captured on (which differs from dst for en passant), and the castling rights, en passant square and halfmove clock
+# before the move.
+Undo = collections.namedtuple('Undo', 'src dst piece captured captured_sq castling en_passant halfmove_clock')
+
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+# piece placement, side to move, castling rights, en passant square, and optionally the halfmove clock and fullmove number
+FEN_RE = re.compile(r'(\S+) ([wb]) (K?Q?k?q?|-) ([a-h][36]|-)(?: (\d+) (\d+))?')
+
+
+class Game:  # pylint: disable=too-many-instance-attributes
     """Represents a game of standard chess. Tracks turns, validates moves, analyzes positions.
 
     game = Game()
     game.move_san("e4")  # move White's pawn
     game.move_san("e5")  # move Black's pawn
     game.move_san("Ke4") # illegal move, raises IndexError
+
+    Besides self.turn, tracks self.castling, the castling rights as in FEN (a subset of 'KQkq'),
+    self.en_passant, the index (8*y + x) of the square a pawn skipped over on the last move, or None,
+    and the FEN move clocks: self.halfmove_clock, plies since the last capture or Pawn move, and self.fullmove_number.
+
+    game = Game.from_fen("r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3")
+    game.to_fen()
+
+    Moves executed by push() or make() can be taken back with pop(), so players can try moves in place:
+
+    game.push(san.parse("Nf3", game))
+    game.pop()
+
+    With self.trusted set, move_san() takes the moves of a trusted source such as a lichess export on faith:
+    it finds each move's piece from attack tables, testing for pins only when SAN names more than one candidate,
+    and skips the sanity checks. Moves that can't be played at all still raise IndexError.
     """
-    def __init__(self, board=None, turn=None):
+    def __init__(self, board=None, turn=None, castling=None, en_passant=None):
         self.board = board or Board()
         self.turn = turn or Color.WHITE
+        self.castling = rights_for(self.board) if castling is None else castling
+        self.en_passant = en_passant
         self.over = False
+        self.undo_stack = []
+        self.halfmove_clock, self.fullmove_number = 0, 1
 
         self.assert_check = True
         self.assert_mate = True
+        self.trusted = False
+
+    @classmethod
+    def from_fen(cls, fen):
+        """Returns a new Game in the position of a FEN string. The move clocks may be left off.
+
+        Raises ValueError if fen isn't FEN."""
+        if not (match := FEN_RE.fullmatch(fen.strip())):
+            raise ValueError(f"not FEN: {fen!r}")
+
+        placement, turn, castling, en_passant, halfmove_clock, fullmove_number = match.groups()
+        game = cls(Board.from_fen(placement),
+                   Color.WHITE if turn == 'w' else Color.BLACK,
+                   '' if castling == '-' else castling,
+                   None if en_passant == '-' else 8*san.char_to_y(en_passant[1]) + san.char_to_x(en_passant[0]))
+
+        if halfmove_clock is not None:
+            game.halfmove_clock, game.fullmove_number = int(halfmove_clock), int(fullmove_number)
+        return game
+
+    def to_fen(self):
+        """Returns the position as a FEN string, including castling rights, en passant square and move clocks."""
+        if self.en_passant is None:
+            en_passant = '-'
+        else:
+            y, x = divmod(self.en_passant, 8)
+            en_passant = san.x_to_char(x) + san.y_to_char(y)
 
-    def move_castle(self, mv):
-        """Given a mv for Castling, execute the move on self.board."""
-        assert mv.castle
-        if mv.castle == Castle.KINGSIDE:
-            if self.turn == Color.WHITE:
-                self.board.place_piece_at('K', 7, 6)
-                self.board.place_piece_at('R', 7, 5)
-                self.board.place_piece_at(None, 7, 4)
-                self.board.place_piece_at(None, 7, 7)
-            else:
-                self.board.place_piece_at('k', 0, 6)
-                self.board.place_piece_at('r', 0, 5)
-                self.board.place_piece_at(None, 0, 4)
-                self.board.place_piece_at(None, 0, 7)
-        elif mv.castle == Castle.QUEENSIDE:
-            if self.turn == Color.WHITE:
-                self.board.place_piece_at('K', 7, 2)
-                self.board.place_piece_at('R', 7, 3)
-                self.board.place_piece_at(None, 7, 4)
-                self.board.place_piece_at(None, 7, 0)
-            else:
-                self.board.place_piece_at('k', 0, 2)
-                self.board.place_piece_at('r', 0, 3)
-                self.board.place_piece_at(None, 0, 4)
-                self.board.place_piece_at(None, 0, 0)
+        return (f"{self.board.fen()} {'w' if self.turn == Color.WHITE else 'b'} {self.castling or '-'} {en_passant} "
+                f"{self.halfmove_clock} {self.fullmove_number}")
+
+    @property
+    def zobrist_key(self):
+        """Returns a 64-bit key identifying the position: pieces, side to move, castling rights and en passant file.
+
+        The piece part is maintained incrementally by Board, the rest costs a few lookups."""
+        key = self.board.zobrist_key ^ zobrist.CASTLING[self.castling]
+        if self.turn == Color.BLACK:
+            key ^= zobrist.BLACK_TO_MOVE
+        if self.en_passant is not None:
+            key ^= zobrist.EN_PASSANT_FILE[self.en_passant % 8]
+        return key
+
+    def make(self, src, dst, promotion=None):
+        """Execute the move from square index src to square index dst (8*y + x). Return captured piece, or None.
+
+        A King moving two files castles, a Pawn moving diagonally to an empty square captures en passant.
+        Toggles self.turn and records an Undo on self.undo_stack for pop().
+
+        No rules checking applied, move is assumed to be legal."""
+        board = self.board
+        piece = board.squares[src]
+        captured, captured_sq = board.squares[dst], dst
+        en_passant = None
+
+        if piece in ('P', 'p'):
+            if captured is None and (dst - src) % 8:
+                captured_sq = dst + 8 if piece == 'P' else dst - 8
+                captured = board.squares[captured_sq]
+                board.place_piece_on(None, captured_sq)
+            elif abs(dst - src) == 16:
+                en_passant = (src + dst) // 2
+            if promotion:
+                piece = colorize(promotion, self.turn)
+        elif piece in ('K', 'k') and abs(dst - src) == 2:
+            rook_src, rook_dst = (src + 3, src + 1) if dst > src else (src - 4, src - 1)
+            board.place_piece_on(board.squares[rook_src], rook_dst)
+            board.place_piece_on(None, rook_src)
+
+        self.undo_stack.append(Undo(src, dst, board.squares[src], captured, captured_sq, self.castling, self.en_passant,
+                                    self.halfmove_clock))
+
+        board.place_piece_on(piece, dst)
+        board.place_piece_on(None, src)
+
+        if self.castling:
+            self.castling = remove_rights(self.castling, src, dst)
+        self.en_passant = en_passant
+
+        self.halfmove_clock = 0 if captured is not None or board.squares[dst] in ('P', 'p') or promotion else self.halfmove_clock + 1
+        if self.turn == Color.BLACK:
+            self.fullmove_number += 1
+        self.turn = self.turn.opponent()
+
+        return captured
+
+    def push(self, mv):
+        """Execute the given fully deduced Move, as returned by san.parse(sanstr, game). Return captured piece, or None.
+
+        No rules checking applied, move is assumed to be legal."""
+        if mv.castle:
+            src = 60 if self.turn == Color.WHITE else 4
+            dst = src + 2 if mv.castle == Castle.KINGSIDE else src - 2
+            return self.make(src, dst)
+
+        src, dst = 8*mv.src_y + mv.src_x, 8*mv.dst_y + mv.dst_x
+        assert (self.board.squares[dst] is None) == (mv.capture is False) or mv.en_passant
+
+        return self.make(src, dst, mv.promotion)
+
+    def pop(self):
+        """Take back the last move executed by push() or make(), restoring the board and game state."""
+        src, dst, piece, captured, captured_sq, castling, en_passant, halfmove_clock = self.undo_stack.pop()
+        board = self.board
+
+        board.place_piece_on(None, dst)
+        board.place_piece_on(piece, src)
+        if captured is not None:
+            board.place_piece_on(captured, captured_sq)
+
+        if piece in ('K', 'k') and abs(dst - src) == 2:
+            rook_src, rook_dst = (src + 3, src + 1) if dst > src else (src - 4, src - 1)
+            board.place_piece_on(board.squares[rook_dst], rook_src)
+            board.place_piece_on(None, rook_dst)
+
+        self.castling, self.en_passant, self.halfmove_clock = castling, en_passant, halfmove_clock
+        self.turn = self.turn.opponent()
+        if self.turn == Color.BLACK:
+            self.fullmove_number -= 1
 
     def move_san(self, sanstr):
         """Executes the given SAN move on self.board if move is legal in standard chess.
@@ -59,70 +188,111 @@ class Game:
 
         Returns the opponent's captured piece, or None if no piece was captured.
         Raises IndexError if the move is illegal."""
-        logging.debug("Game::move_san(%s)", sanstr)
+        if TRACE:
+            logging.debug("Game::move_san(%s)", sanstr)
 
         if sanstr in san.RESULT_SAN:
             self.over = True
             return None
 
-        capture = None
+        if self.trusted:
+            parts = san.split(sanstr)
+            capture = self.make(*self.resolve_san(parts))
+            self.over = parts.mate
+            return capture
 
         mv = san.parse(sanstr, self)
-
-        if mv.castle:
-            self.move_castle(mv)
-        else:
-            capture = self.move_move(mv)
-
-        self.turn = Color.toggle(self.turn)
+        capture = self.push(mv)
 
         if mv.mate:
             self.over = True
 
-        # this is a lovely sanity check but it slows us down by about 2.25x
-        # it's also slower on average when mv.check is False, which is most of the time.
-        #
-        if self.assert_check:
-            logging.debug("assert(mv.check == is_in_check(self.board, self.turn))")
-            assert mv.check == is_in_check(self.board, self.turn)
-
-        # this is also a lovely sanity check but it slows us down by [unmeasured, assumed to be lots]
+        # these are lovely sanity checks but they slow us down, even with check and mate analyzed in one pass.
         # currently worth it to generate new unit tests
         #
-        # checkmate = is_in_mate and mv.check
-        # stalemate = is_in_mate and not mv.check
-        if self.assert_mate:
-            logging.debug("assert(mv.mate == is_in_mate(self.board, self.turn))")
-            assert (mv.mate == is_in_mate(self.board, self.turn)) or not mv.check
+        if self.assert_check or self.assert_mate:
+            analysis = analyze(self.board, self.turn, self.en_passant)
+
+            if self.assert_check:
+                if TRACE:
+                    logging.debug("assert(mv.check == analysis.check)")
+                assert mv.check == analysis.check
+
+            if self.assert_mate:
+                if TRACE:
+                    logging.debug("assert(mv.mate == analysis.checkmate)")
+                assert (mv.mate == analysis.checkmate) or not mv.check
 
         assert self.board.square_at(*self.board.king_position(Color.WHITE)) == 'K'
         assert self.board.square_at(*self.board.king_position(Color.BLACK)) == 'k'
 
         return capture
 
-    def move_move(self, mv):
-        """Execute the given move. Return captured piece, or None.
-
-        No rules checking applied, move is assumed to be legal."""
-        piece = self.board.square_at(mv.src_y, mv.src_x)
-        assert piece is not None
-
-        if mv.en_passant:
-            y = mv.dst_y + 1 if self.turn == Color.WHITE else mv.dst_y - 1
-            capture = self.board.square_at(y, mv.dst_x)
-            self.board.place_piece_at(None, y, mv.dst_x)
-        else:
-            capture = self.board.square_at(mv.dst_y, mv.dst_x)
-
-        assert (capture is None) == (mv.capture is False)
-
-        if mv.promotion:
-            piece = colorize(mv.promotion, self.turn)
-
-        self.board.place_piece_at(piece, mv.dst_y, mv.dst_x)
-        self.board.place_piece_at(None, mv.src_y, mv.src_x)
-
-        return capture
+    def resolve_san(self, parts):  # pylint: disable=too-many-branches
+        """Returns (src, dst, promotion), ready for make(), for the SanParts of a move by the side to move.
+
+        Finds the moving piece through attack tables and tests candidates for pins only if there's more than one;
+        a single candidate is trusted to be legal. See self.trusted.
+        Raises IndexError if no piece of the side to move can make the move, or if more than one can."""
+        board, white = self.board, self.turn == Color.WHITE
+
+        if parts.castle:
+            src = 60 if white else 4
+            dst = src + 2 if parts.castle == Castle.KINGSIDE else src - 2
+            right = ('K' if parts.castle == Castle.KINGSIDE else 'Q') if white else ('k' if parts.castle == Castle.KINGSIDE else 'q')
+            if right not in self.castling:
+                raise IndexError(f"no castling right {right!r} in {self.castling!r}")
+            if any(board.squares[sq] for sq in (range(src + 1, src + 3) if dst > src else range(src - 3, src))):
+                raise IndexError("castling through a piece")
+            return src, dst, None
+
+        dst = parts.dst
+        if (parts.capture != (board.squares[dst] is not None)) and not (parts.piece == 'P' and dst == self.en_passant):
+            raise IndexError(f"capture is {parts.capture} but {board.squares[dst]!r} is on the destination square")
+
+        piece = parts.piece if white else parts.piece.lower()
+        if parts.piece == 'P':
+            forward = -8 if white else 8
+            if parts.capture:
+                if parts.src_x is None or abs(parts.src_x - dst % 8) != 1:
+                    raise IndexError(f"no {piece} can capture on {dst}")
+                src = dst - forward + parts.src_x - dst % 8
+            elif board.squares[src := dst - forward] is None and dst >> 3 == (4 if white else 3):
+                src -= forward  # two squares from the starting rank
+            if board.squares[src] != piece or (dst >> 3 in (0, 7)) != (parts.promotion is not None):
+                raise IndexError(f"no {piece} can move to {dst}")
+            return src, dst, parts.promotion
+
+        occupied = board.occupancy[Color.WHITE] | board.occupancy[Color.BLACK]
+        match parts.piece:
+            case 'N':
+                candidates = KNIGHT_ATTACKS[dst]
+            case 'B':
+                candidates = bishop_attacks(dst, occupied)
+            case 'R':
+                candidates = rook_attacks(dst, occupied)
+            case 'Q':
+                candidates = bishop_attacks(dst, occupied) | rook_attacks(dst, occupied)
+            case _:
+                candidates = KING_ATTACKS[dst]
+        candidates &= board.bitboards[piece]
+
+        if parts.src_x is not None:
+            candidates &= FILES[parts.src_x]
+        if parts.src_y is not None:
+            candidates &= RANKS[parts.src_y]
+
+        if candidates & (candidates - 1):
+            # SAN only disambiguates between legal moves, so all but one of the candidates must be pinned
+            king_sq = lsb(board.bitboards['K' if white else 'k'])
+            for src in squares_of(candidates):
+                after = (occupied ^ (1 << src)) | (1 << dst)
+                if board.attackers_of_square(king_sq, self.turn.opponent(), after) & ~(1 << dst):
+                    candidates ^= 1 << src
+
+        if not candidates or candidates & (candidates - 1):
+            raise IndexError(f"{bin(candidates).count('1')} {piece} can move to {dst}")
+        return lsb(candidates), dst, None
 
     def test_move_from_src(self, y, x, mv):
         """Validates move of piece at (y, x) to (mv.dst_y, mv.dst_x) against rules of standard chess.
@@ -136,7 +306,8 @@ class Game:
 
         # this logically necessary but unoptimized check slows us down by about 2x
         #
-        logging.debug("test_move_from_src(%s, %s, %r)", y, x, mv)
+        if TRACE:
+            logging.debug("test_move_from_src(%s, %s, %r)", y, x, mv)
 
         assert not mv.castle
         assert not mv.en_passant
@@ -147,7 +318,8 @@ class Game:
         self.board.place_piece_at(old_src, mv.dst_y, mv.dst_x)
         self.board.place_piece_at(None, y, x)
 
-        logging.debug("if not is_in_check(self.board, self.turn) and not adjacent_kings(self.board):")
+        if TRACE:
+            logging.debug("if not is_in_check(self.board, self.turn) and not adjacent_kings(self.board):")
         if not is_in_check(self.board, self.turn) and not adjacent_kings(self.board):
             mv.src_y, mv.src_x = y, x
             result = True
@@ -155,7 +327,8 @@ class Game:
         self.board.place_piece_at(old_dst, mv.dst_y, mv.dst_x)
         self.board.place_piece_at(old_src, y, x)
 
-        logging.debug("test_move_from_src() -> %s", result)
+        if TRACE:
+            logging.debug("test_move_from_src() -> %s", result)
         return result
 
     def deduce_src_knight(self, mv):
@@ -165,19 +338,15 @@ class Game:
 
             Caller must determine if yielded move exposes player to check (and is therefore illegal)."""
             p_src = colorize('N', self.turn)
-            offsets_y = (-1, -1,  1, 1, -2, -2,  2, 2)
-            offsets_x = (-2,  2, -2, 2, -1,  1, -1, 1)
-
-            for (offset_y, offset_x) in zip(offsets_y, offsets_x):
-                src_y, src_x = mv.dst_y + offset_y, mv.dst_x + offset_x
 
+            for src_y, src_x in KNIGHT_COORDS[8*mv.dst_y + mv.dst_x]:
                 if (mv.src_y is not None and src_y != mv.src_y) or (mv.src_x is not None and src_x != mv.src_x):
                     continue
 
-                if 0 <= src_y < 8 and 0 <= src_x < 8:
-                    if self.board.square_at(src_y, src_x) == p_src:
+                if self.board.squares[8*src_y + src_x] == p_src:
+                    if TRACE:
                         logging.debug("deduce_src_knight(%r): yield (%s, %s)", mv, src_y, src_x)
-                        yield src_y, src_x
+                    yield src_y, src_x
 
         for (y, x) in knight_sources():
             if self.test_move_from_src(y, x, mv):
@@ -251,17 +420,19 @@ class Game:
                     mv.src_y, mv.src_x = ahead_of(mv.dst_y), mv.dst_x + 1
             elif p_dst is None:  # en passant?
 
-                logging.debug("%s : %s : %s : %s : %s",
-                              behind(mv.dst_y),
-                              self.board.square_at(behind(mv.dst_y), mv.dst_x),
-                              colorize('P', self.turn.opponent),
-                              self.board.square_at(ahead_of(mv.dst_y), mv.dst_x),
-                              self.turn.opponent())
+                if TRACE:
+                    logging.debug("%s : %s : %s : %s : %s",
+                                  behind(mv.dst_y),
+                                  self.board.square_at(behind(mv.dst_y), mv.dst_x),
+                                  colorize('P', self.turn.opponent()),
+                                  self.board.square_at(ahead_of(mv.dst_y), mv.dst_x),
+                                  self.turn.opponent())
 
                 if (p := self.board.square_at(ahead_of(mv.dst_y), mv.dst_x)) and \
                         p == colorize('P', self.turn.opponent()) and \
                         self.board.square_at(behind(mv.dst_y), mv.dst_x) is None:
-                    logging.debug("ep-0")
+                    if TRACE:
+                        logging.debug("ep-0")
                     if mv.src_x and self.board.square_at(ahead_of(mv.dst_y), mv.src_x) == p_src:
                         mv.src_y = ahead_of(mv.dst_y)
                         mv.en_passant = True
@@ -291,7 +462,8 @@ class Game:
         """
         if (p := self.board.square_at(mv.dst_y, mv.dst_x)) and color_of(p) == self.turn:
             # can't land on our own piece
-            logging.debug("Can't land on our own piece: (%s, %s) : %s / %s", mv.dst_y, mv.dst_x, p, self.turn)
+            if TRACE:
+                logging.debug("Can't land on our own piece: (%s, %s) : %s / %s", mv.dst_y, mv.dst_x, p, self.turn)
             raise IndexError
 
         match mv.piece:
@@ -1,6 +1,29 @@
 """Implements a class representing chess moves."""
 import logging
 from .board import Pos
+from .castle import Castle
+from .trace import TRACE
+
+# A move can also be packed into an int, for engine code that handles many moves and needs none of Move's checks:
+# bits 0-5 are src and 6-11 dst, as square indices 8*y + x, 12-14 the promotion, 15-17 the piece, then flags.
+PROMOTIONS = (None, 'Q', 'R', 'B', 'N')
+PIECES = ('P', 'N', 'B', 'R', 'Q', 'K')
+CAPTURE, EN_PASSANT, KINGSIDE, QUEENSIDE, CHECK, MATE = (1 << bit for bit in range(18, 24))
+
+
+def pack(src, dst, promotion=None, piece='P', flags=0):
+    """Returns a move as an int. flags are CAPTURE, EN_PASSANT, KINGSIDE, QUEENSIDE, CHECK and MATE, or'ed together."""
+    return src | dst << 6 | PROMOTIONS.index(promotion) << 12 | PIECES.index(piece) << 15 | flags
+
+
+def unpack(packed):
+    """Returns a packed move as a (src, dst, promotion) tuple, as used by move_generators, search and Game.make()."""
+    return packed & 63, (packed >> 6) & 63, PROMOTIONS[(packed >> 12) & 7]
+
+
+def piece_of(packed):
+    """Returns the piece of a packed move: 'P', 'N', 'B', 'R', 'Q' or 'K', for either color."""
+    return PIECES[(packed >> 15) & 7]
 
 
 # pylint: disable=too-many-instance-attributes
@@ -27,7 +50,8 @@ class Move:
 
         if getattr(self, name) not in (None, value):
             if getattr(self, name):
-                logging.debug("%s != %s", getattr(self, name), value)
+                if TRACE:
+                    logging.debug("%s != %s", getattr(self, name), value)
             raise IndexError
 
         return super().__setattr__(name, value)
@@ -55,3 +79,27 @@ class Move:
     def src(self):
         """Returns Pos(y, x) coordinates for move source."""
         return Pos(self.src_y, self.src_x)
+
+    def pack(self):
+        """Returns this Move as an int, see pack(). src and dst must be set, which san.parse() leaves undone for castling."""
+        flags = ((CAPTURE if self.capture else 0)
+                 | (EN_PASSANT if self.en_passant else 0)
+                 | (KINGSIDE if self.castle == Castle.KINGSIDE else QUEENSIDE if self.castle == Castle.QUEENSIDE else 0)
+                 | (CHECK if self.check else 0)
+                 | (MATE if self.mate else 0))
+        return pack(8*self.src_y + self.src_x, 8*self.dst_y + self.dst_x, self.promotion, self.piece or 'P', flags)
+
+    @classmethod
+    def from_packed(cls, packed):
+        """Returns a Move for a packed move. Takes packed's word for it: none of the checks of setting fields apply."""
+        mv = cls()
+        mv.__dict__.update(src_y=(packed & 63) >> 3, src_x=packed & 7,
+                           dst_y=(packed >> 9) & 7, dst_x=(packed >> 6) & 7,
+                           piece=PIECES[(packed >> 15) & 7],
+                           promotion=PROMOTIONS[(packed >> 12) & 7],
+                           capture=bool(packed & CAPTURE),
+                           en_passant=bool(packed & EN_PASSANT),
+                           castle=Castle.KINGSIDE if packed & KINGSIDE else Castle.QUEENSIDE if packed & QUEENSIDE else False,
+                           check=bool(packed & CHECK),
+                           mate=bool(packed & MATE))
+        return mv
@@ -1,7 +1,20 @@
 """Move Generators generate lists of legal moves for pieces on a Board."""
 import itertools
 from .board import in_bounds
+from .move import pack, CAPTURE, EN_PASSANT, KINGSIDE, QUEENSIDE
 from .color import Color, color_of
+from .bitboard import (FULL, RANKS, KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, BETWEEN, LINE,
+                       KNIGHT_COORDS, KING_COORDS, RAY_COORDS, lsb, squares_of, rook_attacks, bishop_attacks)
+
+PROMOTIONS = ('Q', 'R', 'B', 'N')
+
+# castling right -> (King src, King dst, squares that must be empty, squares the King must not be attacked on)
+CASTLING_MOVES = {
+    'K': (60, 62, (61, 62), (61, 62)),
+    'Q': (60, 58, (57, 58, 59), (58, 59)),
+    'k': (4, 6, (5, 6), (5, 6)),
+    'q': (4, 2, (1, 2, 3), (2, 3)),
+}
 
 
 def moves_for(y, x, board):
@@ -29,7 +42,7 @@ def moves_for(y, x, board):
 def collision(y, x, piece, board):
     """Returns True if (y, x) on board contains a piece of the same color as piece."""
 
-    if (p := board.square_at(y, x)):
+    if (p := board.squares[8*y + x]):
         return 'blocked' if (color_of(p) == color_of(piece) or p in ('k', 'K')) else 'capture'
     return False
 
@@ -68,17 +81,9 @@ def knight_moves_for(y, x, board):
     knight = board.square_at(y, x)
     assert knight.upper() == 'N'
 
-    offsets_y = (-1, -1,  1, 1, -2, -2,  2, 2)
-    offsets_x = (-2,  2, -2, 2, -1,  1, -1, 1)
-
-    for (offset_y, offset_x) in zip(offsets_y, offsets_x):
-        dst_y, dst_x = y+offset_y, x+offset_x
-        if in_bounds(dst_y, dst_x):
-            match collision(dst_y, dst_x, knight, board):
-                case 'blocked':
-                    pass
-                case _:
-                    yield (dst_y, dst_x)
+    for dst in KNIGHT_COORDS[8*y + x]:
+        if collision(*dst, knight, board) != 'blocked':
+            yield dst
 
 
 def king_moves_for(y, x, board):
@@ -86,40 +91,31 @@ def king_moves_for(y, x, board):
     king = board.square_at(y, x)
     assert king.upper() == 'K'
 
-    for dst_y in range(y-1, y+2):
-        for dst_x in range(x-1, x+2):
-            if in_bounds(dst_y, dst_x) and (dst_y, dst_x) != (y, x):
-                match collision(dst_y, dst_x, king, board):
-                    case 'blocked':
-                        pass
-                    case _:
-                        yield (dst_y, dst_x)
+    for dst in KING_COORDS[8*y + x]:
+        if collision(*dst, king, board) != 'blocked':
+            yield dst
 
 
-def rook_moves_for(y, x, board, piece='R'):
-    """Yields legal moves for the Rook-like piece at (y, x) on the given board."""
-    rook = board.square_at(y, x)
-    assert rook.upper() == piece
-
-    for the_range in (range(y+1, 8), range(y-1, -1, -1)):
-        for dst_y in the_range:
-            match collision(dst_y, x, rook, board):
+def ray_moves_for(y, x, board, directions):
+    """Yields moves along each direction from (y, x), up to and including a capture, for the sliding piece at (y, x)."""
+    piece = board.squares[8*y + x]
+    for direction in directions:
+        for dst in RAY_COORDS[direction][8*y + x]:
+            match collision(*dst, piece, board):
                 case 'capture':
-                    yield (dst_y, x)
+                    yield dst
                     break
                 case 'blocked':
                     break
-            yield (dst_y, x)
+            yield dst
 
-    for the_range in (range(x+1, 8), range(x-1, -1, -1)):
-        for dst_x in the_range:
-            match collision(y, dst_x, rook, board):
-                case 'capture':
-                    yield (y, dst_x)
-                    break
-                case 'blocked':
-                    break
-            yield (y, dst_x)
+
+def rook_moves_for(y, x, board, piece='R'):
+    """Yields legal moves for the Rook-like piece at (y, x) on the given board."""
+    rook = board.square_at(y, x)
+    assert rook.upper() == piece
+
+    return ray_moves_for(y, x, board, ((1, 0), (-1, 0), (0, 1), (0, -1)))
 
 
 def bishop_moves_for(y, x, board, piece='B'):
@@ -127,17 +123,142 @@ def bishop_moves_for(y, x, board, piece='B'):
     bishop = board.square_at(y, x)
     assert bishop.upper() == piece
 
-    incrementors = ((-1, -1), (1, 1), (1, -1), (-1, 1),)
-
-    for incs in incrementors:
-        dst_y, dst_x = y, x
-        while in_bounds(dst_y, dst_x):
-            if (dst_y, dst_x) != (y, x):
-                match collision(dst_y, dst_x, bishop, board):
-                    case 'capture':
-                        yield (dst_y, dst_x)
-                        break
-                    case 'blocked':
-                        break
-                yield (dst_y, dst_x)
-            dst_y, dst_x = dst_y - incs[0], dst_x - incs[1]
+    return ray_moves_for(y, x, board, ((1, 1), (-1, -1), (-1, 1), (1, -1)))
+
+
+def legal_moves(game):
+    """Returns a list of every legal move for the side to move in game, as (src, dst, promotion) tuples.
+
+    src and dst are square indices, 8*y + x. promotion is None, or 'Q', 'R', 'B' or 'N' for each of the four
+    moves of a Pawn reaching the last rank. Includes castling (the King moving two files) and en passant.
+    The result can be executed with game.make(*move).
+    """
+    return list(iter_legal_moves(game.board, game.turn, game.castling, game.en_passant))
+
+
+def packed_moves(game):
+    """Returns a list of every legal move for the side to move in game, packed into ints by move.pack().
+
+    The same moves as legal_moves(), with the moving piece and the capture, en passant and castling flags."""
+    squares, moves = game.board.squares, []
+
+    for src, dst, promotion in iter_legal_moves(game.board, game.turn, game.castling, game.en_passant):
+        piece = squares[src].upper()
+        if squares[dst] is not None:
+            flags = CAPTURE
+        elif piece == 'P' and (dst - src) % 8:
+            flags = CAPTURE | EN_PASSANT
+        elif piece == 'K' and abs(dst - src) == 2:
+            flags = KINGSIDE if dst > src else QUEENSIDE
+        else:
+            flags = 0
+        moves.append(pack(src, dst, promotion, piece, flags))
+
+    return moves
+
+
+def capture_moves(game):
+    """Returns the legal captures and promotions for the side to move in game, as (src, dst, promotion) tuples.
+
+    En passant is a capture. These are the moves a quiescence search plays out before evaluating a position."""
+    return list(iter_legal_moves(game.board, game.turn, '', game.en_passant, captures_only=True))
+
+
+def iter_legal_moves(  # pylint:disable=too-many-locals,too-many-branches,too-many-statements,too-many-positional-arguments
+        board, color, castling='', en_passant=None, checkers=None, captures_only=False):  # pylint:disable=too-many-arguments
+    """Yields every legal move for color on board as (src, dst, promotion) tuples. See legal_moves().
+
+    Finds the pieces checking color's King and the pieces pinned to it once, up front, so no move has to be
+    played to learn whether it exposes the King. Moves are yielded lazily, King moves first, so a caller
+    looking for any legal move at all can stop at the first one.
+
+    checkers, the bitboard of pieces checking color's King, may be passed in by a caller that already has it.
+    With captures_only, only captures, en passant and promotions are yielded.
+    """
+    bbs = board.bitboards
+    opponent = color.opponent()
+    ours, theirs = board.occupancy[color], board.occupancy[opponent]
+    occupied = ours | theirs
+
+    if color == Color.WHITE:
+        pawn, knight, bishop, rook, queen, king = 'P', 'N', 'B', 'R', 'Q', 'K'
+        their_bishops, their_rooks, their_king = bbs['b'] | bbs['q'], bbs['r'] | bbs['q'], bbs['k']
+        forward, start_rank, last_rank, rights = -8, 6, 0, 'KQ'
+    else:
+        pawn, knight, bishop, rook, queen, king = 'p', 'n', 'b', 'r', 'q', 'k'
+        their_bishops, their_rooks, their_king = bbs['B'] | bbs['Q'], bbs['R'] | bbs['Q'], bbs['K']
+        forward, start_rank, last_rank, rights = 8, 1, 7, 'kq'
+
+    king_sq = lsb(bbs[king])
+    # capturing the opponent's King is never a move: positions where it could be are already lost
+    capturable = ~(ours | their_king) & (theirs if captures_only else FULL)
+
+    # the King may not step onto an attacked square; lift it off the board so sliders see through its square
+    without_king = occupied ^ (1 << king_sq)
+    for dst in squares_of(KING_ATTACKS[king_sq] & capturable):
+        if not board.attackers_of_square(dst, opponent, without_king):
+            yield king_sq, dst, None
+
+    if checkers is None:
+        checkers = board.attackers_of_square(king_sq, opponent, occupied)
+    if checkers & (checkers - 1):
+        return  # double check: only the King can move
+
+    # other pieces must capture the checker or block its line to the King
+    targets = (checkers | BETWEEN[king_sq][lsb(checkers)]) if checkers else FULL
+    # a Pawn may also push to an empty square, which is a promotion when only captures are wanted
+    push_targets = targets & (RANKS[last_rank] if captures_only else FULL)
+    targets &= capturable
+
+    pins = {}
+    snipers = (rook_attacks(king_sq, theirs) & their_rooks) | (bishop_attacks(king_sq, theirs) & their_bishops)
+    for sniper in squares_of(snipers):
+        blockers = BETWEEN[king_sq][sniper] & occupied
+        if blockers & ours and not blockers & (blockers - 1):
+            pins[lsb(blockers)] = LINE[king_sq][sniper]
+
+    for src in squares_of(bbs[knight]):
+        if src not in pins:
+            for dst in squares_of(KNIGHT_ATTACKS[src] & targets):
+                yield src, dst, None
+
+    for src in squares_of(bbs[bishop] | bbs[queen]):
+        for dst in squares_of(bishop_attacks(src, occupied) & targets & pins.get(src, FULL)):
+            yield src, dst, None
+
+    for src in squares_of(bbs[rook] | bbs[queen]):
+        for dst in squares_of(rook_attacks(src, occupied) & targets & pins.get(src, FULL)):
+            yield src, dst, None
+
+    for src in squares_of(bbs[pawn]):
+        pin = pins.get(src, FULL)
+        dsts = PAWN_ATTACKS[color][src] & theirs & targets & pin
+
+        if 0 <= (one := src + forward) < 64 and not occupied & (1 << one):
+            dsts |= (1 << one) & push_targets & pin
+            if src >> 3 == start_rank and not occupied & (1 << (two := one + forward)):
+                dsts |= (1 << two) & push_targets & pin
+
+        for dst in squares_of(dsts):
+            if dst >> 3 == last_rank:
+                for promotion in PROMOTIONS:
+                    yield src, dst, promotion
+            else:
+                yield src, dst, None
+
+        if en_passant is not None and PAWN_ATTACKS[color][src] & (1 << en_passant):
+            # removes two pieces from a rank at once, so rather than reason about pins, look at the result
+            captured = en_passant - forward
+            after = (occupied ^ (1 << src) ^ (1 << captured)) | (1 << en_passant)
+            if not board.attackers_of_square(king_sq, opponent, after) & ~(1 << captured):
+                yield src, en_passant, None
+
+    if castling and not checkers and not captures_only:
+        for right in castling:
+            if right not in rights:
+                continue
+            king_src, king_dst, empty, safe = CASTLING_MOVES[right]
+            if king_src == king_sq and board.squares[king_dst + (1 if king_dst > king_src else -2)] == rook \
+                    and not any(occupied & (1 << sq) for sq in empty) \
+                    and not any(board.attackers_of_square(sq, opponent, occupied) for sq in safe):
+                yield king_src, king_dst, None
@@ -0,0 +1,122 @@
+"""Perft: counts the leaf nodes of the legal move tree, to verify move generation and measure its speed.
+
+Node counts for the reference positions are published, for example at https://www.chessprogramming.org/Perft_Results,
+so any difference points at a bug in move generation or in Game.make()/Game.pop().
+
+for result in perft.run_suite(depth=3):
+    print(result)
+"""
+import time
+import collections
+from .game import Game
+from .san import x_to_char, y_to_char
+from .move_generators import legal_moves
+
+# fen is the position as a FEN string, counts maps depth -> expected leaf nodes
+Position = collections.namedtuple('Position', 'name fen counts')
+
+# Result of perft on one Position at one depth. expected is None if the count isn't known.
+Result = collections.namedtuple('Result', 'name depth nodes expected seconds')
+
+POSITIONS = (
+    Position('start', 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+             {1: 20, 2: 400, 3: 8902, 4: 197281, 5: 4865609}),
+    Position('kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+             {1: 48, 2: 2039, 3: 97862, 4: 4085603}),
+    Position('position3', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+             {1: 14, 2: 191, 3: 2812, 4: 43238, 5: 674624}),
+    Position('position4', 'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+             {1: 6, 2: 264, 3: 9467, 4: 422333}),
+    Position('position5', 'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+             {1: 44, 2: 1486, 3: 62379, 4: 2103487}),
+    Position('position6', 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+             {1: 46, 2: 2079, 3: 89890, 4: 3894594}),
+    # en passant, castling and promotion edge cases
+    Position('illegal_ep_1', '3k4/3p4/8/K1P4r/8/8/8/8 b - - 0 1',
+             {1: 18, 2: 92, 3: 1670, 6: 1134888}),
+    Position('illegal_ep_2', '8/8/4k3/8/2p5/8/B2P2K1/8 w - - 0 1',
+             {1: 13, 2: 102, 3: 1266, 6: 1015133}),
+    Position('ep_gives_check', '8/8/1k6/2b5/2pP4/8/5K2/8 b - d3 0 1',
+             {1: 15, 2: 126, 3: 1928, 6: 1440467}),
+    Position('short_castle_check', '5k2/8/8/8/8/8/8/4K2R w K - 0 1',
+             {1: 15, 2: 66, 3: 1198, 6: 661072}),
+    Position('long_castle_check', '3k4/8/8/8/8/8/8/R3K3 w Q - 0 1',
+             {1: 16, 2: 71, 3: 1286, 6: 803711}),
+    Position('castle_rights', 'r3k2r/1b4bq/8/8/8/8/7B/R3K2R w KQkq - 0 1',
+             {1: 26, 2: 1141, 3: 27826, 4: 1274206}),
+    Position('castle_prevented', 'r3k2r/8/3Q4/8/8/5q2/8/R3K2R b KQkq - 0 1',
+             {1: 44, 2: 1494, 3: 50509, 4: 1720476}),
+    Position('promote_out_of_check', '2K2r2/4P3/8/8/8/8/8/3k4 w - - 0 1',
+             {1: 11, 2: 133, 3: 1442, 6: 3821001}),
+    Position('discovered_check', '8/8/1P2K3/8/2n5/1q6/8/5k2 b - - 0 1',
+             {1: 29, 2: 165, 3: 5160, 5: 1004658}),
+    Position('promote_gives_check', '4k3/1P6/8/8/8/8/K7/8 w - - 0 1',
+             {1: 9, 2: 40, 3: 472, 6: 217342}),
+    Position('underpromote_check', '8/P1k5/K7/8/8/8/8/8 w - - 0 1',
+             {1: 6, 2: 27, 3: 273, 6: 92683}),
+    Position('self_stalemate', 'K1k5/8/P7/8/8/8/8/8 w - - 0 1',
+             {1: 2, 2: 6, 3: 13, 6: 2217}),
+    Position('stalemate_checkmate_1', '8/k1P5/8/1K6/8/8/8/8 w - - 0 1',
+             {1: 10, 2: 25, 3: 268, 7: 567584}),
+    Position('stalemate_checkmate_2', '8/8/2k5/5q2/5n2/8/5K2/8 b - - 0 1',
+             {1: 37, 2: 183, 3: 6559, 4: 23527}),
+)
+
+
+def perft(game, depth):
+    """Returns the number of leaf nodes of the legal move tree of the given depth below game's position.
+
+    game is unaltered upon return but is altered during perft() execution."""
+    if depth == 0:
+        return 1
+
+    moves = legal_moves(game)
+    if depth == 1:
+        return len(moves)
+
+    nodes = 0
+    for move in moves:
+        game.make(*move)
+        nodes += perft(game, depth - 1)
+        game.pop()
+
+    return nodes
+
+
+def divide(game, depth):
+    """Returns [(move, nodes), ...]: perft(depth - 1) below each legal move, with moves written like 'e2e4' or 'e7e8q'.
+
+    Comparing a divide against another engine's narrows a wrong perft() down to the moves that disagree."""
+    counts = []
+    for move in legal_moves(game):
+        game.make(*move)
+        counts.append((move_str(*move), perft(game, depth - 1)))
+        game.pop()
+
+    return counts
+
+
+def move_str(src, dst, promotion=None):
+    """Returns a move in long algebraic notation, as used by perft divide tools: 'e2e4', 'e7e8q'."""
+    src_y, src_x = divmod(src, 8)
+    dst_y, dst_x = divmod(dst, 8)
+    promotion = promotion.lower() if promotion else ''
+    return f"{x_to_char(src_x)}{y_to_char(src_y)}{x_to_char(dst_x)}{y_to_char(dst_y)}{promotion}"
+
+
+def position_game(position):
+    """Returns a new Game set up at the given Position."""
+    return Game.from_fen(position.fen)
+
+
+def run_suite(depth, positions=POSITIONS):
+    """Yields a Result for each Position, searched to depth, or to its deepest known count if that's shallower."""
+    for position in positions:
+        position_depth = min(depth, max(position.counts))
+        game = position_game(position)
+
+        start = time.perf_counter()
+        nodes = perft(game, position_depth)
+        seconds = time.perf_counter() - start
+
+        yield Result(position.name, position_depth, nodes, position.counts.get(position_depth), seconds)
@@ -1,33 +1,83 @@
 """Simple parser for PGN files."""
+import os
+import re
+import json
+import mmap
 import logging
 import datetime
 from . import san
 import collections  # pylint: disable=wrong-import-order
+from .trace import TRACE
 
 NEW_GAME_TOKEN = 42
 GAME_OVER_TOKEN = 19860718
 
+# bytes read from a PGN file at a time
+CHUNK_SIZE = 1 << 16
+
+# A game's PGN headers, see normalize_metadata()
+Metadata = collections.namedtuple("Metadata", "event site date white black result opening annotator")
+
+# a header line, e.g. [White "Adolf Anderssen"]. Starts with a literal so that the regex engine skips ahead to each '['.
+HEADER_START_RE = re.compile(rb'\[\w+[ \t]+"')
+HEADER_RE = re.compile(r'\[(\w+)[ \t]+"(.*)"\]')
+# the end of a line that is not followed by another header line
+HEADERS_END_RE = re.compile(rb'\n(?![ \t]*\[)')
+NON_SPACE_RE = re.compile(rb'\S')
+NEWLINE = ord('\n')
+
+
+def iter_tokens(pgn_f, chunk_size=CHUNK_SIZE, length=None):
+    """Generator that yields the whitespace separated tokens of a binary file, reading chunk_size bytes at a time.
+
+    Reads at most length bytes from pgn_f's current position if length is given. Only one chunk is held in memory,
+    however large the file."""
+    remaining = length
+    partial = b''
+    while chunk := pgn_f.read(chunk_size if remaining is None else min(chunk_size, remaining)):
+        if remaining is not None:
+            remaining -= len(chunk)
+
+        tokens = (partial + chunk).split()
+        # a token running up to the end of the chunk may continue in the next one
+        partial = tokens.pop() if tokens and not chunk[-1:].isspace() else b''
+        for token in tokens:
+            yield token.decode('utf-8')
+
+    if partial:
+        yield partial.decode('utf-8')
+
+
+def read_tokens(path, offset=0, length=None):
+    """Generator that yields the tokens of the PGN file at path, or of length bytes of it starting at offset."""
+    with open(path, 'rb') as pgn_f:
+        pgn_f.seek(offset)
+        yield from iter_tokens(pgn_f, length=length)
+
 
 def pgn_parser(tokens):  # pylint: disable=too-many-branches,too-many-statements
-    """Generator that yields SAN strings and special markers given a list of PGN file tokens.
+    """Generator that yields SAN strings and special markers given an iterable of PGN file tokens.
 
     Yields NEW_GAME_TOKEN at the beginning of a game, GAME_OVER_TOKEN at the end, otherwise SAN strings."""
-    idx, end = 0, len(tokens)
+    tokens = iter(tokens)
+    token = next(tokens, None)
 
-    while idx < end:
+    while token is not None:
         move_idx = 1
         new_game = True
         metadata_line = None
         metadata = {}
 
-        logging.debug("consuming until first move.")
+        if TRACE:
+            logging.debug("consuming until first move.")
 
-        while idx < end and tokens[idx] != '1.' and tokens[idx] not in san.RESULT_SAN:
-            logging.debug(" consuming: |%s| (%s)", tokens[idx], metadata_line)
-            if tokens[idx].startswith('['):
-                metadata_line = tokens[idx]
-            elif metadata_line and tokens[idx].endswith(']'):
-                metadata_line += tokens[idx]
+        while token is not None and token != '1.' and token not in san.RESULT_SAN:
+            if TRACE:
+                logging.debug(" consuming: |%s| (%s)", token, metadata_line)
+            if token.startswith('['):
+                metadata_line = token
+            elif metadata_line and token.endswith(']'):
+                metadata_line += token
                 key, value = metadata_line.split('"', 1)
                 key, value = key[1:], value[:-2]
 
@@ -35,56 +85,63 @@ def pgn_parser(tokens):  # pylint: disable=too-many-branches,too-many-statements
 
                 metadata_line = None
             elif metadata_line:
-                metadata_line += tokens[idx] + ' '
+                metadata_line += token + ' '
 
-            idx += 1
+            token = next(tokens, None)
 
-        while idx < end:
-            token = tokens[idx]
-            idx += 1
+        while token is not None:
+            current, token = token, next(tokens, None)
 
-            if token.startswith("{"):
+            if current.startswith("{"):
                 # PGN comments do not nest
-                logging.debug("consuming comment")
-                while idx < end and not tokens[idx].endswith('}'):
-                    # logging.debug("  nom: |%s|", tokens[idx])
-                    idx += 1
-                idx += 1
+                if TRACE:
+                    logging.debug("consuming comment")
+                while token is not None and not token.endswith('}'):
+                    # logging.debug("  nom: |%s|", token)
+                    token = next(tokens, None)
+                token = next(tokens, None)
                 continue  # let the while condition check if we're done
 
-            if token.startswith("("):
+            if current.startswith("("):
                 # nobody says PGN annotations can't nest, so they apparently can and do
                 count = 1
-                logging.debug("consuming annotation from |%s| |%s|", token, tokens[idx])
-                while idx < end and count > 0:
-                    if tokens[idx].startswith('('):
+                if TRACE:
+                    logging.debug("consuming annotation from |%s| |%s|", current, token)
+                while token is not None and count > 0:
+                    if token.startswith('('):
                         count += 1
-                    elif tokens[idx].endswith(')'):
+                    elif token.endswith(')'):
                         count -= 1
-                    idx += 1
+                    token = next(tokens, None)
                 continue  # let the while condition check if we're done
 
-            logging.debug("move_idx: %d", move_idx)
+            if TRACE:
+                logging.debug("move_idx: %d", move_idx)
 
-            if token == f"{move_idx}.":
-                logging.debug("move_idx += 1")
+            if current == f"{move_idx}.":
+                if TRACE:
+                    logging.debug("move_idx += 1")
                 move_idx += 1
-            elif token == f"{move_idx-1}...":
-                logging.debug("consuming [%s]", token)
+            elif current == f"{move_idx-1}...":
+                if TRACE:
+                    logging.debug("consuming [%s]", current)
             else:
                 if new_game:
                     new_game = False
-                    logging.debug("yielding NEW_GAME_TOKEN")
-                    logging.debug("metadata: %r", metadata)
+                    if TRACE:
+                        logging.debug("yielding NEW_GAME_TOKEN")
+                        logging.debug("metadata: %r", metadata)
                     yield NEW_GAME_TOKEN
                     yield metadata
 
-                logging.debug("yielding [%s] for %d", token, move_idx)
-                yield token
-                if token in san.RESULT_SAN:
+                if TRACE:
+                    logging.debug("yielding [%s] for %d", current, move_idx)
+                yield current
+                if current in san.RESULT_SAN:
                     yield GAME_OVER_TOKEN
 
-                    logging.debug("break due to endgame")
+                    if TRACE:
+                        logging.debug("break due to endgame")
                     break
 
 
@@ -98,8 +155,6 @@ def normalize_metadata(meta_dict):
         except (TypeError, ValueError):
             date = None
 
-    Metadata = collections.namedtuple("Metadata", "event site date white black result opening annotator")
-
     return Metadata(event=meta_dict['Event'],
                     site=meta_dict['Site'],
                     date=date,
@@ -110,6 +165,66 @@ def normalize_metadata(meta_dict):
                     annotator=meta_dict.get('Annotator', None))
 
 
+def iter_headers(pgn_map):
+    """Generator that yields (offset, {header: value}) for each game in a bytes-like PGN file, such as an mmap.
+
+    Only header lines are decoded: movetext is skipped by the regular expression engine, without tokenizing it.
+    A game begins at the first header line after movetext."""
+    offset, headers, header_end, pos = None, None, 0, 0
+
+    while match := HEADER_START_RE.search(pgn_map, pos):
+        start, pos = match.start(), match.end()
+        if start > 0 and pgn_map[start - 1] != NEWLINE:
+            continue  # not at the start of a line, so it's within movetext
+
+        # movetext between two runs of header lines separates two games
+        if offset is None or NON_SPACE_RE.search(pgn_map, header_end, start):
+            if offset is not None:
+                yield offset, headers
+            offset, headers = start, {}
+
+        end_match = HEADERS_END_RE.search(pgn_map, start)
+        header_end = pos = end_match.end() if end_match else len(pgn_map)
+        headers.update(HEADER_RE.findall(pgn_map[start:header_end].decode('utf-8')))
+
+    if offset is not None:
+        yield offset, headers
+
+
+def scan_metadata(path, *predicates):
+    """Generator that yields the Metadata of each game in the PGN file at path for which every predicate returns True.
+
+    for metadata in scan_metadata(path, played_by("DrNykterstein"), dated_between(datetime.date(2021, 1, 1), None)):
+        print(metadata.site)
+
+    Predicates are called with the Metadata before any of the game's movetext is read, see iter_headers()."""
+    if os.path.getsize(path) == 0:
+        return
+
+    with open(path, 'rb') as pgn_f, mmap.mmap(pgn_f.fileno(), 0, access=mmap.ACCESS_READ) as pgn_map:
+        for _, headers in iter_headers(pgn_map):
+            metadata = normalize_metadata(headers)
+            if all(predicate(metadata) for predicate in predicates):
+                yield metadata
+
+
+def played_by(name):
+    """Returns a scan_metadata() predicate for games in which name played White or Black."""
+    return lambda metadata: name in (metadata.white, metadata.black)
+
+
+def dated_between(first=None, last=None):
+    """Returns a scan_metadata() predicate for games dated from first to last inclusive. None leaves that end open."""
+    return lambda metadata: (metadata.date is not None
+                             and (first is None or first <= metadata.date)
+                             and (last is None or metadata.date <= last))
+
+
+def opening_startswith(prefix):
+    """Returns a scan_metadata() predicate for games whose Opening header starts with prefix, e.g. "Sicilian Defense"."""
+    return lambda metadata: metadata.opening is not None and metadata.opening.startswith(prefix)
+
+
 class Game:
     """Iterator for a game of chess encoded in PGN. Don't use this directly, use Gamefile().
 
@@ -142,14 +257,16 @@ class Gamefile:
     for game in Gamefile("/path/to/my.pgn"):
         for move in game:
             print(move.idx, move.sanstr)
+
+    offset and length restrict iteration to a byte range of the file, which must start at the beginning of a game.
+    game() and find() open a single game using the file's GameIndex.
     """
-    def __init__(self, path):
+    def __init__(self, path, offset=0, length=None):
+        self.path = path
         self.game_count = 0
+        self._index = None
 
-        with open(path, encoding='utf-8') as pgn_f:
-            tokens = list(pgn_f.read().split())
-
-        self.parser = pgn_parser(tokens)
+        self.parser = pgn_parser(read_tokens(path, offset, length))
 
     def __iter__(self):
         return self
@@ -164,3 +281,94 @@ class Gamefile:
 
             if token is None:
                 break
+
+    @property
+    def index(self):
+        """The GameIndex of this file, loaded or built on first use."""
+        if self._index is None:
+            self._index = GameIndex(self.path)
+        return self._index
+
+    def game(self, number):
+        """Returns the Game at index number in the file, without parsing the games before it."""
+        entry = self.index[number]
+        return next(Gamefile(self.path, entry.offset, entry.length))
+
+    def find(self, **headers):
+        """Returns the first Game whose headers have all the given values, e.g. find(Site="https://lichess.org/n7ZjoKNR")."""
+        return self.game(self.index.find(**headers))
+
+
+class GameIndex:
+    """Byte offset, length and headers of each game in a PGN file.
+
+    The file is scanned once, through mmap, and the index is saved to a sidecar file next to it ("my.pgn.idx"),
+    which is reused for as long as the PGN file's size and modification time are unchanged.
+
+    index = GameIndex("/path/to/my.pgn")
+    entry = index[index.find(Site="https://lichess.org/n7ZjoKNR")]
+    """
+
+    # Named Tuple locating one game in the file
+    Entry = collections.namedtuple('Entry', 'offset length headers')
+
+    SIDECAR_SUFFIX = '.idx'
+
+    def __init__(self, path, sidecar=None):
+        self.path = path
+        self.sidecar = sidecar or path + self.SIDECAR_SUFFIX
+
+        stat = os.stat(path)
+        self.entries = self.load(stat)
+        if self.entries is None:
+            self.entries = self.scan(stat.st_size)
+            self.save(stat)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, number):
+        return self.entries[number]
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def find(self, **headers):
+        """Returns the index of the first game whose headers have all the given values. Raises KeyError if none do."""
+        for number, entry in enumerate(self.entries):
+            if all(entry.headers.get(key) == value for key, value in headers.items()):
+                return number
+
+        raise KeyError(headers)
+
+    def scan(self, size):
+        """Returns a list of Entry for the games in the file."""
+        if size == 0:
+            return []
+
+        with open(self.path, 'rb') as pgn_f, mmap.mmap(pgn_f.fileno(), 0, access=mmap.ACCESS_READ) as pgn_map:
+            games = list(iter_headers(pgn_map))
+
+        ends = [offset for offset, _ in games[1:]] + [size]
+        return [self.Entry(offset, end - offset, headers) for (offset, headers), end in zip(games, ends)]
+
+    def load(self, stat):
+        """Returns the entries saved in the sidecar file, or None if it is missing or out of date."""
+        try:
+            with open(self.sidecar, encoding='utf-8') as sidecar_f:
+                saved = json.load(sidecar_f)
+        except (OSError, ValueError):
+            return None
+
+        if saved.get('size') != stat.st_size or saved.get('mtime_ns') != stat.st_mtime_ns:
+            return None
+
+        return [self.Entry(*entry) for entry in saved['entries']]
+
+    def save(self, stat):
+        """Writes the entries to the sidecar file. The index still works, unsaved, if the file can't be written."""
+        try:
+            with open(self.sidecar, 'w', encoding='utf-8') as sidecar_f:
+                json.dump({'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'entries': self.entries}, sidecar_f)
+        except OSError:
+            logging.warning("could not save PGN index to %s", self.sidecar)
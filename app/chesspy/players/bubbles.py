@@ -1,11 +1,53 @@
 """Bubbles is smart but conventional."""
+from ..san import make_san
+from ..color import Color
+from ..move import Move, unpack
 from .player import ChessPlayer
+from ..search import Search, MAX_DEPTH
+from ..transposition import TranspositionTable
 
 
 class Bubbles(ChessPlayer):
     """Bubbles knows all the tricks (except ML)."""
-    # iterative, not recursive
     # search harder as number of pieces decreases!
     # openings DB (scores not based on sum of piece values, based on strength of opening sequence)
-    # smarter pruning than random MOVES_TO_CONSIDER. e.g. always consider moving Q, or... ??
-    pass  # pylint:disable=unnecessary-pass
+    def __init__(self, game, color=Color.BLACK,  # pylint: disable=too-many-arguments,too-many-positional-arguments
+                 search_depth=3, tt_megabytes=16, time_limit=None, node_limit=None):
+        super().__init__(game, color)
+        self.search_depth = search_depth
+        self.tt = TranspositionTable(tt_megabytes)
+        self.time_limit, self.node_limit = time_limit, node_limit
+        self.last_search = None
+
+    def __str__(self):
+        return "Bubbles"
+
+    def suggest_move(self, depth=None, time_limit=None, node_limit=None):
+        """Returns the first move of the principal variation, as a legal Move, or None if there are no legal moves.
+
+        With a time_limit in seconds or a node_limit, which default to self.time_limit and self.node_limit, the search
+        deepens iteratively, up to depth if it's given. Otherwise it searches depth plies, self.search_depth by default.
+        The SearchResult is kept in self.last_search."""
+        time_limit = self.time_limit if time_limit is None else time_limit
+        node_limit = self.node_limit if node_limit is None else node_limit
+
+        self.tt.new_search()
+        if time_limit is None and node_limit is None:
+            self.last_search = Search(self.game, self.tt).search(depth or self.search_depth)
+        else:
+            self.last_search = Search(self.game, self.tt).iterate(depth or MAX_DEPTH, time_limit, node_limit)
+
+        if not self.last_search.pv:
+            return None
+
+        for packed in self.imagine_packed_moves():
+            if unpack(packed) == self.last_search.pv[0]:
+                return Move.from_packed(packed)
+
+        raise AssertionError(f"principal variation starts with an illegal move: {self.last_search.pv}")
+
+    def suggest_move_san(self, depth=None, time_limit=None, node_limit=None):
+        """Returns Bubbles' best move as a SAN string, or None if there are no legal moves."""
+        if mv := self.suggest_move(depth, time_limit, node_limit):
+            return make_san(mv, verbose=True)
+        return None
@@ -1,116 +1,171 @@
 """Julian thinks ahead."""
-# pylint:disable=wrong-import-order
+import time
 import random
 from ..san import make_san
+from .. import smp
+from ..color import Color
+from ..move import Move, unpack
 from .player import ChessPlayer
-from ..color import Color, color_of
-from chesspy.analyzers import is_in_check, is_in_mate
+from ..worker import worker_game
+from ..search import Search, SearchResult, SearchAborted, MAX_DEPTH, MATE_BOUND, INFINITY
+from ..transposition import SharedTranspositionTable, process_table
 
 
-PIECE_VALUES = dict(P=1, N=3, B=3, R=5, Q=9, K=1)
+def consider_move(game, tt, mv, depth, alpha=-INFINITY,  # pylint: disable=too-many-arguments,too-many-positional-arguments
+                  deadline=None, node_limit=None):
+    """Searches the legal packed move mv in game, depth plies deep including mv, with TranspositionTable tt.
 
+    Returns a SearchResult for the position after mv, scored for the side playing mv,
+    or None if the search ran past deadline or node_limit. A score no better than alpha is only a bound: the search
+    stops once it's sure mv does no better. game is altered during the search but restored on return."""
+    game.make(*unpack(mv))
+    try:
+        result = Search(game, tt, deadline, node_limit).search(depth - 1, -INFINITY, -alpha)
+    except SearchAborted:
+        return None
+    finally:
+        game.pop()
 
-class Julian(ChessPlayer):
+    return SearchResult(-result.score, result.pv, result.nodes, depth)
+
+
+def consider_packet(packet):
+    """A pool worker's task: consider_move() for the (FEN, mv, depth, alpha, deadline, node_limit, tt) in packet.
+
+    A packet is a few hundred bytes: tt is a SharedTranspositionTable, pickled as its name."""
+    fen, mv, depth, alpha, deadline, node_limit, tt = packet
+    return consider_move(worker_game(fen), tt, mv, depth, alpha, deadline, node_limit)
+
+
+class Julian(ChessPlayer):  # pylint: disable=too-many-instance-attributes
     """Julian thinks deeply about his moves."""
-    def __init__(self, game, color=Color.BLACK, pool=None, search_depth=2, moves_to_consider=6):
+    def __init__(self, game, color=Color.BLACK, pool=None,  # pylint: disable=too-many-arguments,too-many-positional-arguments
+                 search_depth=3, tt_megabytes=16, time_limit=None, node_limit=None, smp_workers=None):
         super().__init__(game, color)
         self.game, self.color = game, color
         self.pool = pool
 
         self.search_depth = search_depth
-        self.moves_to_consider = moves_to_consider
+        self.tt_megabytes = tt_megabytes
+        self.shared_tt = SharedTranspositionTable(tt_megabytes) if pool else None
+        self.time_limit, self.node_limit = time_limit, node_limit
+        self.smp_workers = smp_workers if pool else None
+        self.last_search = None
 
     def __str__(self):
         return "Julian"
 
-    def __getstate__(self):
-        """Remove self.pool before Pickling so we can use Pool.map."""
-        self_dict = self.__dict__.copy()
-        del self_dict['pool']
-        return self_dict
-
-    def score_board(self, board):
-        """Returns a score representing relative strength of board position."""
-        score = 0
-
-        for y in range(8):
-            for x in range(8):
-                if (p := board.square_at(y, x)):
-                    if color_of(p) == self.color:
-                        score += PIECE_VALUES[p.upper()]
-                    else:
-                        score -= PIECE_VALUES[p.upper()]
-
-        if is_in_check(board, self.color.opponent()):
-            score += 1000
-        if is_in_check(board, self.color):
-            score -= 1000
-        if is_in_mate(board, self.color.opponent()):
-            score += 10000000
-        if is_in_mate(board, self.color):
-            score -= 10000000
-
-        return score
-
-    def consider_move_san(self, packet):
-        """Considers the move given as (sanstr, depth) in packet. Returns a score if move is legal, or None."""
-        sanstr, depth = packet
-        score = None
-        if test_game := self.test_move_san(sanstr):
-            if depth > 0:
-                assert test_game.turn != self.game.turn
-                opponent_player = self.__class__(test_game, color=test_game.turn)
-                opponent_move_san = opponent_player.suggest_move_san(depth=depth-1)
-
-                if opponent_move_san:
-                    test_game.move_san(opponent_move_san)
-
-                    assert test_game.turn == self.game.turn
-                    future_self_player = self.__class__(test_game, color=test_game.turn)
-                    future_self_move_san = future_self_player.suggest_move_san(depth=depth-1)
-
-                    if future_self_move_san:
-                        test_game.move_san(future_self_move_san)
-
-            score = self.score_board(test_game.board)
-
-        return score
-
-    def suggest_move_san(self, depth=None):
-        """Returns Julian's "best idea" for a move, or None if there are no legal moves.
-
-        Uses self.pool to parallelize if self.pool is not None."""
-        if depth is None:
-            depth = self.search_depth
-        assert depth >= 0
-
-        # pylint:disable=fixme
-        # FIXME: stop making so many temp_games
-        # FIXME: combine analyzers (e.g. analyze for mate and check at once, don't scan board twice)
-        # FIXME: don't do anything twice, like generators and analyzers
-        # FIXME: repr(board) -> score DB to bypass computation
-        #        more likely: (repr(board), sanstr) -> (score, is_check, is_mate). might want to use shared memory for that
-
-        best_move_score, best_move_sanstr = float("-inf"), None
-
-        moves = self.imagine_moves()
-        if not is_in_check(self.game.board, self.color) and len(moves) > self.moves_to_consider:
-            moves = random.sample(moves, self.moves_to_consider)
-
-        sanstrs = [make_san(move, verbose=True) for move in moves]
-        packets = [(sanstr, depth) for sanstr in sanstrs]
-
-        if self.pool:
-            scores = self.pool.map(self.consider_move_san, packets)
-        else:
-            scores = map(self.consider_move_san, packets)
-
-        for score, sanstr in zip(scores, sanstrs):
-            if score is None:
+    @property
+    def tt(self):
+        """The TranspositionTable Julian searches with. It outlives suggest_move() calls.
+
+        With a pool, it's a SharedTranspositionTable that every worker attaches to, so a position one worker
+        has searched isn't searched again by another. Otherwise it's the process's own table."""
+        if self.shared_tt is not None:
+            return self.shared_tt
+        return process_table(self.tt_megabytes)
+
+    def close(self):
+        """Frees Julian's shared TranspositionTable, if he has one."""
+        if self.shared_tt is not None:
+            self.shared_tt.close()
+            self.shared_tt = None
+
+    def search_moves(self, moves, depth, deadline=None, node_limit=None):
+        """Returns the best of moves, which are packed, as (packed move, SearchResult, finished) after searching each
+        depth plies deep.
+
+        Moves are shared out to self.pool, each sent with the position as FEN rather than with Julian and his Game.
+        The first move is searched on its own, then the others at once with its score as alpha, so they're only
+        searched as far as it takes to tell they're no better; the likely best move should come first.
+        If searches run out of time or nodes, the best is of the moves that finished, and finished is False.
+        Returns None if the first move's search didn't finish."""
+        fen = self.game.to_fen()
+        if (first := self.pool.apply(consider_packet, [(fen, moves[0], depth, -INFINITY, deadline, node_limit, self.tt)])) is None:
+            return None
+
+        # alpha is a point below the first move's score, so moves that tie with it get exact scores to choose between
+        alpha = first.score - 1
+        results = [first] + self.pool.map(consider_packet, [(fen, move, depth, alpha, deadline, node_limit, self.tt)
+                                                            for move in moves[1:]])
+        best_move_score, best_move, best_result = float("-inf"), None, None
+        for result, move in zip(results, moves):
+            if result is None:
                 continue
-
-            if score > best_move_score or (score == best_move_score and random.randrange(3) == 1):
-                best_move_score = score
-                best_move_sanstr = sanstr
-
-        return best_move_sanstr
+            if result.score > best_move_score or (result.score == best_move_score and random.randrange(3) == 1):
+                best_move_score, best_move, best_result = result.score, move, result
+
+        return best_move, SearchResult(best_move_score, [unpack(best_move)] + best_result.pv,
+                                       sum(result.nodes for result in results if result), depth), None not in results
+
+    def suggest_move(self, depth=None, time_limit=None, node_limit=None):
+        """Returns Julian's "best idea" for a Move, or None if there are no legal moves.
+
+        Every legal move is searched with alpha-beta negamax. With a time_limit in seconds or a node_limit, which
+        default to self.time_limit and self.node_limit, Julian deepens his search one ply at a time, up to depth if
+        it's given, and plays the best move of the deepest search he finished, or of a deeper one he cut short, if
+        he'd searched his last best move first. Otherwise he searches depth plies, self.search_depth by default.
+        Depths are at most MAX_DEPTH. The SearchResult, with (src, dst, promotion) moves, is kept in self.last_search.
+
+        Without a pool, Julian searches from the current position in this process. With one, its workers share out
+        his moves, or with self.smp_workers, that many of them all search the whole position at once (Lazy SMP)."""
+        time_limit = self.time_limit if time_limit is None else time_limit
+        node_limit = self.node_limit if node_limit is None else node_limit
+        limited = time_limit is not None or node_limit is not None
+        depth = None if depth is None else min(depth, MAX_DEPTH)
+
+        if not (moves := self.imagine_packed_moves()):
+            return None
+
+        if self.smp_workers:
+            result = smp.search(self.game, self.pool, self.smp_workers, self.tt,
+                                depth or (MAX_DEPTH if limited else self.search_depth), time_limit, node_limit)
+            self.last_search = result.search._replace(nodes=result.nodes)
+            return Move.from_packed(next(mv for mv in moves if unpack(mv) == self.last_search.pv[0]))
+
+        self.tt.new_search()
+
+        if self.pool is None:
+            searcher = Search(self.game, self.tt)
+            if limited:
+                self.last_search = searcher.iterate(depth or MAX_DEPTH, time_limit, node_limit)
+            else:
+                self.last_search = searcher.search(min(depth or self.search_depth, MAX_DEPTH))
+            return Move.from_packed(next(mv for mv in moves if unpack(mv) == self.last_search.pv[0]))
+
+        if not limited:
+            best_move, self.last_search, _ = self.search_moves(moves, min(depth or self.search_depth, MAX_DEPTH))
+            return Move.from_packed(best_move)
+
+        deadline = None if time_limit is None else time.monotonic() + time_limit
+        best_move, nodes = None, 0
+
+        for iteration_depth in range(1, (depth or MAX_DEPTH) + 1):
+            # the first iteration always completes, so there's a move to play
+            if iteration_depth == 1:
+                best = self.search_moves(moves, iteration_depth)
+            elif node_limit is not None and nodes >= node_limit:
+                break
+            else:
+                nodes_left = None if node_limit is None else max(1, (node_limit - nodes) // len(moves))
+                if (best := self.search_moves(moves, iteration_depth, deadline, nodes_left)) is None:
+                    break
+
+            # the last best move is searched first, so the best of the moves a cut short search finished is no worse
+            best_move, self.last_search, finished = best
+            nodes += self.last_search.nodes
+            self.last_search = self.last_search._replace(nodes=nodes)
+
+            if not finished or abs(self.last_search.score) > MATE_BOUND:
+                break  # out of time or nodes, or a forced mate: searching deeper won't change the outcome
+
+            # the best move so far is searched first next time, so its score bounds the others' searches
+            moves = [best_move] + [mv for mv in moves if mv != best_move]
+
+        return Move.from_packed(best_move)
+
+    def suggest_move_san(self, depth=None, time_limit=None, node_limit=None):
+        """Returns Julian's "best idea" for a move as a SAN string, or None if there are no legal moves."""
+        if mv := self.suggest_move(depth, time_limit, node_limit):
+            return make_san(mv, verbose=True)
+        return None
@@ -1,9 +1,8 @@
 """Abstract Base Class for Players."""
-import copy
-from ..move import Move
-from ..color import Color, color_of
-from ..move_generators import moves_for
-from ..analyzers import is_in_check, adjacent_kings
+import contextlib
+from ..move import Move, unpack
+from ..color import Color
+from ..move_generators import packed_moves
 
 
 class ChessPlayer:
@@ -11,32 +10,30 @@ class ChessPlayer:
     def __init__(self, game, color=Color.BLACK):
         self.game, self.color = game, color
 
-    def test_move_san(self, sanstr):
-        """Returns False if the move is not legal.
+    @contextlib.contextmanager
+    def trying_move(self, mv):
+        """Executes the given legal Move, as returned by imagine_moves(), on self.game for the duration of a with block.
 
-        If move is legal, returns a new Game where the given move was executed."""
-        test_game = copy.deepcopy(self.game)
-        test_game.move_san(sanstr)
+        with player.trying_move(mv):
+            score = score_board(player.game.board)
 
-        if adjacent_kings(test_game.board) or is_in_check(test_game.board, self.game.turn):
-            return False
+        mv may also be a packed move, as returned by imagine_packed_moves()."""
+        if isinstance(mv, int):
+            self.game.make(*unpack(mv))
+        else:
+            self.game.push(mv)
 
-        return test_game
+        try:
+            yield
+        finally:
+            self.game.pop()
 
     def imagine_moves(self):
-        """Returns a list of Moves that could be played. Some may not be legal."""
-        moves = []
-
-        for y in range(8):
-            for x in range(8):
-                if (p := self.game.board.square_at(y, x)) and color_of(p) == self.color:
-                    for dst_y, dst_x in moves_for(y, x, self.game.board):  # pylint:disable=not-an-iterable
-                        mv = Move()
-                        if p not in ('p', 'P'):
-                            mv.piece = p.upper()
-                        mv.dst_y, mv.dst_x = dst_y, dst_x
-                        mv.src_y, mv.src_x = y, x
-                        mv.capture = (self.game.board.square_at(mv.dst_y, mv.dst_x) is not None)
-                        moves.append(mv)
-
-        return moves
+        """Returns a list of the legal Moves for the side to move in self.game."""
+        return [Move.from_packed(packed) for packed in packed_moves(self.game)]
+
+    def imagine_packed_moves(self):
+        """Returns a list of the legal moves for the side to move in self.game, packed into ints. See chesspy.move.pack().
+
+        Far cheaper to build and keep than imagine_moves(); Move.from_packed() turns the one that's played into a Move."""
+        return packed_moves(self.game)
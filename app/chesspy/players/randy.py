@@ -1,6 +1,7 @@
 """Randy is a chess player who moves randomly."""
 import random
 from ..san import make_san
+from ..move import Move
 from .player import ChessPlayer
 
 
@@ -11,13 +12,7 @@ class Randy(ChessPlayer):
 
     def suggest_move_san(self):
         """Returns Randy's best idea for a move, or None if there are no legal moves."""
-        moves = self.imagine_moves()
-
-        random.shuffle(moves)  # that's so Randy
-
-        for move in moves:
-            sanstr = make_san(move, verbose=True)
-            if self.test_move_san(sanstr):
-                return sanstr
+        if moves := self.imagine_packed_moves():
+            return make_san(Move.from_packed(random.choice(moves)), verbose=True)  # that's so Randy
 
         return None
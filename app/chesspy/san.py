@@ -1,33 +1,50 @@
 """Parser for Standard Algebraic Notation"""
 
+import re
 import logging
+import collections
 from .move import Move
 from .castle import Castle
+from .trace import TRACE
 
 RESULT_SAN = ('1-0', '0-1', '1/2-1/2')
 
+# The parts of a SAN move, as split() finds them. dst is a square index, 8*y + x. src_y and src_x disambiguate,
+# or are None. castle is a Castle or False, in which case piece is 'P', 'N', 'B', 'R', 'Q' or 'K'.
+SanParts = collections.namedtuple('SanParts', 'castle piece src_y src_x capture dst promotion mate')
+
+# entries kept by the parse() cache, about 200 bytes each
+SAN_CACHE_SIZE = 1 << 16
+
+SAN_RE = re.compile(r'([NBRQK]?)([a-h]?)([1-8]?)(x?)([a-h])([1-8])(?:=?([NBRQ]))?(\+|#)?[!?]*')
+CASTLE_RE = re.compile(r'O-O(-O)?(\+|#)?[!?]*')
+
 
 def char_to_y(ch):
     """Given a chess file a-h return a y coordinate 0-7"""
-    logging.debug("char_to_y(%s)", ch)
+    if TRACE:
+        logging.debug("char_to_y(%s)", ch)
     return ord('8') - ord(ch)
 
 
 def char_to_x(ch):
     """Given a chess rank 1-8 return a y coordinate 7-0"""
-    logging.debug("char_to_x(%s)", ch)
+    if TRACE:
+        logging.debug("char_to_x(%s)", ch)
     return ord(ch) - ord('a')
 
 
 def y_to_char(y):
     """Given a y coordinate 7-0 return a chess file a-h"""
-    logging.debug("y_to_char(%s)", y)
+    if TRACE:
+        logging.debug("y_to_char(%s)", y)
     return chr(ord('8') - y)
 
 
 def x_to_char(x):
     """Given a x coordinate 0-7 return a chess rank 1-8"""
-    logging.debug("x_to_char(%s)", x)
+    if TRACE:
+        logging.debug("x_to_char(%s)", x)
     return chr(ord('a') + x)
 
 
@@ -38,11 +55,6 @@ def out_of_bounds(coords):
 
 def make_san(move, verbose=False):  # pylint:disable=unused-argument
     """Create a SAN formatted string from the given Move object."""
-    piece = move.piece if move.piece not in (None, 'P') else ''
-    rank_src, file_src = y_to_char(move.src_y), x_to_char(move.src_x)
-    rank_dst, file_dst = y_to_char(move.dst_y), x_to_char(move.dst_x)
-    capture = 'x' if move.capture else ''
-
     if move.mate:
         check = '#'
     elif move.check:
@@ -50,15 +62,94 @@ def make_san(move, verbose=False):  # pylint:disable=unused-argument
     else:
         check = ''
 
-    return f"{piece}{file_src}{rank_src}{capture}{file_dst}{rank_dst}{check}"
+    if move.castle:
+        return ('O-O' if move.castle == Castle.KINGSIDE else 'O-O-O') + check
+
+    piece = move.piece if move.piece not in (None, 'P') else ''
+    rank_src, file_src = y_to_char(move.src_y), x_to_char(move.src_x)
+    rank_dst, file_dst = y_to_char(move.dst_y), x_to_char(move.dst_x)
+    capture = 'x' if move.capture else ''
+    promotion = f"={move.promotion}" if move.promotion else ''
+
+    return f"{piece}{file_src}{rank_src}{capture}{file_dst}{rank_dst}{promotion}{check}"
+
+
+class SanCache:
+    """A bounded cache of SAN moves resolved by parse(), keyed by (Zobrist key of the position, SAN string).
+
+    Holds the moves packed (see Move.pack()) and evicts the least recently used entry once it's full.
+    hits and misses count get() calls, to tell whether the cache is big enough for a corpus."""
+    def __init__(self, size=SAN_CACHE_SIZE):
+        self.size = size
+        self.moves = collections.OrderedDict()
+        self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self.moves)
+
+    def get(self, key, sanstr):
+        """Returns the packed move stored for sanstr in the position with Zobrist key, or None."""
+        if (packed := self.moves.get((key, sanstr))) is None:
+            self.misses += 1
+            return None
+
+        self.moves.move_to_end((key, sanstr))
+        self.hits += 1
+        return packed
+
+    def put(self, key, sanstr, packed):
+        """Stores the packed move that sanstr resolves to in the position with Zobrist key."""
+        self.moves[(key, sanstr)] = packed
+        if len(self.moves) > self.size:
+            self.moves.popitem(last=False)
+
+    def clear(self):
+        """Empties the cache and resets its counters."""
+        self.moves.clear()
+        self.hits = self.misses = 0
+
+
+# moves resolved by parse(), shared by every Game in the process
+cache = SanCache()
+
+
+def split(sanstr):
+    """Returns the SanParts of a SAN formatted string, checking syntax only: it's not matched against a position.
+
+    Much cheaper than parse(), for callers that find the move's source square themselves.
+    Raises IndexError in case of syntax error.
+    """
+    if match := SAN_RE.fullmatch(sanstr):
+        piece, src_x, src_y, capture, dst_x, dst_y, promotion, check = match.groups()
+        return SanParts(False, piece or 'P',
+                        char_to_y(src_y) if src_y else None,
+                        char_to_x(src_x) if src_x else None,
+                        capture == 'x',
+                        8*char_to_y(dst_y) + char_to_x(dst_x),
+                        promotion,
+                        check == '#')
+
+    if match := CASTLE_RE.fullmatch(sanstr):
+        queenside, check = match.groups()
+        return SanParts(Castle.QUEENSIDE if queenside else Castle.KINGSIDE, 'K', None, None, False, None, None, check == '#')
+
+    raise IndexError(f"not SAN: {sanstr!r}")
 
 
 def parse(sanstr, game=None):
     """Parse a SAN formatted string and return a populated Move object.
 
+    Given a game, the Move's source is deduced in game's position, or found in cache if sanstr was seen there before.
     Raises IndexError in case of syntax error.
     """
-    logging.debug("parse(%s)", sanstr)
+    if TRACE:
+        logging.debug("parse(%s)", sanstr)
+
+    if game is not None and not sanstr.startswith('O-O'):
+        key = game.zobrist_key
+        if (packed := cache.get(key, sanstr)) is not None:
+            return Move.from_packed(packed)
+
     mv = Move()
 
     if sanstr.startswith('O-O'):
@@ -116,4 +207,7 @@ def parse(sanstr, game=None):
         # invalid SAN like "33"
         raise IndexError
 
+    if game is not None:
+        cache.put(key, sanstr, mv.pack())
+
     return mv
@@ -0,0 +1,376 @@
+"""Negamax search with alpha-beta pruning.
+
+result = search.search(game, depth=4)
+print(result.score, [perft.move_str(*move) for move in result.pv], result.nodes)
+game.make(*result.pv[0])
+
+result = search.Search(game).iterate(time_limit=1.5)  # as deep as it gets in 1.5 seconds
+
+Scores are in centipawns from the point of view of the side to move. Moves are (src, dst, promotion) tuples
+as returned by move_generators.legal_moves().
+
+Positions at the search's depth aren't evaluated as they stand, halfway through an exchange of pieces: a
+quiescence search first plays out the captures and promotions, most valuable victim first, and evaluates the
+quiet positions they lead to.
+
+Alpha-beta prunes the most when the best move is tried first, so each position's moves are tried in order: the
+move the transposition table has for it (at the root of a deepening search, the last depth's best move), then
+captures by MVV-LVA, then the two quiet moves that last caused a cutoff at the same ply (killers), then other
+quiet moves by how often they caused cutoffs anywhere (history).
+search.first_move_cutoff_rate() tells how often the first move tried was good enough.
+"""
+import time
+import collections
+from . import bitboard
+from .color import Color
+from .evaluation import evaluate, PIECE_VALUES
+from .move_generators import legal_moves, capture_moves
+from .transposition import EXACT, LOWER, UPPER
+
+# score of being checkmated at the root. Mate in n plies scores MATE_SCORE - n, so shorter mates score higher.
+MATE_SCORE = 1000000
+DRAW_SCORE = 0
+INFINITY = MATE_SCORE + 1
+
+# scores beyond MATE_BOUND are mates, stored in the transposition table relative to the node rather than the root
+MAX_PLY = 1000
+MATE_BOUND = MATE_SCORE - MAX_PLY
+
+# deepest search iterate() will try
+MAX_DEPTH = 64
+
+# nodes between checks of the clock
+CLOCK_INTERVAL = 1024
+
+# capturing pieces in order of value, the least valuable first, for ordering captures of the same victim
+ATTACKERS = 'PNBRQK'
+
+# quiescence search skips captures that would leave the side to move this far short of alpha even if they were free
+DELTA_MARGIN = 200
+
+# move ordering: the hash move, then captures above killers, then killers above quiet moves by history
+HASH_MOVE_ORDER = 1 << 30
+CAPTURE_ORDER = 1 << 24
+KILLER_ORDER = 1 << 22
+HISTORY_LIMIT = KILLER_ORDER - 1
+
+# score: of the principal variation, for the side to move
+# pv: list of moves, the best line of play found for both sides
+# nodes: number of positions visited
+# depth: plies searched
+SearchResult = collections.namedtuple('SearchResult', 'score pv nodes depth')
+
+
+class SearchAborted(Exception):
+    """Raised from within a search that has run out of time or nodes."""
+
+
+def to_table_score(score, ply):
+    """Returns a score ply plies below the root as it's stored in a transposition table: mate distances from this node."""
+    if score > MATE_BOUND:
+        return score + ply
+    if score < -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def from_table_score(score, ply):
+    """Returns a score read from a transposition table for a node ply plies below the root. Inverts to_table_score()."""
+    if score > MATE_BOUND:
+        return score - ply
+    if score < -MATE_BOUND:
+        return score + ply
+    return score
+
+
+def capture_value(squares, move):
+    """Returns the material move wins, before any recapture. squares is Board.squares before move is made.
+
+    A promotion wins what the Pawn becomes, less the Pawn; en passant wins a Pawn."""
+    src, dst, promotion = move
+    victim = squares[dst]
+    if victim is not None:
+        value = PIECE_VALUES[victim.upper()]
+    else:
+        value = PIECE_VALUES['P'] if squares[src] in 'Pp' and (dst - src) % 8 else 0
+    if promotion:
+        value += PIECE_VALUES[promotion] - PIECE_VALUES['P']
+    return value
+
+
+def mvv_lva(squares, move):
+    """Returns move's capture order, higher for the Most Valuable Victim, then for the Least Valuable Attacker."""
+    return capture_value(squares, move) * len(ATTACKERS) - ATTACKERS.index(squares[move[0]].upper())
+
+
+def order_captures(board, moves):
+    """Returns moves sorted by mvv_lva(), best first."""
+    squares = board.squares
+    return sorted(moves, key=lambda move: mvv_lva(squares, move), reverse=True)
+
+
+def in_check(board, color):
+    """Returns True if color's King is attacked."""
+    king = board.pieces('K' if color == Color.WHITE else 'k')
+    return bool(board.attackers_of_square(bitboard.lsb(king), color.opponent()))
+
+
+class Search:  # pylint: disable=too-many-instance-attributes
+    """Searches the positions below a Game's current position.
+
+    The game is altered during search but restored on return. Results are cached in tt, a TranspositionTable,
+    if it's given; a table that outlives the Search lets later searches reuse the work.
+
+    A search raises SearchAborted once time.monotonic() passes deadline or it has visited node_limit nodes.
+    Without quiescence, positions at the search's depth are evaluated as they stand."""
+    def __init__(self, game, tt=None, deadline=None, node_limit=None,  # pylint: disable=too-many-arguments,too-many-positional-arguments
+                 quiescence=True):
+        self.game = game
+        self.tt = tt
+        self.quiescence = quiescence
+        self.nodes = 0
+
+        self.deadline, self.node_limit = deadline, node_limit
+        self.next_check = 0
+
+        # (depth, time.monotonic(), nodes) as iterate() completes each depth
+        self.completed = []
+
+        # the move tried first at the root, ahead of the hash move: iterate()'s best move of the last depth.
+        # root_best: (score, pv) each time a move searched at the root beat those searched before it, in the latest search
+        self.root_move = None
+        self.root_best = []
+
+        # killers[ply]: the last two quiet moves that caused a cutoff ply plies below the root, the latest first.
+        # history[src][dst]: how much quiet moves from src to dst have caused cutoffs, deep ones counting the most.
+        # Both are kept from one search to the next, so deepening searches order moves by what shallower ones learned.
+        self.killers = [[None, None] for _ in range(MAX_DEPTH + 1)]
+        self.history = [[0] * 64 for _ in range(64)]
+
+        # nodes where a move caused a beta cutoff, and those where it was the first move tried
+        self.cutoffs = self.first_move_cutoffs = 0
+
+    def search(self, depth, alpha=-INFINITY, beta=INFINITY):
+        """Returns a SearchResult for the side to move, searching depth plies of every legal move.
+
+        A score outside (alpha, beta) is only a bound, as for negamax(). depth is at most MAX_DEPTH."""
+        depth = min(depth, MAX_DEPTH)
+        self.nodes = self.cutoffs = self.first_move_cutoffs = 0
+        self.next_check = 0
+        self.root_move, self.root_best = None, []
+        score, pv = self.negamax(depth, alpha, beta, 0)
+        return SearchResult(score, self.complete_pv(pv, depth), self.nodes, depth)
+
+    def iterate(self, max_depth=MAX_DEPTH, time_limit=None, node_limit=None, start_depth=1):
+        """Searches to depth start_depth, start_depth + 1... until max_depth, or until time_limit seconds or node_limit
+        nodes are spent.
+
+        Returns the SearchResult of the deepest search that completed, with the node count of all of them. Each
+        search tries the last one's best move first, so if it's cut short after that, the best of the moves it
+        finished is no worse, and its result is returned instead. The first search always completes, so there's a
+        move to play if there are legal moves. max_depth is at most MAX_DEPTH."""
+        deadline = None if time_limit is None else time.monotonic() + time_limit
+        max_depth = min(max_depth, MAX_DEPTH)
+        self.nodes = self.cutoffs = self.first_move_cutoffs = 0
+        self.completed = []
+        result = None
+
+        for depth in range(start_depth, max(start_depth, max_depth) + 1):
+            self.deadline, self.node_limit = (deadline, node_limit) if depth > start_depth else (None, None)
+            self.next_check = 0
+            self.root_move, self.root_best = result.pv[0] if result else None, []
+
+            try:
+                score, pv = self.negamax(depth, -INFINITY, INFINITY, 0)
+            except SearchAborted:
+                if self.root_best:
+                    # the last depth's best move was searched first, so the best of those searched is no worse
+                    score, pv = self.root_best[-1]
+                    result = SearchResult(score, self.complete_pv(pv, depth), self.nodes, depth)
+                break
+
+            result = SearchResult(score, self.complete_pv(pv, depth), self.nodes, depth)
+            self.completed.append((depth, time.monotonic(), self.nodes))
+            if not pv or abs(score) > MATE_BOUND:
+                break  # no legal moves, or a forced mate: searching deeper won't change the outcome
+
+        return result._replace(nodes=self.nodes)
+
+    def first_move_cutoff_rate(self):
+        """Returns the fraction of the last search's cutoffs caused by the first move tried, or None if there were none.
+
+        Close to 1 when moves are well ordered: every other move tried before a cutoff is wasted work."""
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else None
+
+    def order_moves(self, moves, ply, hash_move=None):
+        """Returns moves, for the position ply plies below the root, sorted best first. See the module docstring."""
+        squares, killers, history = self.game.board.squares, self.killers[ply], self.history
+
+        def order(move):
+            if move == hash_move:
+                return HASH_MOVE_ORDER
+            if value := capture_value(squares, move):
+                return CAPTURE_ORDER + value * len(ATTACKERS) - ATTACKERS.index(squares[move[0]].upper())
+            if move == killers[0]:
+                return KILLER_ORDER + 1
+            if move == killers[1]:
+                return KILLER_ORDER
+            return history[move[0]][move[1]]
+
+        return sorted(moves, key=order, reverse=True)
+
+    def record_cutoff(self, move, depth, ply, first):
+        """Updates the killers, history and cutoff counts for move, which caused a beta cutoff depth plies from the leaves."""
+        self.cutoffs += 1
+        self.first_move_cutoffs += first
+
+        if capture_value(self.game.board.squares, move):
+            return  # captures are ordered by MVV-LVA already
+
+        killers = self.killers[ply]
+        if move != killers[0]:
+            killers[0], killers[1] = move, killers[0]
+
+        src, dst, _ = move
+        self.history[src][dst] = min(HISTORY_LIMIT, self.history[src][dst] + depth * depth)
+
+    def check_limits(self):
+        """Raises SearchAborted if the search is out of time or nodes, otherwise schedules the next check."""
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            raise SearchAborted(f"{self.nodes} nodes")
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise SearchAborted(f"{self.nodes} nodes, out of time")
+
+        self.next_check = self.nodes + CLOCK_INTERVAL
+        if self.node_limit is not None:
+            self.next_check = min(self.next_check, self.node_limit)
+
+    def complete_pv(self, pv, depth):
+        """Returns pv, extended from the transposition table if table hits cut it short of depth moves."""
+        if self.tt is not None and len(pv) < depth:
+            return pv + self.table_pv(pv, depth - len(pv))
+        return pv
+
+    def negamax(self, depth, alpha, beta, ply):  # pylint: disable=too-many-branches,too-many-locals
+        """Returns (score, pv) for the side to move, ply plies below the root.
+
+        Scores outside (alpha, beta) are not exact: alpha means no move does better than alpha,
+        beta means the opponent has a better option than to allow this position."""
+        self.nodes += 1
+        if self.nodes >= self.next_check:
+            self.check_limits()
+
+        game, tt, hash_move = self.game, self.tt, None
+
+        if tt is not None:
+            key = game.zobrist_key
+            if entry := tt.probe(key):
+                if ply > 0 and entry.depth >= depth:
+                    score = from_table_score(entry.score, ply)
+                    if entry.bound == EXACT:
+                        return score, [entry.move] if entry.move else []
+                    if entry.bound == LOWER and score >= beta:
+                        return score, [entry.move]
+                    if entry.bound == UPPER and score <= alpha:
+                        return score, []
+                hash_move = entry.move
+
+        if ply == 0 and self.root_move is not None:
+            hash_move = self.root_move
+
+        if depth == 0:
+            return (self.quiesce(alpha, beta, ply) if self.quiescence else evaluate(game.board, game.turn)), []
+
+        moves = legal_moves(game)
+        if not moves:
+            return (ply - MATE_SCORE if in_check(game.board, game.turn) else DRAW_SCORE), []
+
+        alpha_orig, pv = alpha, []
+        for index, move in enumerate(self.order_moves(moves, ply, hash_move)):
+            game.make(*move)
+            try:
+                score, child_pv = self.negamax(depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                game.pop()
+
+            if -score > alpha:
+                alpha, pv = -score, [move] + child_pv
+                if ply == 0:
+                    self.root_best.append((alpha, pv))
+                if alpha >= beta:
+                    self.record_cutoff(move, depth, ply, index == 0)
+                    break
+
+        if tt is not None:
+            bound = LOWER if alpha >= beta else EXACT if alpha > alpha_orig else UPPER
+            tt.store(key, depth, bound, to_table_score(alpha, ply), pv[0] if pv else None)
+
+        return alpha, pv
+
+    def quiesce(self, alpha, beta, ply):
+        """Returns the score for the side to move, ply plies below the root, once captures and promotions are played out.
+
+        The side to move may stand pat, keeping the position's evaluation rather than capturing, so it's a lower
+        bound. Captures that can't bring the score up to alpha, and captures of a defended piece by a more valuable
+        one, are skipped. In check there's no standing pat: every legal move is searched, and having none is mate."""
+        self.nodes += 1
+        if self.nodes >= self.next_check:
+            self.check_limits()
+
+        game = self.game
+        board, squares, opponent = game.board, game.board.squares, game.turn.opponent()
+
+        if in_check(board, game.turn):
+            if not (moves := legal_moves(game)):
+                return ply - MATE_SCORE
+            stand_pat = None
+        else:
+            stand_pat = evaluate(board, game.turn)
+            if stand_pat >= beta:
+                return stand_pat
+            alpha = max(alpha, stand_pat)
+            moves = capture_moves(game)
+
+        for move in order_captures(board, moves):
+            if stand_pat is not None:
+                value = capture_value(squares, move)
+                if stand_pat + value + DELTA_MARGIN <= alpha:
+                    continue
+                if PIECE_VALUES[squares[move[0]].upper()] > value and board.attackers_of_square(move[1], opponent):
+                    continue
+
+            game.make(*move)
+            try:
+                score = -self.quiesce(-beta, -alpha, ply + 1)
+            finally:
+                game.pop()
+
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break
+
+        return alpha
+
+    def table_pv(self, pv, depth):
+        """Returns up to depth moves that follow pv, found by looking up each position after it in the transposition table."""
+        game, moves = self.game, []
+
+        for move in pv:
+            game.make(*move)
+
+        while len(moves) < depth and (entry := self.tt.probe(game.zobrist_key)) and entry.move in legal_moves(game):
+            moves.append(entry.move)
+            game.make(*entry.move)
+
+        for _ in range(len(pv) + len(moves)):
+            game.pop()
+
+        return moves
+
+
+def search(game, depth, tt=None):
+    """Returns a SearchResult for the side to move in game, searching depth plies of every legal move.
+
+    tt is an optional TranspositionTable."""
+    return Search(game, tt).search(depth)
@@ -0,0 +1,96 @@
+"""Lazy SMP: several processes search the same position at once, sharing one transposition table.
+
+Each worker deepens its own search of the whole position, half of them starting a ply deeper than the others so
+that they're rarely at the same depth. Nothing else is coordinated: what one worker stores in the shared table
+cuts short the others' searches of the same positions. The deepest search any worker completes is the result.
+
+tt = SharedTranspositionTable(64)
+with multiprocessing.Pool(8) as pool:
+    result = smp.search(game, pool, 8, tt, time_limit=5.0)
+print(result.search.score, result.search.depth, result.nodes / result.seconds, result.depth_seconds)
+tt.close()
+
+for report in smp.benchmark(game, depth=6, core_counts=(1, 2, 4, 8)):
+    print(report.cores, report.nodes / report.seconds, report.depth_seconds)
+"""
+import time
+import collections
+from multiprocessing import Pool
+from .search import Search, MAX_DEPTH
+from .worker import worker_game
+from .transposition import SharedTranspositionTable
+
+# search: the deepest SearchResult completed by any worker, with its nodes
+# nodes: positions visited by all workers together
+# seconds: from the start of the search to the last worker's return
+# depth_seconds: {depth: seconds until the first worker completed depth}
+SmpResult = collections.namedtuple('SmpResult', 'search nodes seconds depth_seconds')
+
+# An SmpResult from benchmark(), for a search on cores worker processes
+SmpReport = collections.namedtuple('SmpReport', 'cores search nodes seconds depth_seconds')
+
+
+def start_depth(worker):
+    """Returns the depth worker, numbered from 0, begins deepening at."""
+    return 1 + worker % 2
+
+
+def search_worker(packet):
+    """Deepens a search of the position given as (FEN, tt, start depth, max_depth, deadline, node_limit) in packet.
+
+    The position is sent as FEN, and set up by worker_game() as for Julian's own tasks, rather than pickling
+    the Game. Returns (SearchResult, [(depth, time.monotonic(), nodes) as each depth was completed])."""
+    fen, tt, first_depth, max_depth, deadline, node_limit = packet
+    time_limit = None if deadline is None else max(0.0, deadline - time.monotonic())
+
+    searcher = Search(worker_game(fen), tt)
+    result = searcher.iterate(max_depth, time_limit, node_limit, first_depth)
+    return result, searcher.completed
+
+
+def search(game, pool, workers, tt,  # pylint: disable=too-many-arguments,too-many-positional-arguments
+           max_depth=MAX_DEPTH, time_limit=None, node_limit=None):
+    """Returns an SmpResult for the side to move in game, searched by workers processes of pool at once.
+
+    tt is a SharedTranspositionTable. Each worker searches until max_depth, or until time_limit seconds
+    or its share of node_limit nodes are spent. pool should have at least workers processes, or some of
+    the searches will wait for others to finish."""
+    start = time.monotonic()
+    deadline = None if time_limit is None else start + time_limit
+    node_limit = None if node_limit is None else max(1, node_limit // workers)
+
+    tt.new_search()
+    fen = game.to_fen()
+    results = pool.map(search_worker, [(fen, tt, min(start_depth(worker), max_depth), max_depth, deadline, node_limit)
+                                       for worker in range(workers)])
+    seconds = time.monotonic() - start
+
+    # the deepest result, from the lowest numbered worker that reached it
+    best = max((result for result, _ in results), key=lambda result: result.depth)
+    return SmpResult(best, sum(result.nodes for result, _ in results), seconds,
+                     depth_seconds([completed for _, completed in results], start))
+
+
+def depth_seconds(completions, start):
+    """Returns {depth: seconds from start until the first worker completed depth}, given each worker's completions
+    as returned by search_worker()."""
+    seconds = {}
+    for completed in completions:
+        for depth, when, _ in completed:
+            seconds[depth] = min(seconds.get(depth, when - start), when - start)
+    return dict(sorted(seconds.items()))
+
+
+def benchmark(game, depth, core_counts, tt_megabytes=64):
+    """Yields an SmpReport for a search of game to depth on each number of cores in core_counts.
+
+    Each search gets its own pool and an empty table, so the reports show how nodes/second and time to depth
+    change with the number of cores."""
+    for cores in core_counts:
+        tt = SharedTranspositionTable(tt_megabytes)
+        try:
+            with Pool(cores) as pool:
+                result = search(game, pool, cores, tt, max_depth=depth)
+        finally:
+            tt.close()
+        yield SmpReport(cores, *result)
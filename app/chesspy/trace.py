@@ -0,0 +1,11 @@
+"""Switch for tracing chesspy's hot paths: move parsing, check analysis, PGN tokenizing.
+
+    CHESSPY_TRACE=1 python main.py replay games.pgn
+
+The trace is written with logging.debug(), behind `if TRACE:` so that with tracing off, as it is unless CHESSPY_TRACE
+is set to something other than '' or '0', a traced call costs a branch rather than a call and its argument tuple.
+TRACE is read once, when chesspy is imported, so set the variable before starting Python.
+"""
+import os
+
+TRACE = os.environ.get('CHESSPY_TRACE', '') not in ('', '0')
@@ -0,0 +1,199 @@
+"""Transposition table: a fixed-size cache of search results, keyed by Zobrist key.
+
+tt = TranspositionTable(megabytes=16)
+tt.store(game.zobrist_key, depth, LOWER, score, (src, dst, promotion))
+if (entry := tt.probe(game.zobrist_key)) and entry.depth >= depth:
+    ...
+
+The table is an array of 64-bit words, two slots per bucket. A slot holds the Zobrist key XORed with the
+packed entry, followed by the packed entry, so a slot whose two words don't belong together fails the key
+check instead of returning another position's entry. The first slot of each bucket keeps the deepest entry
+(depth-preferred), the second is overwritten by every store that doesn't go in the first (always-replace).
+
+A SharedTranspositionTable keeps the same words in multiprocessing.shared_memory, so pool workers share their
+results. Processes read and write it without locking: a slot torn by two processes storing at once fails the key
+check and reads as a miss.
+"""
+import os
+import array
+import collections
+from multiprocessing import shared_memory, resource_tracker
+
+# bound types: the stored score is exact, at least (fail high) or at most (fail low) the true score
+EXACT, LOWER, UPPER = 1, 2, 3
+
+# move is a (src, dst, promotion) tuple or None
+Entry = collections.namedtuple('Entry', 'depth bound score move')
+
+SLOTS_PER_BUCKET = 2
+WORDS_PER_SLOT = 2
+BYTES_PER_BUCKET = SLOTS_PER_BUCKET * WORDS_PER_SLOT * 8
+
+# packed entry layout, from the least significant bit
+SCORE_BITS, DEPTH_BITS, BOUND_BITS, MOVE_BITS, GENERATION_BITS = 32, 8, 2, 16, 6
+DEPTH_SHIFT = SCORE_BITS
+BOUND_SHIFT = DEPTH_SHIFT + DEPTH_BITS
+MOVE_SHIFT = BOUND_SHIFT + BOUND_BITS
+GENERATION_SHIFT = MOVE_SHIFT + MOVE_BITS
+
+SCORE_OFFSET = 1 << (SCORE_BITS - 1)
+MOVE_PRESENT = 1 << (MOVE_BITS - 1)
+PROMOTIONS = (None, 'Q', 'R', 'B', 'N')
+
+# tables created by process_table(), by size
+_process_tables = {}
+
+# the shared table attached by attach_table() last, by shared memory name
+_attached_tables = {}
+
+
+def pack_move(move):
+    """Returns a (src, dst, promotion) move, or None, as a MOVE_BITS integer."""
+    if move is None:
+        return 0
+    src, dst, promotion = move
+    return MOVE_PRESENT | src | dst << 6 | PROMOTIONS.index(promotion) << 12
+
+
+def unpack_move(packed):
+    """Returns the (src, dst, promotion) move, or None, packed by pack_move()."""
+    if not packed & MOVE_PRESENT:
+        return None
+    return packed & 63, (packed >> 6) & 63, PROMOTIONS[(packed >> 12) & 7]
+
+
+class TranspositionTable:
+    """A fixed-size table of Entry, with a depth-preferred and an always-replace slot per bucket."""
+    def __init__(self, megabytes=16):
+        self.megabytes = megabytes
+        self.buckets = max(1, megabytes * (1 << 20) // BYTES_PER_BUCKET)
+        self.table = self.allocate()
+        self.generation = 0
+
+        self.hits = self.misses = self.stores = 0
+
+    def new_search(self):
+        """Marks existing entries as being from an earlier search, so the depth-preferred slots can be reused."""
+        self.generation = (self.generation + 1) % (1 << GENERATION_BITS)
+
+    def allocate(self):
+        """Returns the zeroed words of a table of self.buckets buckets."""
+        return array.array('Q', bytes(self.buckets * BYTES_PER_BUCKET))
+
+    def clear(self):
+        """Empties the table."""
+        self.table = self.allocate()
+
+    def probe(self, key):
+        """Returns the Entry stored for Zobrist key, or None."""
+        table = self.table
+        index = (key % self.buckets) * SLOTS_PER_BUCKET * WORDS_PER_SLOT
+
+        for slot in range(index, index + SLOTS_PER_BUCKET * WORDS_PER_SLOT, WORDS_PER_SLOT):
+            data = table[slot + 1]
+            if data and table[slot] ^ data == key:
+                self.hits += 1
+                return Entry((data >> DEPTH_SHIFT) & ((1 << DEPTH_BITS) - 1),
+                             (data >> BOUND_SHIFT) & ((1 << BOUND_BITS) - 1),
+                             (data & ((1 << SCORE_BITS) - 1)) - SCORE_OFFSET,
+                             unpack_move((data >> MOVE_SHIFT) & ((1 << MOVE_BITS) - 1)))
+
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, bound, score, move):
+        """Stores an Entry for Zobrist key, replacing an earlier one for the same key or another key in its bucket."""
+        table = self.table
+        index = (key % self.buckets) * SLOTS_PER_BUCKET * WORDS_PER_SLOT
+        data = ((score + SCORE_OFFSET)
+                | depth << DEPTH_SHIFT
+                | bound << BOUND_SHIFT
+                | pack_move(move) << MOVE_SHIFT
+                | self.generation << GENERATION_SHIFT)
+
+        preferred = table[index + 1]
+        preferred_depth = (preferred >> DEPTH_SHIFT) & ((1 << DEPTH_BITS) - 1)
+        if (not preferred
+                or table[index] ^ preferred == key
+                or depth >= preferred_depth
+                or preferred >> GENERATION_SHIFT != self.generation):
+            slot = index
+        else:
+            slot = index + WORDS_PER_SLOT
+
+        table[slot], table[slot + 1] = key ^ data, data
+        self.stores += 1
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """A TranspositionTable in shared memory, read and written by every process that has it.
+
+    A new table is created unless name is that of an existing one's shared memory, which is then attached;
+    tracker is then the pid of the creator's multiprocessing resource tracker, if it's known.
+    Pickled, the table is sent as its name and attached on arrival, once per process. The process that created
+    it unlinks the shared memory on close(), or when the table is garbage collected."""
+    def __init__(self, megabytes=16, name=None, tracker=None):
+        self.shm, self.name, self.tracker = None, name, tracker
+        self.owner = os.getpid() if name is None else None
+        super().__init__(megabytes)
+
+    def __reduce__(self):
+        return attach_table, (self.name, self.megabytes, self.generation, self.tracker)
+
+    def __del__(self):
+        self.close()
+
+    def allocate(self):
+        """Returns the words of the table, in newly created or attached shared memory."""
+        size = self.buckets * BYTES_PER_BUCKET
+        if self.name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.name = self.shm.name
+            self.tracker = resource_tracker._resource_tracker._pid  # pylint: disable=protected-access
+        else:
+            self.shm = shared_memory.SharedMemory(self.name)
+            # A process that attaches is registered with its resource tracker, which unlinks the memory when every
+            # process using that tracker has exited. That's only right if it's the creator's tracker too.
+            tracker = resource_tracker._resource_tracker._pid  # pylint: disable=protected-access
+            if None not in (tracker, self.tracker) and tracker != self.tracker:
+                resource_tracker.unregister(self.shm._name, 'shared_memory')  # pylint: disable=protected-access
+        return self.shm.buf[:size].cast('Q')
+
+    def clear(self):
+        """Empties the table, for every process sharing it."""
+        self.shm.buf[:self.buckets * BYTES_PER_BUCKET] = bytes(self.buckets * BYTES_PER_BUCKET)
+
+    def close(self):
+        """Detaches this process from the table, and frees its memory if this process created it."""
+        if self.shm is None:
+            return
+        self.table.release()
+        self.shm.close()
+        if self.owner == os.getpid():
+            self.shm.unlink()
+        self.shm = None
+
+
+def process_table(megabytes=16):
+    """Returns this process's TranspositionTable of the given size, creating it on first use.
+
+    A pool worker process keeps its table from one task to the next, where a table pickled with each task would not."""
+    if megabytes not in _process_tables:
+        _process_tables[megabytes] = TranspositionTable(megabytes)
+    return _process_tables[megabytes]
+
+
+def attach_table(name, megabytes, generation, tracker=None):
+    """Returns this process's SharedTranspositionTable for the shared memory called name, attaching it on first use.
+
+    Unpickling a SharedTranspositionTable calls this, with the sender's generation. tracker is the pid of the
+    creator's resource tracker. Only the last table attached is kept: attaching another detaches it, so a long-lived
+    pool doesn't keep a mapping of every table it was ever sent, after their creators have freed them."""
+    if name not in _attached_tables:
+        for table in _attached_tables.values():
+            table.close()
+        _attached_tables.clear()
+        _attached_tables[name] = SharedTranspositionTable(megabytes, name, tracker)
+    table = _attached_tables[name]
+    table.generation = generation
+    return table
@@ -0,0 +1,17 @@
+"""State a pool worker process keeps from one task to the next.
+
+Tasks sent to a pool carry their position as FEN rather than a pickled Game; worker_game() sets it up in the
+worker, once for however many tasks share it.
+"""
+from .game import Game
+
+# the FEN this process last set up, and that Game
+_worker_state = {}
+
+
+def worker_game(fen):
+    """Returns this process's Game, set up at fen. It's only set up again when fen changes, so a worker sets up
+    each position once for all the tasks it's given in it."""
+    if _worker_state.get('fen') != fen:
+        _worker_state['fen'], _worker_state['game'] = fen, Game.from_fen(fen)
+    return _worker_state['game']
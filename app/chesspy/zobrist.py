@@ -0,0 +1,41 @@
+"""Zobrist hashing: 64-bit position keys that are updated incrementally as pieces move.
+
+A position's key is the XOR of one random number per (piece, square) on the board, plus one each for
+the side to move, the castling rights, and the en passant file. Board maintains the piece part, Game adds the rest.
+"""
+import random
+import itertools
+
+# fixed seed so that keys agree between runs and between processes
+_random = random.Random(20221127)
+
+PIECE_SQUARE = {piece: tuple(_random.getrandbits(64) for _ in range(64)) for piece in 'PNBRQKpnbrqk'}
+
+BLACK_TO_MOVE = _random.getrandbits(64)
+
+CASTLING_RIGHT = {right: _random.getrandbits(64) for right in 'KQkq'}
+
+EN_PASSANT_FILE = tuple(_random.getrandbits(64) for _ in range(8))
+
+
+def _castling_keys():
+    """Returns {rights: key} for every castling rights string, e.g. 'KQkq', 'Kq', or ''."""
+    keys = {}
+    for mask in itertools.product((False, True), repeat=4):
+        rights = ''.join(right for right, present in zip('KQkq', mask) if present)
+        keys[rights] = 0
+        for right in rights:
+            keys[rights] ^= CASTLING_RIGHT[right]
+    return keys
+
+
+CASTLING = _castling_keys()
+
+
+def squares_key(squares):
+    """Returns the piece part of the key for a list of 64 squares, as stored in Board.squares."""
+    key = 0
+    for sq, piece in enumerate(squares):
+        if piece is not None:
+            key ^= PIECE_SQUARE[piece][sq]
+    return key
@@ -1,19 +1,28 @@
 #!/usr/bin/env python3.10
 
-"""Print a chess board if run with argument 'board', otherwise, print all moves of The Immortal Game."""
+"""Print a chess board if run with argument 'board', run perft with 'perft', replay a PGN file with 'replay',
+measure parallel search with 'smp', otherwise, print all moves of The Immortal Game."""
 import sys
+import time
 import logging
 import chesspy.game
+import chesspy.corpus
+import chesspy.perft
+import chesspy.smp
 import chesspy.players
 
 
-def play(player_class):
-    """Play an interactive game of chess against the supplied player_class."""
+# seconds a searching player may think about each move in an interactive game
+PLAY_TIME_LIMIT = 5.0
+
+
+def play(player_class, **player_kwargs):
+    """Play an interactive game of chess against the supplied player_class, created with player_kwargs."""
     game = chesspy.game.Game()
     game.assert_check = False
     game.assert_mate = False
 
-    player = player_class(game)
+    player = player_class(game, **player_kwargs)
 
     move_num = 1
 
@@ -45,6 +54,8 @@ def play(player_class):
                 else:
                     game.move_san(sanstr)
                     print(f"{move_num}... {sanstr}")
+                    if last_search := getattr(player, 'last_search', None):
+                        print(f"    depth {last_search.depth}, {last_search.nodes} nodes, score {last_search.score}")
                     game_file.write(f" {sanstr}\n")
 
             move_num += 1
@@ -74,6 +85,104 @@ def play_immortal():
                 print("")
 
 
+def nodes_per_second(nodes, seconds):
+    """Returns nodes / seconds, or 0 for a run too short for the clock to measure."""
+    return nodes / seconds if seconds else 0
+
+
+def run_perft(args):
+    """Run perft on the reference positions and report nodes/second.
+
+    main.py perft [depth] [position name] [divide]
+
+    Returns True if every node count matches its reference count."""
+    names = [arg for arg in args[1:] if arg != 'divide']
+    known = [p.name for p in chesspy.perft.POSITIONS]
+    if (args and not args[0].isdigit()) or len(names) > 1 or (names and names[0] not in known):
+        print("usage: main.py perft [depth] [position name] [divide]")
+        print(f"positions: {' '.join(known)}")
+        return False
+
+    depth = int(args[0]) if args else 3
+    positions = [p for p in chesspy.perft.POSITIONS if not names or p.name == names[0]]
+
+    if 'divide' in args[1:]:
+        for position in positions:
+            game = chesspy.perft.position_game(position)
+            counts = chesspy.perft.divide(game, depth)
+            for move, nodes in counts:
+                print(f"{move}: {nodes}")
+            print(f"\n{len(counts)} moves, {sum(nodes for _, nodes in counts)} nodes")
+        return True
+
+    ok = True
+    total_nodes, total_seconds = 0, 0.0
+
+    for result in chesspy.perft.run_suite(depth, positions):
+        if result.expected is None:
+            status = "?"
+        elif result.nodes == result.expected:
+            status = "ok"
+        else:
+            status = f"FAIL (expected {result.expected})"
+            ok = False
+
+        total_nodes, total_seconds = total_nodes + result.nodes, total_seconds + result.seconds
+        print(f"{result.name:<21} depth {result.depth}  {result.nodes:>10} nodes  {result.seconds:8.2f}s  "
+              f"{nodes_per_second(result.nodes, result.seconds):>10,.0f} nodes/s  {status}")
+
+    print(f"{'total':<21}          {total_nodes:>10} nodes  {total_seconds:8.2f}s  "
+          f"{nodes_per_second(total_nodes, total_seconds):>10,.0f} nodes/s")
+
+    return ok
+
+
+def run_replay(args):
+    """Replay every game of a PGN file on a pool of worker processes, printing each failure and a summary.
+
+    main.py replay <pgn file> [workers] [trusted]
+
+    Returns True if every game was replayed without error."""
+    workers = int(args[1]) if len(args) > 1 and args[1].isdigit() else None
+    trusted = 'trusted' in args[1:]
+    games, moves, failures = 0, 0, 0
+    start = time.perf_counter()
+
+    for result in chesspy.corpus.replay(args[0], workers, trusted):
+        games, moves = games + 1, moves + result.moves
+        if result.error:
+            failures += 1
+            print(f"game {result.number} [Site \"{result.site}\"] {result.error}")
+
+    seconds = time.perf_counter() - start
+    print(f"{games} games, {moves} moves, {failures} failures in {seconds:.2f}s: {games / seconds:,.1f} games/s, "
+          f"{moves / seconds:,.0f} moves/s with {workers or chesspy.corpus.available_cores()} workers")
+
+    return failures == 0
+
+
+def run_smp(args):
+    """Search kiwipete with Lazy SMP on 1, 2, 4... cores and report nodes/second and time to each depth.
+
+    main.py smp [depth] [cores ...]"""
+    depth = int(args[0]) if args else 5
+    cores = [int(arg) for arg in args[1:]]
+    if not cores:
+        cores = [1]
+        while cores[-1] * 2 <= chesspy.corpus.available_cores():
+            cores.append(cores[-1] * 2)
+
+    game = chesspy.perft.position_game(chesspy.perft.POSITIONS[1])
+    base_seconds = None
+
+    for report in chesspy.smp.benchmark(game, depth, cores):
+        base_seconds = base_seconds or report.seconds
+        print(f"{report.cores:>3} cores  depth {report.search.depth}  {report.nodes:>10} nodes  {report.seconds:8.2f}s  "
+              f"{report.nodes / report.seconds:>10,.0f} nodes/s  {base_seconds / report.seconds:5.2f}x  "
+              f"score {report.search.score}")
+        print("           time to depth  " + "  ".join(f"{d}: {s:.2f}s" for d, s in report.depth_seconds.items()))
+
+
 if __name__ == "__main__":
     logging.basicConfig(filename='logs/chesspy.log',
                         encoding='utf-8',
@@ -92,7 +201,17 @@ if __name__ == "__main__":
             play(chesspy.players.Ricky)
             sys.exit(0)
         elif sys.argv[1] == "julian":
-            play(chesspy.players.Julian)
+            play(chesspy.players.Julian, time_limit=PLAY_TIME_LIMIT)
+            sys.exit(0)
+        elif sys.argv[1] == "bubbles":
+            play(chesspy.players.Bubbles, time_limit=PLAY_TIME_LIMIT)
+            sys.exit(0)
+        elif sys.argv[1] == "perft":
+            sys.exit(0 if run_perft(sys.argv[2:]) else 1)
+        elif sys.argv[1] == "replay" and len(sys.argv) > 2:
+            sys.exit(0 if run_replay(sys.argv[2:]) else 1)
+        elif sys.argv[1] == "smp":
+            run_smp(sys.argv[2:])
             sys.exit(0)
 
     play_immortal()
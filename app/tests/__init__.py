@@ -18,4 +18,11 @@ from .test_color import *
 from .test_board import *
 from .test_players import *
 from .test_analyzers import *
-from .test_move_generators import *
\ No newline at end of file
+from .test_move_generators import *
+from .test_perft import *
+from .test_corpus import *
+from .test_search import *
+from .test_transposition import *
+from .test_smp import *
+from .test_evaluation import *
+from .test_trace import *
\ No newline at end of file
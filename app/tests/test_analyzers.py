@@ -1,8 +1,9 @@
 import unittest
-from chesspy import analyzers
+from chesspy import analyzers, perft
 from chesspy.game import Game
 from chesspy.board import Board
 from chesspy.color import Color
+from chesspy.move_generators import legal_moves
 
 
 class TestAdjacentKings(unittest.TestCase):
@@ -329,3 +330,41 @@ class TestIsStaleMate(unittest.TestCase):
 
         self.game.move_san('b6')
         self.assertTrue(analyzers.is_in_mate(self.game.board, self.game.turn))
+
+
+class TestAnalyze(unittest.TestCase):
+    def test_start(self):
+        self.assertEqual(analyzers.analyze(Board(), Color.WHITE), analyzers.Analysis(False, False, False))
+
+    def test_check(self):
+        game = Game()
+        for sanstr in ('e4', 'f5', 'Qh5+'):
+            game.move_san(sanstr)
+        self.assertEqual(analyzers.analyze(game.board, Color.BLACK), analyzers.Analysis(True, False, False))
+
+    def test_checkmate(self):
+        board = Board(" Q           pk   p   p  p  N  p b     P bn     r     P   K     ")
+        game = Game(board, Color.BLACK)
+        game.move_san("Rc2#")
+        self.assertEqual(analyzers.analyze(game.board, Color.WHITE), analyzers.Analysis(True, True, False))
+
+    def test_stalemate(self):
+        game = Game(Board("       k     Q           P           P       KP                 "))
+        game.move_san('b6')
+        self.assertEqual(analyzers.analyze(game.board, Color.BLACK), analyzers.Analysis(False, False, True))
+
+    def test_same_as_legal_moves(self):
+        def check(game, depth):
+            analysis = analyzers.analyze(game.board, game.turn, game.en_passant)
+            no_moves = not legal_moves(game)
+            self.assertEqual(analysis.check, analyzers.is_in_check(game.board, game.turn))
+            self.assertEqual(analysis.checkmate, no_moves and analysis.check)
+            self.assertEqual(analysis.stalemate, no_moves and not analysis.check)
+            if depth:
+                for move in legal_moves(game):
+                    game.make(*move)
+                    check(game, depth - 1)
+                    game.pop()
+
+        for position in perft.POSITIONS:
+            check(perft.position_game(position), 2)
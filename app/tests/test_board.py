@@ -1,5 +1,6 @@
 import unittest
-from chesspy import board
+from chesspy import board, bitboard
+from chesspy.color import Color
 
 class TestBoard(unittest.TestCase):
     def test_init(self):
@@ -105,3 +106,57 @@ class TestBoardFindFrom(unittest.TestCase):
     @unittest.skip
     def test_2a(self): # specifies src_y/src_x to disambiguate
         self.assertTrue(False)
+
+class TestBoardBitboards(unittest.TestCase):
+    def setUp(self):
+        self.board = board.Board()
+
+    def test_pieces(self):
+        self.assertEqual(bitboard.bit(7, 1) | bitboard.bit(7, 6), self.board.pieces('N'))
+        self.assertEqual(bitboard.bit(0, 4), self.board.pieces('k'))
+        self.assertEqual(8, bitboard.popcount(self.board.pieces('p')))
+
+    def test_occupied(self):
+        self.assertEqual(16, bitboard.popcount(self.board.occupied(Color.WHITE)))
+        self.assertEqual(16, bitboard.popcount(self.board.occupied(Color.BLACK)))
+        self.assertEqual(32, bitboard.popcount(self.board.occupied()))
+
+    def test_place_piece_at(self):
+        self.board.place_piece_at('N', 4, 3)
+        self.board.place_piece_at(None, 7, 1)
+        self.board.place_piece_at('Q', 1, 3)  # captures a black pawn
+
+        self.assertEqual(bitboard.bit(4, 3) | bitboard.bit(7, 6), self.board.pieces('N'))
+        self.assertEqual(7, bitboard.popcount(self.board.pieces('p')))
+        self.assertEqual(bitboard.bit(7, 3) | bitboard.bit(1, 3), self.board.pieces('Q'))
+        self.assertEqual(17, bitboard.popcount(self.board.occupied(Color.WHITE)))
+        self.assertEqual(15, bitboard.popcount(self.board.occupied(Color.BLACK)))
+
+        for y in range(8):
+            for x in range(8):
+                if p := self.board.square_at(y, x):
+                    self.assertTrue(self.board.pieces(p) & bitboard.bit(y, x))
+
+    def test_attackers_of(self):
+        # f3 is covered by the g1 Knight and the e2 and g2 Pawns
+        self.assertEqual(bitboard.bit(7, 6) | bitboard.bit(6, 4) | bitboard.bit(6, 6),
+                         self.board.attackers_of(5, 5, Color.WHITE))
+        self.assertEqual(0, self.board.attackers_of(5, 5, Color.BLACK))
+
+        # the d8 Queen sees h4 once e7 is gone
+        self.assertEqual(0, self.board.attackers_of(4, 7, Color.BLACK))
+        self.board.place_piece_at(None, 1, 4)
+        self.assertEqual(bitboard.bit(0, 3), self.board.attackers_of(4, 7, Color.BLACK))
+
+    def test_coord_tables(self):
+        def mask(coords):
+            return sum(bitboard.bit(y, x) for y, x in coords)
+
+        for sq in range(64):
+            self.assertEqual(mask(bitboard.KNIGHT_COORDS[sq]), bitboard.KNIGHT_ATTACKS[sq])
+            self.assertEqual(mask(bitboard.KING_COORDS[sq]), bitboard.KING_ATTACKS[sq])
+            for direction, rays in bitboard.RAY_COORDS.items():
+                self.assertEqual(mask(rays[sq]), bitboard.RAYS[direction][sq])
+
+        # nearest first
+        self.assertEqual(bitboard.RAY_COORDS[(-1, 1)][bitboard.square(7, 0)][:2], ((6, 1), (5, 2)))
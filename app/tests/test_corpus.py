@@ -0,0 +1,93 @@
+import os
+import shutil
+import tempfile
+import unittest
+from chesspy import corpus, pgn
+
+SOURCES = ['multi', 'n7ZjoKNR', 'ZVWsf95x', 'YXOWlp4b', '1Ot7nMcK', 'CWefAkiK']
+
+class TestCorpus(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "corpus.pgn")
+
+        with open(self.path, 'w', encoding='utf-8') as corpus_f:
+            for basename in SOURCES:
+                with open(f"tests/games/{basename}.pgn", encoding='utf-8') as source_f:
+                    corpus_f.write(source_f.read().strip() + "\n\n\n")
+
+        self.game_count = len(pgn.GameIndex(self.path, sidecar=os.path.join(self.tmpdir, "corpus.idx")))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_shard_offsets(self):
+        size = os.path.getsize(self.path)
+
+        for shards in (1, 2, 3, 8, 100):
+            offsets = corpus.shard_offsets(self.path, shards)
+            self.assertLessEqual(len(offsets), shards)
+            self.assertEqual(offsets[0][0], 0)
+            self.assertEqual(sum(length for _, length in offsets), size)
+
+            with open(self.path, 'rb') as f:
+                for offset, length in offsets:
+                    f.seek(offset)
+                    self.assertTrue(f.read(length).startswith(b'[Event '), (shards, offset))
+
+        self.assertEqual(len(corpus.shard_offsets(self.path, 100)), self.game_count)
+
+    def test_replay_shard(self):
+        results = [result for offset, length in corpus.shard_offsets(self.path, 3)
+                   for result in corpus.replay_shard(self.path, offset, length)]
+
+        self.assertEqual(len(results), self.game_count)
+        self.assertEqual([None] * self.game_count, [result.error for result in results])
+        self.assertEqual(results[0].site, "London ENG")
+        self.assertEqual(results[0].moves, 46)
+
+    def test_replay(self):
+        results = list(corpus.replay(self.path, workers=2))
+
+        self.assertEqual(list(range(self.game_count)), [result.number for result in results])
+        self.assertEqual([None] * self.game_count, [result.error for result in results])
+        self.assertEqual(results[-1].site, "https://lichess.org/CWefAkiK")
+
+    def test_replay_trusted(self):
+        checked = list(corpus.replay(self.path, workers=2))
+        trusted = list(corpus.replay(self.path, workers=2, trusted=True))
+
+        self.assertEqual([None] * self.game_count, [result.error for result in trusted])
+        self.assertEqual([result.moves for result in checked], [result.moves for result in trusted])
+
+    def test_failure(self):
+        with open(self.path, 'a', encoding='utf-8') as corpus_f:
+            corpus_f.write('[Event "Broken"]\n[Site "broken"]\n[Date "2022.02.22"]\n[White "?"]\n[Black "?"]\n[Result "*"]\n\n'
+                           '1. e4 e5 2. Ke3 *\n')
+
+        for trusted in (False, True):
+            results = list(corpus.replay(self.path, workers=2, trusted=trusted))
+
+            self.assertEqual(len(results), self.game_count + 1)
+            self.assertEqual([None] * self.game_count, [result.error for result in results[:-1]])
+            self.assertEqual(results[-1].site, "broken")
+            self.assertEqual(results[-1].moves, 2)
+            self.assertTrue(results[-1].error.startswith("2. Ke3: "), results[-1].error)
+
+    def test_unreadable(self):
+        # a game without a Site header, one the parser can't read, then one that replays
+        with open(self.path, 'a', encoding='utf-8') as corpus_f:
+            corpus_f.write('[Event "No site"]\n[Date "2022.02.22"]\n[White "?"]\n[Black "?"]\n[Result "1-0"]\n\n1. e4 e5 1-0\n\n'
+                           '[Event Broken]\n[Site "broken"]\n[White "?"]\n[Black "?"]\n[Result "1-0"]\n\n1. d4 d5 1-0\n\n'
+                           '[Event "Fine"]\n[Site "fine"]\n[Date "2022.02.22"]\n[White "?"]\n[Black "?"]\n[Result "1-0"]\n\n'
+                           '1. c4 c5 1-0\n')
+
+        results = corpus.replay_shard(self.path, 0, os.path.getsize(self.path))
+        self.assertEqual(list(range(self.game_count + 3)), [result.number for result in results])
+        self.assertEqual([None] * self.game_count, [result.error for result in results[:-3]])
+        self.assertTrue(results[-3].error.startswith("unreadable game: KeyError('Site')"), results[-3].error)
+        self.assertTrue(results[-2].error.startswith("unreadable game: "), results[-2].error)
+        self.assertEqual((results[-1].site, results[-1].moves, results[-1].error), ("fine", 3, None))
+
+        results = list(corpus.replay(self.path, workers=2))
+        self.assertEqual([result.site for result in results[-3:]], [None, None, "fine"])
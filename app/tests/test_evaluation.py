@@ -0,0 +1,45 @@
+import unittest
+from chesspy import evaluation, perft
+from chesspy.game import Game
+from chesspy.board import Board
+from chesspy.color import Color
+from chesspy.move_generators import legal_moves
+
+
+class TestEvaluation(unittest.TestCase):
+    def test_start_position(self):
+        game = Game()
+        self.assertEqual(game.board.evaluation, 0)
+        self.assertEqual(evaluation.evaluate(game.board, Color.WHITE), 0)
+        self.assertEqual(evaluation.evaluate(game.board, Color.BLACK), 0)
+
+    def test_mirrored(self):
+        for piece in 'PNBRQK':
+            for sq in range(64):
+                self.assertEqual(evaluation.SQUARE_SCORES[piece][sq], -evaluation.SQUARE_SCORES[piece.lower()][sq ^ 56])
+
+    def test_piece_square(self):
+        board = Board(' ' * 64)
+        board.place_piece_at('N', 4, 4)  # e4
+        self.assertEqual(board.evaluation, evaluation.PIECE_VALUES['N'] + 20)
+        board.place_piece_at('n', 3, 4)  # e5, the same square from Black's side
+        self.assertEqual(board.evaluation, 0)
+        board.place_piece_at('Q', 3, 4)  # captures the Knight
+        self.assertEqual(board.evaluation, evaluation.PIECE_VALUES['N'] + 20 + evaluation.PIECE_VALUES['Q'] + 5)
+        board.place_piece_at(None, 4, 4)
+        self.assertEqual(evaluation.evaluate(board, Color.BLACK), -(evaluation.PIECE_VALUES['Q'] + 5))
+
+    def test_incremental(self):
+        def check(game, depth):
+            self.assertEqual(game.board.evaluation, evaluation.squares_score(game.board.squares))
+            if depth:
+                for move in legal_moves(game):
+                    game.make(*move)
+                    check(game, depth - 1)
+                    game.pop()
+
+        for position in perft.POSITIONS:
+            game = perft.position_game(position)
+            before = game.board.evaluation
+            check(game, 2)
+            self.assertEqual(game.board.evaluation, before, position.name)
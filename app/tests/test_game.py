@@ -1,6 +1,6 @@
 import unittest
 import itertools
-from chesspy import game, board
+from chesspy import game, board, zobrist, san, pgn, perft
 from chesspy.color import Color
 
 def simple_moves(path):
@@ -165,6 +165,124 @@ class TestCastle(unittest.TestCase):
         g.move_san('O-O-O')
         self.assertEqual(repr(g.board), "  kr bnrpppppppp                                PPPPPPPP  KR BNR")
 
+class TestCastlingRights(unittest.TestCase):
+    def test_initial(self):
+        self.assertEqual(game.Game().castling, 'KQkq')
+        self.assertEqual(game.Game(board.Board("r   k  rpppppppp                                PPPPPPPP    K  R")).castling, 'Kkq')
+
+    def test_king_moves(self):
+        g = game.Game()
+        for sanstr in ('e4', 'e5', 'Ke2'):
+            g.move_san(sanstr)
+        self.assertEqual(g.castling, 'kq')
+
+    def test_rook_moves_and_captured(self):
+        g = game.Game(board.Board("r   k  rpppppppp                                PPPPPPPPR   K  R"))
+        g.board.place_piece_at(None, 1, 7)
+        g.board.place_piece_at(None, 6, 7)
+        g.move_san('Rxh8#')
+        self.assertEqual(g.castling, 'Qq')
+
+    def test_castle(self):
+        g = game.Game(board.Board("r   k  rpppppppp                                PPPPPPPPR   K  R"))
+        g.move_san('O-O')
+        self.assertEqual(g.castling, 'kq')
+        g.move_san('O-O-O')
+        self.assertEqual(g.castling, '')
+
+class TestZobrist(unittest.TestCase):
+    def test_incremental(self):
+        g = game.Game()
+        for sanstr in simple_moves('tests/games/immortal.txt'):
+            g.move_san(sanstr)
+            self.assertEqual(g.board.zobrist_key, zobrist.squares_key(g.board.squares))
+
+    def test_transposition(self):
+        g = game.Game()
+        start_key = g.zobrist_key
+
+        for sanstr in ('Nf3', 'Nf6', 'Ng1'):
+            g.move_san(sanstr)
+            self.assertNotEqual(g.zobrist_key, start_key)
+        g.move_san('Ng8')
+        self.assertEqual(g.zobrist_key, start_key)
+
+        g, h = game.Game(), game.Game()
+        for sanstr in ('Nf3', 'Nc6', 'Nc3'):
+            g.move_san(sanstr)
+        for sanstr in ('Nc3', 'Nc6', 'Nf3'):
+            h.move_san(sanstr)
+        self.assertEqual(g.zobrist_key, h.zobrist_key)
+
+        g.move_san('e5')
+        h.move_san('e6')
+        self.assertNotEqual(g.zobrist_key, h.zobrist_key)
+
+    def test_state(self):
+        g = game.Game()
+        key = g.zobrist_key
+
+        g.turn = Color.BLACK
+        self.assertEqual(g.zobrist_key, key ^ zobrist.BLACK_TO_MOVE)
+
+        g.turn, g.castling = Color.WHITE, 'Kkq'
+        self.assertEqual(g.zobrist_key, key ^ zobrist.CASTLING_RIGHT['Q'])
+
+        g.castling, g.en_passant = 'KQkq', 8*5 + 4
+        self.assertEqual(g.zobrist_key, key ^ zobrist.EN_PASSANT_FILE[4])
+
+class TestPushPop(unittest.TestCase):
+    def assert_pop_restores(self, g, sanstr):
+        before = (repr(g.board), g.turn, g.castling, g.en_passant, g.zobrist_key)
+        capture = g.push(san.parse(sanstr, g))
+        self.assertNotEqual(repr(g.board), before[0])
+        g.pop()
+        self.assertEqual((repr(g.board), g.turn, g.castling, g.en_passant, g.zobrist_key), before)
+        return capture
+
+    def test_famous_game(self):
+        g = game.Game()
+        reprs = []
+        for sanstr, boardrepr in zip(simple_moves('tests/games/immortal.txt'), board_reprs('tests/games/immortal.boardreprs.txt')):
+            if sanstr in san.RESULT_SAN:
+                break
+            reprs.append((repr(g.board), g.zobrist_key))
+            g.push(san.parse(sanstr, g))
+            self.assertEqual(repr(g.board), boardrepr)
+
+        while reprs:
+            g.pop()
+            self.assertEqual((repr(g.board), g.zobrist_key), reprs.pop())
+        self.assertEqual(g.undo_stack, [])
+
+    def test_castle(self):
+        g = game.Game(board.Board("r   k  rpppppppp                                PPPPPPPPR   K  R"))
+        self.assert_pop_restores(g, 'O-O')
+        self.assert_pop_restores(g, 'O-O-O')
+        g.turn = Color.BLACK
+        self.assert_pop_restores(g, 'O-O')
+        self.assert_pop_restores(g, 'O-O-O')
+
+    def test_en_passant(self):
+        g = game.Game(board.Board("        p p   p  pP k p  P   pP P  PK  P                        "), en_passant=8*2 + 5)
+        self.assertEqual('p', self.assert_pop_restores(g, 'gxf6'))
+
+    def test_promotion(self):
+        g = game.Game()
+        g.board.place_piece_at(None, 0, 6)
+        g.board.place_piece_at('P', 1, 6)
+        self.assert_pop_restores(g, 'g8=N')
+        self.assertEqual('r', self.assert_pop_restores(g, 'gxh8=Q'))
+
+    def test_double_push(self):
+        g = game.Game()
+        g.push(san.parse('e4', g))
+        self.assertEqual(g.en_passant, 8*5 + 4)
+        g.push(san.parse('Nf6', g))
+        self.assertIsNone(g.en_passant)
+        g.pop()
+        self.assertEqual(g.en_passant, 8*5 + 4)
+
 # Putting the "FG" in "FGDD"
 #
 class TestFamousGames(unittest.TestCase):
@@ -188,3 +306,97 @@ class TestFamousGames(unittest.TestCase):
             # print(g.board)
             # print("")
             self.assertEqual(repr(g.board), boardrepr, idx)
+
+
+class TestTrusted(unittest.TestCase):
+    def setUp(self):
+        self.game = game.Game()
+        self.game.trusted = True
+
+    def test_famous_games(self):
+        for moves, reprs in (('tests/games/gotc.txt', 'tests/games/gotc.boardreprs.txt'),
+                             ('tests/games/immortal.txt', 'tests/games/immortal.boardreprs.txt')):
+            g = game.Game()
+            g.trusted = True
+            for sanstr, boardrepr in itertools.zip_longest(simple_moves(moves), board_reprs(reprs)):
+                g.move_san(sanstr)
+                self.assertEqual(repr(g.board), boardrepr, (moves, sanstr))
+            self.assertTrue(g.over)
+
+    def test_same_as_checked(self):
+        for path in ('tests/games/multi.pgn', 'tests/games/evergreen.pgn', 'tests/games/n7ZjoKNR.pgn'):
+            for pgn_game in pgn.Gamefile(path):
+                checked, trusted = game.Game(), game.Game()
+                trusted.trusted = True
+                for move in pgn_game:
+                    self.assertEqual(checked.move_san(move.sanstr), trusted.move_san(move.sanstr))
+                    self.assertEqual(checked.zobrist_key, trusted.zobrist_key, (path, move.sanstr))
+                self.assertEqual(checked.over, trusted.over)
+
+    def test_pinned_candidate(self):
+        # both Knights reach d2, but the e4 Knight is pinned to the King by the e8 Rook
+        self.game.board = board.Board("    r   " + " " * 24 + "    N   " + " N      " + " " * 8 + "    K   ")
+        self.game.move_san("Nd2")
+        self.assertEqual(self.game.board.square_at(5, 1), None)
+        self.assertEqual(self.game.board.square_at(4, 4), 'N')
+
+    def test_illegal(self):
+        for sanstr in ("Ke3", "e5", "Nd4", "exd3", "Qxd7", "O-O", "e9", "Nbd2"):
+            g = game.Game()
+            g.trusted = True
+            with self.assertRaises(IndexError, msg=sanstr):
+                g.move_san(sanstr)
+
+    def test_ambiguous(self):
+        self.game.board = board.Board(" " * 32 + " N   N  " + " " * 16 + "    K  k")
+        with self.assertRaises(IndexError):
+            self.game.move_san("Nd3")
+        self.game.move_san("Nbd3")
+        self.assertEqual(self.game.board.square_at(5, 3), 'N')
+
+
+class TestFen(unittest.TestCase):
+    def test_start(self):
+        g = game.Game.from_fen(game.START_FEN)
+        self.assertEqual(repr(g.board), repr(board.Board()))
+        self.assertEqual((g.turn, g.castling, g.en_passant), (Color.WHITE, 'KQkq', None))
+        self.assertEqual(game.Game().to_fen(), game.START_FEN)
+
+    def test_moves(self):
+        # https://en.wikipedia.org/wiki/Forsyth%E2%80%93Edwards_Notation#Examples
+        g = game.Game()
+        fens = ["rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1",
+                "rnbqkbnr/pp1ppppp/8/2p5/4P3/8/PPPP1PPP/RNBQKBNR w KQkq c6 0 2",
+                "rnbqkbnr/pp1ppppp/8/2p5/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 1 2"]
+        for sanstr, fen in zip(('e4', 'c5', 'Nf3'), fens):
+            g.move_san(sanstr)
+            self.assertEqual(g.to_fen(), fen)
+            self.assertEqual(game.Game.from_fen(fen).zobrist_key, g.zobrist_key)
+
+        for fen in reversed([game.START_FEN] + fens[:-1]):
+            g.pop()
+            self.assertEqual(g.to_fen(), fen)
+
+    def test_clocks(self):
+        g = game.Game.from_fen("4k3/8/8/8/8/8/4P3/R3K2r w Q - 7 40")
+        g.move_san('Kd2')
+        self.assertEqual(g.to_fen(), "4k3/8/8/8/8/8/3KP3/R6r b - - 8 40")
+        g.move_san('Rxa1')
+        self.assertEqual(g.to_fen(), "4k3/8/8/8/8/8/3KP3/r7 w - - 0 41")
+        g.pop()
+        g.pop()
+        self.assertEqual(g.to_fen(), "4k3/8/8/8/8/8/4P3/R3K2r w Q - 7 40")
+
+    def test_perft_positions(self):
+        for position in perft.POSITIONS:
+            self.assertEqual(game.Game.from_fen(position.fen).to_fen(), position.fen)
+
+    def test_without_clocks(self):
+        g = game.Game.from_fen("8/8/1k6/2b5/2pP4/8/5K2/8 b - d3")
+        self.assertEqual((g.en_passant, g.halfmove_clock, g.fullmove_number), (43, 0, 1))
+
+    def test_not_fen(self):
+        for fen in ("", "8/8/8/8/8/8/8/8", "8/8/8/8/8/8/8/8 x - -", "8/8/8/8/8/8/8/8 w KX -", "8/8/8/8/8/8/8/8 w - e4",
+                    "8/8/8/8/8/8/8/8 w - - 0", "8/8/8/8/8/8/8/9 w - -", "8/8/8/8/8/8/8/7X w - - 0 1", "8/8/8/8/8/8/8 w - -"):
+            with self.assertRaises(ValueError, msg=fen):
+                game.Game.from_fen(fen)
@@ -2,7 +2,7 @@ import unittest
 from chesspy.game import Game
 from chesspy.board import Board
 from chesspy.color import Color
-from chesspy import move_generators
+from chesspy import move_generators, move, perft
 
 
 class TestPawnMoveGenerator(unittest.TestCase):
@@ -478,3 +478,92 @@ class TestQueenMoveGenerator(unittest.TestCase):
     def test_in_bounds_0b(self):
         self.assertEqual("only generates in-bounds moves", False)
 
+
+
+class TestLegalMoves(unittest.TestCase):
+    KIWIPETE = "r   k  rp ppqpb bn  pnp    PN    p  P     N  Q pPPPBBPPPR   K  R"
+
+    def legal_moves(self, boardrepr, turn=Color.WHITE, castling='', en_passant=None):
+        return move_generators.legal_moves(Game(Board(boardrepr), turn, castling, en_passant))
+
+    def test_initial(self):
+        self.assertEqual(20, len(move_generators.legal_moves(Game())))
+
+    def test_kiwipete(self):
+        # well known position exercising castling, pins and promotions
+        self.assertEqual(48, len(self.legal_moves(self.KIWIPETE, castling='KQkq')))
+        self.assertEqual(43, len(self.legal_moves(self.KIWIPETE, Color.BLACK, castling='KQkq')))
+
+    def test_castling(self):
+        moves = self.legal_moves(self.KIWIPETE, castling='KQkq')
+        self.assertIn((60, 62, None), moves)
+        self.assertIn((60, 58, None), moves)
+
+        moves = self.legal_moves(self.KIWIPETE, castling='kq')
+        self.assertNotIn((60, 62, None), moves)
+        self.assertNotIn((60, 58, None), moves)
+
+        # f1 is attacked: no castling through check
+        board = self.KIWIPETE[:53] + 'p' + self.KIWIPETE[54:]
+        self.assertNotIn((60, 62, None), self.legal_moves(board, castling='KQkq'))
+
+    def test_pinned(self):
+        # the g3 Rook is pinned to the King by the Bishop, so it may only move along the pin
+        moves = self.legal_moves("       kp         p   R    b         q        RP     PPK        ")
+        self.assertNotIn((46, 30, None), moves)
+        self.assertIn((22, 30, None), moves)
+
+    def test_check_evasion(self):
+        moves = self.legal_moves("rnb k nrpp p pp  qp p  p   N     b P            P P PPPP RBQKBNR")
+        # capture the b4 Bishop with Knight or Rook, or block with Knight, Pawn, Bishop or Queen
+        self.assertEqual(sorted(moves), [(27, 33, None), (27, 42, None), (50, 42, None), (57, 33, None), (58, 51, None), (59, 51, None)])
+
+    def test_en_passant(self):
+        boardrepr = "        p p   p  pP k p  P   pP P  PK  P                        "
+        self.assertIn((30, 21, None), self.legal_moves(boardrepr, en_passant=21))
+        self.assertNotIn((30, 21, None), self.legal_moves(boardrepr))
+
+    def test_en_passant_discovered_check(self):
+        # capturing en passant would clear the rank between the King and the Rook
+        board = Board(' ' * 64)
+        for piece, y, x in (('k', 0, 4), ('K', 3, 0), ('P', 3, 1), ('p', 3, 2), ('r', 3, 7)):
+            board.place_piece_at(piece, y, x)
+        moves = move_generators.legal_moves(Game(board, Color.WHITE, '', 18))
+        self.assertNotIn((25, 18, None), moves)
+        self.assertIn((25, 17, None), moves)
+
+    def test_promotion(self):
+        board = Board(' ' * 64)
+        for piece, y, x in (('r', 0, 3), ('k', 0, 7), ('P', 1, 0), ('K', 7, 7)):
+            board.place_piece_at(piece, y, x)
+        moves = move_generators.legal_moves(Game(board, Color.WHITE, ''))
+        self.assertEqual([(8, 0, 'Q'), (8, 0, 'R'), (8, 0, 'B'), (8, 0, 'N')], [mv for mv in moves if mv[0] == 8])
+
+    def test_mate(self):
+        self.assertEqual([], self.legal_moves("P                               R               k KR           p", Color.BLACK))
+
+    def test_packed_moves(self):
+        for position in perft.POSITIONS:
+            game = perft.position_game(position)
+            packed = move_generators.packed_moves(game)
+            self.assertEqual([move.unpack(mv) for mv in packed], move_generators.legal_moves(game), position.name)
+
+        # kiwipete: castling both ways, captures by several pieces
+        packed = move_generators.packed_moves(perft.position_game(perft.POSITIONS[1]))
+        self.assertIn(move.pack(60, 62, None, 'K', move.KINGSIDE), packed)
+        self.assertIn(move.pack(60, 58, None, 'K', move.QUEENSIDE), packed)
+        self.assertIn(move.pack(28, 11, None, 'N', move.CAPTURE), packed)
+
+        game = perft.position_game(perft.POSITIONS[8])  # ep_gives_check
+        self.assertIn(move.pack(34, 43, None, 'P', move.CAPTURE | move.EN_PASSANT), move_generators.packed_moves(game))
+
+    def test_capture_moves(self):
+        for position in perft.POSITIONS:
+            game = perft.position_game(position)
+            expected = [mv for mv in move_generators.packed_moves(game) if mv & move.CAPTURE or move.unpack(mv)[2]]
+            self.assertEqual(move_generators.capture_moves(game), [move.unpack(mv) for mv in expected], position.name)
+
+        # kiwipete has 8 captures, ep_gives_check an en passant capture, promote_out_of_check 8 promotions
+        self.assertEqual(len(move_generators.capture_moves(perft.position_game(perft.POSITIONS[1]))), 8)
+        self.assertIn((34, 43, None), move_generators.capture_moves(perft.position_game(perft.POSITIONS[8])))
+        self.assertEqual(len(move_generators.capture_moves(perft.position_game(perft.POSITIONS[13]))), 8)
@@ -0,0 +1,37 @@
+import unittest
+from chesspy import perft
+from chesspy.game import Game
+
+
+class TestPerft(unittest.TestCase):
+    # keep it quick: only the depths with fewer than this many nodes
+    MAX_NODES = 10000
+
+    def test_positions(self):
+        for position in perft.POSITIONS:
+            for depth, expected in position.counts.items():
+                if expected < self.MAX_NODES:
+                    self.assertEqual(expected, perft.perft(perft.position_game(position), depth), (position.name, depth))
+
+    def test_unaltered(self):
+        game = Game()
+        perft.perft(game, 3)
+        self.assertEqual(repr(game.board), repr(Game().board))
+        self.assertEqual(game.zobrist_key, Game().zobrist_key)
+        self.assertEqual(game.undo_stack, [])
+
+    def test_divide(self):
+        counts = dict(perft.divide(Game(), 2))
+        self.assertEqual(20, len(counts))
+        self.assertEqual(20, counts['e2e4'])
+        self.assertEqual(400, sum(counts.values()))
+
+    def test_move_str(self):
+        self.assertEqual('e2e4', perft.move_str(52, 36))
+        self.assertEqual('a7a8q', perft.move_str(8, 0, 'Q'))
+
+    def test_run_suite(self):
+        results = list(perft.run_suite(2))
+        self.assertEqual(len(perft.POSITIONS), len(results))
+        for result in results:
+            self.assertEqual(result.expected, result.nodes, result.name)
@@ -1,11 +1,13 @@
+import io
 import os
-import glob
+import shutil
+import tempfile
 import datetime
 import unittest
+import unittest.mock
 import itertools
 import chesspy.game
-from chesspy import pgn
-from multiprocessing import Process
+from chesspy import pgn, corpus
 
 def board_reprs(path):
     with open(path, 'r') as f:
@@ -76,6 +78,155 @@ class TestPgnBasic(unittest.TestCase):
         self.assertEqual(game.metadata.opening, "King's Gambit Accepted: Bishop's Gambit, Bryan Countergambit")
         self.assertEqual(game.metadata.annotator, "https://lichess.org/@/Chess_Poems")
 
+class TestTokens(unittest.TestCase):
+    def test_chunk_boundaries(self):
+        with open("tests/games/multi.pgn", 'rb') as f:
+            data = f.read()
+
+        for chunk_size in (1, 2, 3, 7, 64, 4096, len(data), len(data) + 1):
+            self.assertEqual(list(pgn.iter_tokens(io.BytesIO(data), chunk_size)), data.decode().split(), chunk_size)
+
+    def test_no_trailing_newline(self):
+        self.assertEqual(list(pgn.iter_tokens(io.BytesIO(b"1. e4 e5 1-0"), 4)), ['1.', 'e4', 'e5', '1-0'])
+        self.assertEqual(list(pgn.iter_tokens(io.BytesIO(b"  "), 1)), [])
+        self.assertEqual(list(pgn.iter_tokens(io.BytesIO(b""))), [])
+
+    def test_length(self):
+        f = io.BytesIO(b"1. e4 e5 2. Nf3")
+        f.seek(3)
+        self.assertEqual(list(pgn.iter_tokens(f, 2, length=6)), ['e4', 'e5'])
+
+    def test_utf8(self):
+        data = '[White "Jos\u00e9 Ra\u00fal Capablanca"]'.encode()
+        self.assertEqual(list(pgn.iter_tokens(io.BytesIO(data), 1)), ['[White', '"Jos\u00e9', 'Ra\u00fal', 'Capablanca"]'])
+
+    def test_parser_is_lazy(self):
+        def tokens():
+            yield from ['[Event', '"Lazy"]', '1.', 'e4', 'e5']
+            raise AssertionError("read past the first move")
+
+        parser = pgn.pgn_parser(tokens())
+        self.assertEqual(next(parser), pgn.NEW_GAME_TOKEN)
+        self.assertEqual(next(parser), {'Event': 'Lazy'})
+        self.assertEqual(next(parser), 'e4')
+
+    def test_same_moves(self):
+        with open("tests/games/multi.pgn", encoding='utf-8') as f:
+            expected = list(pgn.pgn_parser(f.read().split()))
+
+        with open("tests/games/multi.pgn", 'rb') as f:
+            self.assertEqual(list(pgn.pgn_parser(pgn.iter_tokens(f, 5))), expected)
+
+class TestGameIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "multi.pgn")
+        shutil.copy("tests/games/multi.pgn", self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_entries(self):
+        index = pgn.GameIndex(self.path)
+        self.assertEqual(len(index), 3)
+        self.assertEqual(index[0].offset, 0)
+        self.assertEqual(index[1].offset, index[0].length)
+        self.assertEqual(index[2].offset + index[2].length, os.path.getsize(self.path))
+        self.assertEqual(index[0].headers['White'], "Adolf Anderssen")
+        self.assertEqual(index[1].headers['Event'], "'The Evergreen Game'")
+
+        with open(self.path, 'rb') as f:
+            for entry in index:
+                f.seek(entry.offset)
+                self.assertTrue(f.read(entry.length).startswith(b'[Event '))
+
+    def test_find(self):
+        index = pgn.GameIndex(self.path)
+        self.assertEqual(index.find(Site="http://gameknot.com/"), 1)
+        self.assertEqual(index.find(White="Adolph Anderssen", Black="Jean Dufresne"), 1)
+        with self.assertRaises(KeyError):
+            index.find(Site="nowhere")
+
+    def test_sidecar(self):
+        index = pgn.GameIndex(self.path)
+        self.assertTrue(os.path.exists(self.path + '.idx'))
+
+        # a fresh sidecar is loaded, not rescanned
+        with unittest.mock.patch.object(pgn.GameIndex, 'scan', side_effect=AssertionError):
+            self.assertEqual(pgn.GameIndex(self.path).entries, index.entries)
+
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write('\n[Event "Appended"]\n\n1. e4 e5 *\n')
+        os.utime(self.path, ns=(0, 0))
+
+        index = pgn.GameIndex(self.path)
+        self.assertEqual(len(index), 4)
+        self.assertEqual(index[3].headers, {'Event': 'Appended'})
+
+    def test_game(self):
+        gamefile = pgn.Gamefile(self.path)
+        games = list(pgn.Gamefile(self.path))
+
+        for number in (2, 0, 1):
+            game = gamefile.game(number)
+            self.assertEqual(game.metadata, games[number].metadata)
+
+        game = gamefile.find(Site="London ENG")
+        self.assertEqual(game.metadata.white, "Adolf Anderssen")
+        self.assertEqual([move.sanstr for move in game][:3], ['e4', 'e5', 'f4'])
+
+    def test_range(self):
+        index = pgn.GameIndex(self.path)
+        games = list(pgn.Gamefile(self.path, index[1].offset, index[1].length))
+        self.assertEqual(len(games), 1)
+        self.assertEqual(games[0].metadata.black, "Jean Dufresne")
+
+    def test_empty(self):
+        path = os.path.join(self.tmpdir, "empty.pgn")
+        open(path, 'w').close()
+        self.assertEqual(len(pgn.GameIndex(path)), 0)
+
+class TestScanMetadata(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "scan.pgn")
+
+        with open(self.path, 'w', encoding='utf-8') as scan_f:
+            for basename in ('multi', 'n7ZjoKNR', 'ZVWsf95x', 'YXOWlp4b', '1Ot7nMcK', 'CWefAkiK'):
+                with open(f"tests/games/{basename}.pgn", encoding='utf-8') as source_f:
+                    scan_f.write(source_f.read().strip() + "\n\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_same_as_gamefile(self):
+        expected = [game.metadata for game in pgn.Gamefile(self.path)]
+        self.assertEqual(len(expected), 8)
+        self.assertEqual(list(pgn.scan_metadata(self.path)), expected)
+        self.assertIsInstance(expected[0], pgn.Metadata)
+
+    def test_skips_movetext(self):
+        with unittest.mock.patch.object(pgn, 'iter_tokens', side_effect=AssertionError):
+            self.assertEqual(len(list(pgn.scan_metadata(self.path))), 8)
+
+    def test_predicates(self):
+        def sites(*predicates):
+            return [metadata.site.rstrip("/").split("/")[-1] for metadata in pgn.scan_metadata(self.path, *predicates)]
+
+        self.assertEqual(len(sites(pgn.played_by("DrNykterstein"))), 6)
+        self.assertEqual(sites(pgn.played_by("Jean Dufresne")), ["gameknot.com"])
+        self.assertEqual(sites(pgn.opening_startswith("King's Gambit")), ["London ENG"])
+        self.assertEqual(sites(pgn.dated_between(datetime.date(2021, 12, 22))), ["n7ZjoKNR", "ZVWsf95x"])
+        self.assertEqual(sites(pgn.dated_between(None, datetime.date(1900, 1, 1))), ["London ENG"])
+        self.assertEqual(sites(pgn.played_by("DrNykterstein"), pgn.dated_between(last=datetime.date(2020, 12, 31))),
+                         ["1Ot7nMcK", "CWefAkiK"])
+        self.assertEqual(sites(lambda metadata: False), [])
+
+    def test_empty(self):
+        path = os.path.join(self.tmpdir, "empty.pgn")
+        open(path, 'w').close()
+        self.assertEqual(list(pgn.scan_metadata(path)), [])
+
 class TestMagnusLichess(unittest.TestCase):
     # indirect correctness check. with enough sample games, bugs compound and reveal themselves.
     #
@@ -117,20 +268,13 @@ class TestMagnusLichess(unittest.TestCase):
                         print("")
 
     def test_long(self):
-        if (long_basename := os.environ.get('TEST_LONG', None)):
-            filenames = glob.glob(f"tests/games/{long_basename}.*.pgn")
-            filenames = [ os.path.basename(n).split('.pgn')[0] for n in filenames ]
-
-            procs = []
-            for filename in filenames:
-                p = Process(target=self.exec_test_pgn, args=(filename,),
-                                                       kwargs={'do_print': False, 'continue_on_fail': False})
-                p.start()
-                procs.append(p)
-
-            [ p.join() for p in procs ]
+        # TEST_LONG is the path of a PGN file, replayed in parallel shards by chesspy.corpus
+        if (long_path := os.environ.get('TEST_LONG', None)):
+            failures = [result for result in corpus.replay(long_path) if result.error]
+            for result in failures:
+                print(f"game {result.number} [Site \"{result.site}\"] {result.error}")
 
-            self.assertEqual([0], list(set(p.exitcode for p in procs)))
+            self.assertEqual([], failures)
 
     def test_n7ZjoKNR(self):
         self.exec_test_pgn('n7ZjoKNR')
@@ -1,11 +1,17 @@
 import os
+import time
+import pickle
 import unittest
+import unittest.mock
 import itertools
 import traceback
 from chesspy import players
+from chesspy import search
+from chesspy.players import julian
 from chesspy.game import Game
 from chesspy.board import Board
 from chesspy.color import Color
+from chesspy.move import unpack
 from multiprocessing import Pool
 from chesspy.analyzers import is_in_check, is_in_mate, adjacent_kings
 
@@ -112,6 +118,13 @@ class TestRicky(PlayerTest.TestPlayer):
         self.player_w = players.Ricky(self.game, color=Color.WHITE)
         self.player_b = players.Ricky(self.game, color=Color.BLACK)
 
+    def test_moves_high_value_pieces(self):
+        # cxd5 scores a little better than Rxd5, but Ricky would rather move the rook
+        self.game.board = Board.from_fen("k7/pp6/8/3n4/2P5/8/8/3R3K")
+        self.game.turn, self.game.castling = Color.WHITE, ''
+        self.player_w.moves_suggested = set()
+        self.assertEqual(self.player_w.suggest_move_san(), "Rd1xd5")
+
 
 class TestJulian(PlayerTest.TestPlayer):
     def setUp(self):
@@ -121,6 +134,139 @@ class TestJulian(PlayerTest.TestPlayer):
         self.player_w = players.Julian(self.game, color=Color.WHITE, pool=self.pool)
         self.player_b = players.Julian(self.game, color=Color.BLACK, pool=self.pool)
 
+    def test_finds_mate(self):
+        # back rank: Ra1-a8#
+        self.game.board = Board("       k      pp                                        R     K ")
+        self.game.turn, self.game.castling = Color.WHITE, ''
+        self.assertEqual(self.player_w.suggest_move_san(), "Ra1a8")
+        self.assertEqual(self.player_w.last_search.pv, [(56, 0, None)])
+
+    def test_time_limit(self):
+        self.game.turn = Color.WHITE
+        start = time.monotonic()
+        self.assertIsNotNone(self.player_w.suggest_move_san(time_limit=0.5))
+        self.assertLess(time.monotonic() - start, 3.0)
+        self.assertGreaterEqual(self.player_w.last_search.depth, 2)
+        self.assertEqual(len(self.player_w.last_search.pv), self.player_w.last_search.depth)
+
+    def test_node_limit(self):
+        self.game.turn = Color.WHITE
+        self.player_w.suggest_move_san(node_limit=5000)
+        self.assertLessEqual(self.player_w.last_search.nodes, 5000)
+        self.assertGreaterEqual(self.player_w.last_search.depth, 2)
+
+    def test_shared_table(self):
+        # the workers' results are in the table Julian shares with them
+        self.game.turn = Color.WHITE
+        self.player_w.suggest_move_san(depth=2)
+        tt = self.player_w.tt
+        self.assertEqual(tt.stores, 0)
+        for mv in self.player_w.imagine_packed_moves():
+            with self.player_w.trying_move(mv):
+                self.assertEqual(tt.probe(self.game.zobrist_key).depth, 1)
+
+    def test_packet_size(self):
+        # a task sent to a worker holds the position and the move, not Julian and his Game
+        for sanstr in ("e4", "e5", "Nf3", "Nc6", "Bb5", "a6"):
+            self.game.move_san(sanstr)
+        mv = self.player_w.imagine_packed_moves()[0]
+        packet = (self.game.to_fen(), mv, 3, -search.INFINITY, None, None, self.player_w.tt)
+        self.assertLess(len(pickle.dumps((julian.consider_packet, [packet]))), 300)
+
+        [result] = self.pool.map(julian.consider_packet, [packet])
+        expected = julian.consider_move(self.game, None, mv, 3)
+        self.assertEqual((result.score, len(result.pv)), (expected.score, len(expected.pv)))
+
+    def test_alpha(self):
+        # a move that can't beat alpha is searched only far enough to tell, and scored no better than alpha
+        self.game.turn = Color.WHITE
+        mv = self.player_w.imagine_packed_moves()[0]
+        exact = julian.consider_move(self.game, None, mv, 3)
+        self.assertEqual(julian.consider_move(self.game, None, mv, 3, exact.score - 1).score, exact.score)
+
+        bounded = julian.consider_move(self.game, None, mv, 3, exact.score + 100)
+        self.assertLessEqual(bounded.score, exact.score + 100)
+        self.assertLess(bounded.nodes, exact.nodes)
+
+    def test_without_pool(self):
+        # Julian searches the whole position at once, as one search
+        self.game.turn = Color.WHITE
+        player = players.Julian(self.game, color=Color.WHITE)
+        self.assertIsNotNone(player.suggest_move_san(depth=3))
+        expected = search.Search(self.game).search(3)
+        self.assertEqual((player.last_search.score, player.last_search.depth), (expected.score, 3))
+
+        self.player_w.suggest_move_san(depth=3)
+        self.assertEqual(self.player_w.last_search.score, expected.score)
+
+        self.assertIsNotNone(player.suggest_move_san(node_limit=5000))
+        self.assertGreaterEqual(player.last_search.depth, 2)
+
+    def test_cut_short(self):
+        self.game.turn = Color.WHITE
+        moves = self.player_w.imagine_packed_moves()
+        best_move, result, finished = self.player_w.search_moves(moves, 2)
+        self.assertTrue(finished)
+        self.assertEqual((result.pv[0], result.depth), (unpack(best_move), 2))
+        self.assertIsNone(self.player_w.search_moves(moves, 2, deadline=time.monotonic()))
+
+    def test_deepest(self):
+        # Julian searches no deeper than Search can
+        with unittest.mock.patch.object(search, 'MAX_DEPTH', 2), unittest.mock.patch.object(julian, 'MAX_DEPTH', 2):
+            player = players.Julian(self.game, color=Color.WHITE)
+            self.assertIsNotNone(player.suggest_move_san(depth=5))
+            self.assertEqual(player.last_search.depth, 2)
+            self.assertIsNotNone(player.suggest_move_san(depth=5, node_limit=100000))
+            self.assertEqual(player.last_search.depth, 2)
+
+    def test_worker_game(self):
+        fen = self.game.to_fen()
+        game = julian.worker_game(fen)
+        self.assertIs(julian.worker_game(fen), game)
+        self.assertEqual(game.to_fen(), fen)
+
+        self.game.move_san("e4")
+        self.assertEqual(julian.worker_game(self.game.to_fen()).to_fen(), self.game.to_fen())
+
+    def test_lazy_smp(self):
+        self.game.turn = Color.WHITE
+        player = players.Julian(self.game, color=Color.WHITE, pool=self.pool, smp_workers=2)
+        self.assertIsNotNone(player.suggest_move_san(depth=2))
+        self.assertEqual((player.last_search.depth, len(player.last_search.pv)), (2, 2))
+        self.assertIsNotNone(player.suggest_move_san(node_limit=5000))
+        self.assertGreaterEqual(player.last_search.depth, 2)
+        player.close()
+
+
+class TestBubbles(PlayerTest.TestPlayer):
+    def setUp(self):
+        super().setUp()
+        self.avoids_adjacent_kings_test_count = 1
+        self.exit_check_test_count = 1
+        self.player_w = players.Bubbles(self.game, color=Color.WHITE)
+        self.player_b = players.Bubbles(self.game, color=Color.BLACK)
+
+    def test_last_search(self):
+        self.game.turn = Color.WHITE
+        self.player_w.suggest_move_san()
+        self.assertEqual(len(self.player_w.last_search.pv), self.player_w.search_depth)
+        self.assertGreater(self.player_w.last_search.nodes, 20)
+
+    def test_time_limit(self):
+        self.game.turn = Color.WHITE
+        player = players.Bubbles(self.game, color=Color.WHITE, time_limit=0.5)
+        start = time.monotonic()
+        self.assertIsNotNone(player.suggest_move_san())
+        self.assertLess(time.monotonic() - start, 1.5)
+        self.assertGreaterEqual(player.last_search.depth, 3)
+
+    def test_deepest(self):
+        # Bubbles searches no deeper than Search can
+        self.game.turn = Color.WHITE
+        with unittest.mock.patch.object(search, 'MAX_DEPTH', 2):
+            self.assertIsNotNone(self.player_w.suggest_move_san(depth=5))
+            self.assertEqual(self.player_w.last_search.depth, 2)
+
 
 class TestRandyVsRicky(PlayerTest.TestPlayer):
     def setUp(self):
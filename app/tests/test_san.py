@@ -1,7 +1,7 @@
 import unittest
 from chesspy.color import Color
 from chesspy.castle import Castle
-from chesspy import san, game, board
+from chesspy import san, game, board, move
 
 class TestMove(unittest.TestCase):
     def test_0(self):
@@ -107,6 +107,7 @@ class TestSanBasic(unittest.TestCase):
         self.assertEqual(mv.castle, Castle.QUEENSIDE)
         self.assertTrue(mv.check)
         self.assertTrue(mv.mate)
+        self.assertEqual('O-O-O#', san.make_san(mv, verbose=True))
 
     def test_9(self):
         mv = san.parse('bxa1=Q')
@@ -128,6 +129,12 @@ class TestSanBasic(unittest.TestCase):
         self.assertTrue(mv.check)
         self.assertFalse(mv.mate)
 
+    def test_b(self):
+        mv = san.parse('e7xd8=Q+')
+        self.assertEqual(mv.src, (1, 4))
+        self.assertEqual(mv.promotion, 'Q')
+        self.assertEqual('e7xd8=Q+', san.make_san(mv, verbose=True))
+
     @unittest.skip
     def test_friendly_fire(self):
         # don't allow capture of own piece
@@ -872,3 +879,91 @@ class TestSanDeluxe1(unittest.TestCase):
         # if 'x' in san then mv.capture is True
         self.assertTrue(False)
 
+
+
+class TestSanSplit(unittest.TestCase):
+    def test_split(self):
+        self.assertEqual(san.split('e4'), san.SanParts(False, 'P', None, None, False, 36, None, False))
+        self.assertEqual(san.split('exd5'), san.SanParts(False, 'P', None, 4, True, 27, None, False))
+        self.assertEqual(san.split('R1e2+'), san.SanParts(False, 'R', 7, None, False, 52, None, False))
+        self.assertEqual(san.split('Qh4xe1!?'), san.SanParts(False, 'Q', 4, 7, True, 60, None, False))
+        self.assertEqual(san.split('exd8=N#'), san.SanParts(False, 'P', None, 4, True, 3, 'N', True))
+        self.assertEqual(san.split('O-O-O+'), san.SanParts(Castle.QUEENSIDE, 'K', None, None, False, None, None, False))
+        self.assertEqual(san.split('O-O#'), san.SanParts(Castle.KINGSIDE, 'K', None, None, False, None, None, True))
+
+    def test_split_syntax(self):
+        for sanstr in ('', 'e9', 'i4', 'Pe4', 'e4 ', 'Nxx4', '33', 'O-O-O-O'):
+            with self.assertRaises(IndexError, msg=sanstr):
+                san.split(sanstr)
+
+
+class TestPackedMove(unittest.TestCase):
+    def test_pack(self):
+        packed = move.pack(52, 36)
+        self.assertEqual(move.unpack(packed), (52, 36, None))
+        self.assertEqual(move.piece_of(packed), 'P')
+        self.assertLess(move.pack(63, 63, 'N', 'K', move.MATE), 1 << 24)
+
+    def test_round_trip(self):
+        g = game.Game()
+        for sanstr in ('e4', 'd5', 'exd5', 'Qxd5', 'Nc3', 'Qa5', 'Bc4', 'Nf6', 'Nf3', 'Bg4', 'O-O', 'e5', 'Re1', 'Bxf3',
+                       'Qxf3', 'Bb4', 'Qxb7', 'O-O', 'Qxa8', 'c6', 'd4', 'Nbd7', 'Qxa7', 'Qa4', 'Bxf7+'):
+            mv = san.parse(sanstr, g)
+            if mv.castle:
+                mv.src_y, mv.src_x = (7, 4) if g.turn == Color.WHITE else (0, 4)
+                mv.dst_y, mv.dst_x = mv.src_y, 6 if mv.castle == Castle.KINGSIDE else 2
+            copy = move.Move.from_packed(mv.pack())
+            self.assertEqual(san.make_san(copy), san.make_san(mv))
+            self.assertEqual(copy.pack(), mv.pack())
+            g.push(mv)
+
+
+class TestSanCache(unittest.TestCase):
+    def setUp(self):
+        self.saved, san.cache = san.cache, san.SanCache()
+
+    def tearDown(self):
+        san.cache = self.saved
+
+    def test_replay_hits(self):
+        for replay in range(2):
+            g = game.Game()
+            for sanstr in ('e4', 'e5', 'Nf3', 'Nc6', 'Bb5', 'a6', 'Ba4', 'Nf6', 'O-O'):
+                g.move_san(sanstr)
+            self.assertEqual((san.cache.hits, san.cache.misses), (8 * replay, 8), replay)
+
+        self.assertEqual(repr(g.board), "r bqkb r ppp pppp n  n      p   B   P        N  PPPP PPPRNBQ RK ")
+
+    def test_same_move(self):
+        g = game.Game()
+        for sanstr in ('e4', 'd5', 'exd5', 'e5', 'dxe6'):
+            g.move_san(sanstr)
+        g.pop()
+
+        mv = san.parse('dxe6', g)
+        self.assertEqual(san.cache.hits, 1)
+        self.assertTrue(mv.en_passant)
+        self.assertEqual(san.make_san(mv), 'd5xe6')
+
+    def test_illegal_not_cached(self):
+        g = game.Game()
+        for _ in range(2):
+            with self.assertRaises(IndexError):
+                g.move_san('Ke2')
+        self.assertEqual((san.cache.hits, len(san.cache)), (0, 0))
+
+    def test_least_recently_used(self):
+        cache = san.SanCache(2)
+        cache.put(1, 'e4', 100)
+        cache.put(2, 'e4', 200)
+        self.assertEqual(cache.get(1, 'e4'), 100)
+        cache.put(3, 'e4', 300)  # evicts 2, used less recently than 1
+
+        self.assertIsNone(cache.get(2, 'e4'))
+        self.assertEqual(cache.get(1, 'e4'), 100)
+        self.assertEqual(cache.get(3, 'e4'), 300)
+        self.assertIsNone(cache.get(1, 'e5'))
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (3, 2, 2))
+
+        cache.clear()
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (0, 0, 0))
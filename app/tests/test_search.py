@@ -0,0 +1,290 @@
+import time
+import unittest
+import unittest.mock
+from chesspy import search, perft
+from chesspy.game import Game
+from chesspy.board import Board
+from chesspy.color import Color
+from chesspy.evaluation import PIECE_VALUES
+from chesspy.transposition import TranspositionTable
+from chesspy.move_generators import legal_moves, capture_moves
+
+
+def board_with(*pieces):
+    board = Board(' ' * 64)
+    for piece, y, x in pieces:
+        board.place_piece_at(piece, y, x)
+    return board
+
+
+def minimax(game, depth):
+    # negamax without pruning, to check that pruning doesn't change the score
+    if depth == 0:
+        return search.evaluate(game.board, game.turn)
+
+    moves = legal_moves(game)
+    if not moves:
+        return -search.MATE_SCORE if search.in_check(game.board, game.turn) else search.DRAW_SCORE
+
+    best = -search.INFINITY
+    for move in moves:
+        game.make(*move)
+        best = max(best, -minimax(game, depth - 1))
+        game.pop()
+    return best
+
+
+class TestSearch(unittest.TestCase):
+    def test_evaluate(self):
+        game = Game()
+        self.assertEqual(search.evaluate(game.board, Color.WHITE), 0)
+
+        # the Queen is worth 900, less 5 for standing on the back rank
+        game.board.place_piece_at(None, 0, 3)
+        self.assertEqual(search.evaluate(game.board, Color.WHITE), 895)
+        self.assertEqual(search.evaluate(game.board, Color.BLACK), -895)
+
+    def test_mate_in_one(self):
+        # back rank: Ra1-a8#
+        game = Game(board_with(('k', 0, 7), ('p', 1, 6), ('p', 1, 7), ('R', 7, 0), ('K', 7, 6)), Color.WHITE, '')
+        result = search.search(game, 2)
+        self.assertEqual(result.score, search.MATE_SCORE - 1)
+        self.assertEqual(result.pv, [(56, 0, None)])
+
+    def test_mate_in_two(self):
+        # rook ladder: Rb2-b7, then Ra1-a8#
+        game = Game(board_with(('k', 0, 7), ('R', 6, 1), ('R', 7, 0), ('K', 7, 6)), Color.WHITE, '')
+        # the mated side's lack of moves is seen a ply after the mating move
+        result = search.search(game, 4)
+        self.assertEqual(result.score, search.MATE_SCORE - 3)
+        self.assertEqual(result.pv[0], (49, 9, None))
+        self.assertEqual(len(result.pv), 3)
+
+    def test_mated(self):
+        game = Game(Board("P                               R               k KR           p"), Color.BLACK, '')
+        self.assertEqual(search.search(game, 3), search.SearchResult(-search.MATE_SCORE, [], 1, 3))
+
+    def test_stalemate(self):
+        game = Game(board_with(('k', 0, 7), ('Q', 2, 6), ('K', 7, 0)), Color.BLACK, '')
+        self.assertEqual(search.search(game, 3), search.SearchResult(search.DRAW_SCORE, [], 1, 3))
+
+    def test_wins_material(self):
+        # the Knight forks King and Queen
+        game = Game(board_with(('k', 0, 4), ('q', 0, 0), ('N', 3, 3), ('K', 7, 4)), Color.WHITE, '')
+        result = search.search(game, 3)
+        self.assertEqual((result.pv[0], result.pv[2]), ((27, 10, None), (10, 0, None)))
+        # a Knight up, give or take where the pieces stand
+        self.assertAlmostEqual(result.score, PIECE_VALUES['N'], delta=100)
+
+    def test_same_score_as_minimax(self):
+        for position in perft.POSITIONS[:4]:
+            for depth in (1, 2):
+                game = perft.position_game(position)
+                expected = minimax(game, depth)
+                result = search.Search(game, quiescence=False).search(depth)
+                self.assertEqual(result.score, expected, (position.name, depth))
+                self.assertLessEqual(result.nodes, perft.perft(game, depth) + perft.perft(game, depth - 1) + 1)
+
+        game = perft.position_game(perft.POSITIONS[2])
+        self.assertEqual(search.Search(game, quiescence=False).search(3).score, minimax(game, 3))
+
+    def test_pv_is_legal(self):
+        game = perft.position_game(perft.POSITIONS[1])
+        result = search.search(game, 3)
+        self.assertEqual(len(result.pv), 3)
+
+        for move in result.pv:
+            self.assertIn(move, legal_moves(game))
+            game.make(*move)
+
+        # the score is the position's at the end of the pv, once its captures are played out
+        self.assertEqual(search.Search(game).quiesce(-search.INFINITY, search.INFINITY, 3), -result.score)
+
+    def test_unaltered(self):
+        game = perft.position_game(perft.POSITIONS[1])
+        key, boardrepr = game.zobrist_key, repr(game.board)
+        search.search(game, 3)
+        self.assertEqual((game.zobrist_key, repr(game.board), game.undo_stack), (key, boardrepr, []))
+
+
+class TestQuiescence(unittest.TestCase):
+    def test_mvv_lva(self):
+        game = Game(board_with(('k', 0, 0), ('q', 3, 3), ('r', 3, 0), ('p', 3, 5), ('P', 1, 6), ('P', 4, 4),
+                               ('N', 5, 4), ('Q', 7, 3), ('R', 6, 0), ('K', 7, 7)), Color.WHITE, '')
+
+        # PxQ, NxQ, QxQ, promotion to a Queen, RxR, underpromotions, NxP. The e4 Pawn is pinned: it can't take on f5
+        self.assertEqual(search.order_captures(game.board, capture_moves(game)),
+                         [(36, 27, None), (44, 27, None), (59, 27, None), (14, 6, 'Q'), (48, 24, None),
+                          (14, 6, 'R'), (14, 6, 'B'), (14, 6, 'N'), (44, 29, None)])
+
+        self.assertEqual(search.capture_value(game.board.squares, (36, 27, None)), PIECE_VALUES['Q'])
+        self.assertEqual(search.capture_value(game.board.squares, (14, 6, 'N')), PIECE_VALUES['N'] - PIECE_VALUES['P'])
+
+    def test_stand_pat(self):
+        game = Game()
+        searcher = search.Search(game)
+        self.assertEqual(searcher.quiesce(-search.INFINITY, search.INFINITY, 0), 0)
+        self.assertEqual(searcher.nodes, 1)
+
+    def test_exchange(self):
+        # the Queen can take a Pawn, but the other Pawn takes her back
+        game = Game(board_with(('k', 0, 4), ('p', 3, 3), ('p', 2, 4), ('Q', 4, 3), ('K', 7, 4)), Color.WHITE, '')
+        self.assertEqual(search.Search(game, quiescence=False).search(1).pv, [(35, 27, None)])
+
+        result = search.search(game, 1)
+        self.assertNotEqual(result.pv, [(35, 27, None)])
+        self.assertLess(result.score, search.evaluate(game.board, Color.WHITE) + PIECE_VALUES['P'])
+
+    def test_stable(self):
+        # scores at odd and even depths differ by less when leaves aren't evaluated halfway through an exchange
+        game = perft.position_game(perft.POSITIONS[5])
+        quiet = [search.search(game, depth).score for depth in (1, 2, 3)]
+        static = [search.Search(game, quiescence=False).search(depth).score for depth in (1, 2, 3)]
+        self.assertLess(max(quiet) - min(quiet), max(static) - min(static))
+
+
+class UnorderedSearch(search.Search):
+    def order_moves(self, moves, ply, hash_move=None):
+        return moves
+
+
+class TestOrdering(unittest.TestCase):
+    def test_order_moves(self):
+        game = Game(board_with(('k', 0, 0), ('q', 3, 3), ('r', 3, 0), ('P', 4, 4), ('N', 5, 4), ('R', 6, 0),
+                               ('K', 7, 7)), Color.WHITE, '')
+        searcher = search.Search(game)
+        searcher.killers[2] = [(44, 34, None), (63, 62, None)]
+        searcher.history[44][38] = 50
+        searcher.history[44][61] = 10
+
+        moves = searcher.order_moves(legal_moves(game), 2, hash_move=(48, 40, None))
+        self.assertEqual(moves[:8], [(48, 40, None),                                    # the hash move
+                                     (36, 27, None), (44, 27, None), (48, 24, None),    # PxQ, NxQ, RxR
+                                     (44, 34, None), (63, 62, None),                    # killers
+                                     (44, 38, None), (44, 61, None)])                   # history
+        self.assertCountEqual(moves, legal_moves(game))
+
+    def test_record_cutoff(self):
+        game = Game(board_with(('k', 0, 0), ('r', 3, 0), ('R', 6, 0), ('K', 7, 7)), Color.WHITE, '')
+        searcher = search.Search(game)
+
+        searcher.record_cutoff((48, 40, None), 3, 1, True)
+        searcher.record_cutoff((63, 62, None), 2, 1, False)
+        searcher.record_cutoff((63, 62, None), 2, 1, False)
+        self.assertEqual(searcher.killers[1], [(63, 62, None), (48, 40, None)])
+        self.assertEqual((searcher.history[48][40], searcher.history[63][62]), (9, 8))
+
+        # a capture is already ordered first: it's counted, but not remembered
+        searcher.record_cutoff((48, 24, None), 4, 1, True)
+        self.assertEqual(searcher.killers[1], [(63, 62, None), (48, 40, None)])
+        self.assertEqual(searcher.history[48][24], 0)
+        self.assertEqual((searcher.cutoffs, searcher.first_move_cutoffs, searcher.first_move_cutoff_rate()), (4, 2, 0.5))
+
+    def test_fewer_nodes(self):
+        for position in perft.POSITIONS[3], perft.POSITIONS[5]:
+            game = perft.position_game(position)
+            ordered, unordered = search.Search(game), UnorderedSearch(game)
+            result, expected = ordered.search(3), unordered.search(3)
+
+            self.assertEqual(result.score, expected.score, position.name)
+            self.assertLess(result.nodes, expected.nodes / 2, position.name)
+            self.assertGreater(ordered.first_move_cutoff_rate(), unordered.first_move_cutoff_rate(), position.name)
+
+    def test_hash_move(self):
+        # with a table, each position's best move from the previous iteration is tried first, not only the root's
+        game = perft.position_game(perft.POSITIONS[2])
+        with_table, without = search.Search(game, TranspositionTable(1)), search.Search(game)
+        with_table.iterate(max_depth=3)
+        without.iterate(max_depth=3)
+        self.assertLess(with_table.nodes, without.nodes)
+        self.assertGreater(with_table.first_move_cutoff_rate(), without.first_move_cutoff_rate())
+
+        self.assertIsNone(search.Search(game).first_move_cutoff_rate())
+
+
+class TestIterate(unittest.TestCase):
+    def test_max_depth(self):
+        game = perft.position_game(perft.POSITIONS[2])
+        result = search.Search(game).iterate(max_depth=3)
+        self.assertEqual(result.depth, 3)
+        self.assertEqual(result.score, search.search(game, 3).score)
+        self.assertGreater(result.nodes, search.search(game, 3).nodes)
+
+    def test_time_limit(self):
+        game = perft.position_game(perft.POSITIONS[1])
+        key = game.zobrist_key
+
+        start = time.monotonic()
+        result = search.Search(game).iterate(time_limit=0.3)
+        elapsed = time.monotonic() - start
+
+        self.assertLess(elapsed, 1.0)
+        self.assertGreaterEqual(result.depth, 2)
+        self.assertEqual(len(result.pv), result.depth)
+        self.assertEqual((game.zobrist_key, game.undo_stack), (key, []))
+
+    def test_node_limit(self):
+        game = perft.position_game(perft.POSITIONS[0])
+        result = search.Search(game).iterate(node_limit=2000)
+        self.assertLessEqual(result.nodes, 2000)
+        self.assertEqual(result.depth, 3)
+
+    def test_first_depth_completes(self):
+        game = perft.position_game(perft.POSITIONS[1])
+        result = search.Search(game).iterate(time_limit=0, node_limit=1)
+        self.assertEqual(result.depth, 1)
+        self.assertEqual(len(result.pv), 1)
+
+    def test_start_depth(self):
+        game = perft.position_game(perft.POSITIONS[2])
+        searcher = search.Search(game)
+        result = searcher.iterate(max_depth=4, start_depth=3)
+        self.assertEqual(result.score, search.search(game, 4).score)
+        self.assertEqual([depth for depth, _, _ in searcher.completed], [3, 4])
+        self.assertEqual(searcher.completed[-1][2], result.nodes)
+
+        result = searcher.iterate(time_limit=0, node_limit=1, start_depth=2)
+        self.assertEqual(result.depth, 2)
+
+    def test_cut_short(self):
+        # a depth cut short after the last depth's best move keeps the best of the moves it finished
+        game = perft.position_game(perft.POSITIONS[1])
+        searcher = search.Search(game, TranspositionTable(1))
+        full = searcher.iterate(max_depth=3)
+        (_, _, depth_1_nodes), (_, _, depth_2_nodes), _ = searcher.completed
+
+        searcher = search.Search(game, TranspositionTable(1))
+        result = searcher.iterate(max_depth=3, node_limit=full.nodes - 1)
+        self.assertEqual([depth for depth, _, _ in searcher.completed], [1, 2])
+        self.assertEqual((result.score, result.pv[0], result.depth), (full.score, full.pv[0], 3))
+
+        # cut short before then, the last depth's result stands
+        result = search.Search(game, TranspositionTable(1)).iterate(max_depth=3, node_limit=depth_2_nodes + 1)
+        self.assertEqual(result.depth, 2)
+        result = search.Search(game, TranspositionTable(1)).iterate(max_depth=2, node_limit=depth_1_nodes + 1)
+        self.assertEqual(result.depth, 1)
+
+    def test_deepest(self):
+        # Search keeps killers for MAX_DEPTH plies, so it searches no deeper
+        with unittest.mock.patch.object(search, 'MAX_DEPTH', 3):
+            game = perft.position_game(perft.POSITIONS[2])
+            self.assertEqual(search.Search(game).iterate(max_depth=5).depth, 3)
+            self.assertEqual(search.Search(game).search(5).depth, 3)
+
+    def test_aborted(self):
+        game = perft.position_game(perft.POSITIONS[1])
+        with self.assertRaises(search.SearchAborted):
+            search.Search(game, node_limit=100).search(3)
+        with self.assertRaises(search.SearchAborted):
+            search.Search(game, deadline=time.monotonic()).search(3)
+        self.assertEqual(game.undo_stack, [])
+
+    def test_stops_at_mate(self):
+        game = Game(board_with(('k', 0, 7), ('R', 6, 1), ('R', 7, 0), ('K', 7, 6)), Color.WHITE, '')
+        result = search.Search(game).iterate(time_limit=60)
+        # the depth 3 search sees the mate: the last move is a check, and quiescence search finds no way out of it
+        self.assertEqual((result.score, result.depth), (search.MATE_SCORE - 3, 3))
+
+    def test_mated(self):
+        game = Game(Board("P                               R               k KR           p"), Color.BLACK, '')
+        self.assertEqual(search.Search(game).iterate(time_limit=60), search.SearchResult(-search.MATE_SCORE, [], 1, 1))
@@ -0,0 +1,53 @@
+import pickle
+import unittest
+from multiprocessing import Pool
+from chesspy import smp, search, perft
+from chesspy.move_generators import legal_moves
+from chesspy.transposition import SharedTranspositionTable
+
+
+class TestSmp(unittest.TestCase):
+    def setUp(self):
+        self.pool = Pool(2)
+        self.tt = SharedTranspositionTable(1)
+        self.game = perft.position_game(perft.POSITIONS[1])
+
+    def tearDown(self):
+        self.pool.close()
+        self.pool.join()
+        self.tt.close()
+
+    def test_start_depth(self):
+        self.assertEqual([smp.start_depth(worker) for worker in range(4)], [1, 2, 1, 2])
+
+    def test_packet_size(self):
+        # a worker's task holds the position as FEN, not the Game
+        packet = (self.game.to_fen(), self.tt, 1, 2, None, None)
+        self.assertLess(len(pickle.dumps((smp.search_worker, [packet]))), 300)
+
+        [(result, completed)] = self.pool.map(smp.search_worker, [packet])
+        self.assertEqual((result.score, result.depth), (search.search(self.game, 2).score, 2))
+        self.assertEqual([depth for depth, _, _ in completed], [1, 2])
+
+    def test_search(self):
+        result = smp.search(self.game, self.pool, 2, self.tt, max_depth=3)
+        self.assertEqual(result.search.score, search.search(self.game, 3).score)
+        self.assertEqual(result.search.depth, 3)
+        self.assertIn(result.search.pv[0], legal_moves(self.game))
+        self.assertGreater(result.nodes, result.search.nodes)
+        self.assertEqual(list(result.depth_seconds), [1, 2, 3])
+        self.assertLessEqual(max(result.depth_seconds.values()), result.seconds)
+
+    def test_max_depth_1(self):
+        result = smp.search(self.game, self.pool, 2, self.tt, max_depth=1)
+        self.assertEqual((result.search.depth, list(result.depth_seconds)), (1, [1]))
+
+    def test_node_limit(self):
+        result = smp.search(self.game, self.pool, 2, self.tt, node_limit=4000)
+        self.assertGreaterEqual(result.search.depth, 2)
+        self.assertLess(result.nodes, 2 * 4000 + 2 * len(legal_moves(self.game)) ** 2)
+
+    def test_benchmark(self):
+        reports = list(smp.benchmark(self.game, 2, (1, 2), tt_megabytes=1))
+        self.assertEqual([(report.cores, report.search.depth) for report in reports], [(1, 2), (2, 2)])
+        self.assertEqual(reports[0].search.score, reports[1].search.score)
@@ -0,0 +1,24 @@
+import os
+import sys
+import subprocess
+import unittest
+
+TRACED = """
+import sys, logging
+logging.basicConfig(stream=sys.stdout, level=logging.DEBUG, format='%(message)s')
+from chesspy.game import Game
+Game().move_san('e4')
+"""
+
+
+class TestTrace(unittest.TestCase):
+    def run_traced(self, setting):
+        env = dict(os.environ, CHESSPY_TRACE=setting)
+        return subprocess.run([sys.executable, '-c', TRACED], env=env, capture_output=True, text=True, check=True).stdout
+
+    def test_off(self):
+        self.assertEqual(self.run_traced(''), '')
+        self.assertEqual(self.run_traced('0'), '')
+
+    def test_on(self):
+        self.assertIn("Game::move_san(e4)", self.run_traced('1'))
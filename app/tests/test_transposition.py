@@ -0,0 +1,167 @@
+import pickle
+import unittest
+from multiprocessing import Pool
+from chesspy import search, perft, transposition
+from chesspy.game import Game
+from chesspy.board import Board
+from chesspy.color import Color
+from chesspy.move_generators import legal_moves
+from chesspy.transposition import TranspositionTable, SharedTranspositionTable, Entry, EXACT, LOWER, UPPER
+
+
+class TestTranspositionTable(unittest.TestCase):
+    def test_pack_move(self):
+        for move in (None, (52, 36, None), (8, 0, 'Q'), (15, 6, 'N'), (63, 0, 'R')):
+            self.assertEqual(transposition.unpack_move(transposition.pack_move(move)), move)
+
+    def test_store_probe(self):
+        tt = TranspositionTable(1)
+        self.assertIsNone(tt.probe(12345))
+
+        tt.store(12345, 4, EXACT, -250, (52, 36, None))
+        tt.store(2**64 - 1, 255, LOWER, search.MATE_SCORE - 3, (8, 0, 'N'))
+        tt.store(67890, 0, UPPER, -search.MATE_SCORE, None)
+
+        self.assertEqual(tt.probe(12345), Entry(4, EXACT, -250, (52, 36, None)))
+        self.assertEqual(tt.probe(2**64 - 1), Entry(255, LOWER, search.MATE_SCORE - 3, (8, 0, 'N')))
+        self.assertEqual(tt.probe(67890), Entry(0, UPPER, -search.MATE_SCORE, None))
+        self.assertIsNone(tt.probe(12345 + tt.buckets))
+        self.assertEqual((tt.hits, tt.misses, tt.stores), (3, 2, 3))
+
+    def test_memory_budget(self):
+        self.assertEqual(len(TranspositionTable(1).table) * 8, 1 << 20)
+        self.assertEqual(len(TranspositionTable(4).table) * 8, 4 << 20)
+        self.assertEqual(TranspositionTable(1).buckets, (1 << 20) // 32)
+
+    def test_replacement(self):
+        tt = TranspositionTable(0)  # a single bucket
+        self.assertEqual(tt.buckets, 1)
+
+        tt.store(1, 5, EXACT, 1, None)
+        tt.store(2, 3, EXACT, 2, None)  # shallower: always-replace slot
+        tt.store(3, 2, EXACT, 3, None)  # shallower: replaces 2
+        self.assertEqual([tt.probe(key) and tt.probe(key).score for key in (1, 2, 3)], [1, None, 3])
+
+        tt.store(4, 5, EXACT, 4, None)  # as deep: depth-preferred slot, 1 is lost
+        self.assertEqual([tt.probe(key) and tt.probe(key).score for key in (1, 3, 4)], [None, 3, 4])
+
+        tt.store(4, 1, LOWER, 5, None)  # same key: updated in place
+        self.assertEqual(tt.probe(4), Entry(1, LOWER, 5, None))
+
+        tt.store(5, 6, EXACT, 6, None)
+        tt.new_search()
+        tt.store(6, 1, EXACT, 7, None)  # the deep entry is from an earlier search, so it's replaced
+        self.assertEqual([tt.probe(key) and tt.probe(key).score for key in (5, 6)], [None, 7])
+
+    def test_checksum(self):
+        tt = TranspositionTable(0)
+        tt.store(1, 5, EXACT, 1, None)
+        tt.table[1] ^= 1 << 40  # a torn write
+        self.assertIsNone(tt.probe(1))
+
+    def test_clear(self):
+        tt = TranspositionTable(1)
+        tt.store(1, 5, EXACT, 1, None)
+        tt.clear()
+        self.assertIsNone(tt.probe(1))
+
+    def test_process_table(self):
+        self.assertIs(transposition.process_table(1), transposition.process_table(1))
+        self.assertIsNot(transposition.process_table(1), transposition.process_table(2))
+
+
+def store_and_probe(packet):
+    """Stores an entry for key in tt and returns what tt holds for other_key, in a pool worker."""
+    tt, key, other_key = packet
+    tt.store(key, tt.generation, EXACT, key, None)
+    return tt.probe(other_key)
+
+
+class TestSharedTranspositionTable(unittest.TestCase):
+    def setUp(self):
+        self.tt = SharedTranspositionTable(1)
+
+    def tearDown(self):
+        self.tt.close()
+
+    def test_attach(self):
+        self.tt.store(12345, 4, EXACT, -250, (52, 36, None))
+        attached = SharedTranspositionTable(1, self.tt.name)
+        self.assertEqual(attached.probe(12345), Entry(4, EXACT, -250, (52, 36, None)))
+
+        attached.store(67890, 2, LOWER, 3, None)
+        self.assertEqual(self.tt.probe(67890), Entry(2, LOWER, 3, None))
+        attached.close()
+
+    def test_pickle(self):
+        self.tt.new_search()
+        self.tt.store(1, 5, EXACT, 1, None)
+        unpickled = pickle.loads(pickle.dumps(self.tt))
+        self.assertIs(unpickled, transposition.attach_table(self.tt.name, 1, 1))
+        self.assertEqual((unpickled.generation, unpickled.probe(1)), (1, Entry(5, EXACT, 1, None)))
+
+    def test_attach_last(self):
+        # a process keeps only the last table it was sent
+        other = SharedTranspositionTable(1)
+        attached = pickle.loads(pickle.dumps(self.tt))
+        self.assertIs(pickle.loads(pickle.dumps(self.tt)), attached)
+
+        other_attached = pickle.loads(pickle.dumps(other))
+        self.assertIsNone(attached.shm)
+        self.assertEqual(list(transposition._attached_tables.values()), [other_attached])
+
+        self.assertIsNot(pickle.loads(pickle.dumps(self.tt)), attached)
+        self.assertIsNone(other_attached.shm)
+        other.close()
+
+    def test_pool(self):
+        self.tt.new_search()
+        self.tt.store(1, 5, EXACT, 1, None)
+        with Pool(2) as pool:
+            found = pool.map(store_and_probe, [(self.tt, key, 1) for key in range(2, 10)])
+        self.assertEqual(found, [Entry(5, EXACT, 1, None)] * 8)
+        self.assertEqual([self.tt.probe(key) for key in range(2, 10)], [Entry(1, EXACT, key, None) for key in range(2, 10)])
+
+    def test_checksum(self):
+        self.tt.store(1, 5, EXACT, 1, None)
+        self.tt.table[(1 % self.tt.buckets) * 4 + 1] ^= 1 << 40  # a torn write
+        self.assertIsNone(self.tt.probe(1))
+
+    def test_clear(self):
+        self.tt.store(1, 5, EXACT, 1, None)
+        attached = SharedTranspositionTable(1, self.tt.name)
+        attached.clear()
+        self.assertIsNone(self.tt.probe(1))
+        attached.close()
+
+
+class TestSearchWithTable(unittest.TestCase):
+    def test_same_scores(self):
+        for position in perft.POSITIONS[:8]:
+            for depth in (1, 2, 3):
+                game = perft.position_game(position)
+                expected = search.search(game, depth)
+                result = search.search(game, depth, TranspositionTable(1))
+                self.assertEqual(result.score, expected.score, (position.name, depth))
+                self.assertEqual(len(result.pv), len(expected.pv), (position.name, depth))
+
+    def test_reuse(self):
+        tt = TranspositionTable(1)
+        game = perft.position_game(perft.POSITIONS[1])
+        first = search.search(game, 3, tt)
+
+        tt.new_search()
+        second = search.search(game, 3, tt)
+
+        # the root isn't looked up, but each of its children is found in the table
+        self.assertEqual(second.nodes, 1 + len(legal_moves(game)))
+        self.assertEqual((second.score, len(second.pv)), (first.score, 3))
+
+    def test_mate_scores(self):
+        # rook ladder: mate in 2, found again through table hits
+        game = Game(Board("       k                                         R      R     K "), Color.WHITE, '')
+        tt = TranspositionTable(1)
+        for _ in range(2):
+            result = search.search(game, 4, tt)
+            self.assertEqual(result.score, search.MATE_SCORE - 3)
+            self.assertEqual(len(result.pv), 3)